@@ -1,12 +1,14 @@
-from datetime import timezone
-from django.contrib import admin
-
-from django.contrib import admin
+from django.contrib import admin, messages
 from django.contrib.auth.admin import UserAdmin
+from django.core.exceptions import PermissionDenied
 from django.http import HttpResponseRedirect
 from django.db import models
-from django.urls import reverse
+from django.template.response import TemplateResponse
+from django.urls import path, reverse
 from django.utils.html import format_html
+from gamify_backend.fulltext import get_fulltext_index
+from game.services import RewardService
+from .balance import EncounterBalancer
 from .models import Reward, Adventure, Scene, SceneChoice, AdventureProgress
 
 
@@ -30,7 +32,7 @@ class AdventureAdmin(admin.ModelAdmin):
     list_filter = ('difficulty', 'estimated_duration', 'is_published')
     search_fields = ('title', 'description')
     filter_horizontal = ('rewards',)
-    actions = ['publish_adventures', 'unpublish_adventures']
+    actions = ['publish_adventures', 'unpublish_adventures', 'balance_report']
 
     @admin.action(description='Publish selectionned adventures')
     def publish_adventures(self, request, queryset):
@@ -42,6 +44,49 @@ class AdventureAdmin(admin.ModelAdmin):
         queryset.update(is_published=False)
         self.message_user(request, f"{queryset.count()} unpublished adventures.")
 
+    @admin.action(description='Balance report of selectionned adventures')
+    def balance_report(self, request, queryset):
+        ids = ','.join(str(pk) for pk in queryset.values_list('pk', flat=True))
+        return HttpResponseRedirect(f"{reverse('admin:adventures_adventure_balance_report')}?ids={ids}")
+
+    def get_urls(self):
+        urls = [
+            path('balance-report/', self.admin_site.admin_view(self.balance_report_view), name='adventures_adventure_balance_report'),
+        ]
+        return urls + super().get_urls()
+
+    def balance_report_view(self, request):
+        """Difficulty of the adventures from the stored simulations (see `manage.py balance_encounters`), none run here."""
+        if not self.has_view_permission(request):
+            raise PermissionDenied
+        ids = request.GET.get('ids')
+        adventure_ids = [int(pk) for pk in ids.split(',') if pk.isdigit()] if ids else None
+        report = EncounterBalancer(adventure_ids=adventure_ids).run(simulate=False)
+        adventures = [
+            {
+                'adventure': balance.adventure,
+                'score': balance.difficulty_score,
+                'flags': balance.flags,
+                'scenes': [
+                    {
+                        'scene': scene.scene,
+                        'cells': [(level, None if probability is None else f"{probability:.0%}") for level, probability in scene.win_probabilities()],
+                        'flags': scene.flags,
+                    }
+                    for scene in balance.scenes
+                ],
+            }
+            for balance in report.adventures
+        ]
+        context = {
+            **self.admin_site.each_context(request),
+            'opts': self.model._meta,
+            'title': "Encounter balance",
+            'report': report,
+            'adventures': adventures,
+        }
+        return TemplateResponse(request, 'admin/adventures/balance_report.html', context)
+
 
 @admin.register(Scene)
 class SceneAdmin(admin.ModelAdmin):
@@ -65,6 +110,15 @@ class SceneAdmin(admin.ModelAdmin):
         return format_html('<a href="{}{}">Create next scene</a>', url, params)
     next_scene_link.short_description = 'Create next scene'
 
+    def get_search_results(self, request, queryset, search_term):
+        """Search the titles and texts with the full-text index, the adventure titles with icontains."""
+        if not search_term.strip():
+            return queryset, False
+        matches = get_fulltext_index('scenes').search(search_term, queryset=queryset, limit=self.list_per_page * 5)
+        return queryset.filter(
+            models.Q(pk__in=[match['id'] for match in matches]) | models.Q(adventure__title__icontains=search_term.strip())
+        ), False
+
     def get_next_scene_order(self, adventure):
         """Return the number for the next scene for a given adventure."""
         max_order = Scene.objects.filter(adventure=adventure).aggregate(models.Max('scene_order'))['scene_order__max']
@@ -119,7 +173,15 @@ class AdventureProgressAdmin(admin.ModelAdmin):
 
     @admin.action(description='Marquer comme complété')
     def mark_as_completed(self, request, queryset):
-        queryset.update(completed=True, completed_at=timezone.now())
-        self.message_user(request, f"{queryset.count()} adventure marked as completed.")
+        """Complete through RewardService, so that the rewards are granted (once)."""
+        completed = skipped = 0
+        for progress in queryset.filter(completed=False).select_related('character', 'adventure', 'current_scene'):
+            if not progress.current_scene.is_ending_scene:
+                skipped += 1
+            elif RewardService.complete_adventure(progress):
+                completed += 1
+        self.message_user(request, f"{completed} adventure marked as completed.")
+        if skipped:
+            self.message_user(request, f"{skipped} adventure not on an ending scene, left as is.", level=messages.WARNING)
 
 
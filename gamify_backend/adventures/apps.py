@@ -6,4 +6,12 @@ class AdventuresConfig(AppConfig):
     name = 'adventures'
     
     def ready(self):
-        import adventures.signals
\ No newline at end of file
+        import adventures.signals
+        from gamify_backend.fulltext import register_fulltext_index
+        from .models import Scene
+
+        # A word of the title weighs more than one of the text
+        register_fulltext_index(
+            'scenes', Scene, fields=['title', 'content'], snippet_field='content', weights=[10, 1],
+            values=['id', 'adventure_id', 'adventure__title', 'scene_order', 'title'],
+        )
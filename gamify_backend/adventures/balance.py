@@ -0,0 +1,281 @@
+"""
+Encounter balancing: the chances to win every fight scene, for the levels
+around the level its adventure is gated at, and every character class.
+
+Each fight scene is simulated (game.simulation) against a grid of character
+profiles: the levels min_level .. min_level + LEVEL_BAND - 1 of its adventure,
+and for each class the average HP of its characters at that level (of the
+class, of every character, then BALANCE_DEFAULT_HP when there are none). The
+fight rules only read the level and the HP, so two classes with the same HP
+share their matchup.
+
+A matchup is keyed by the content hash of what decides its outcome (the
+enemy's HP and damages, the profile, the number of fights, the version of the
+rules) and stored in MatchupSimulation: a run only simulates the matchups not
+seen yet, in a process pool, and the admin report reads the stored ones.
+
+The difficulty score of an adventure is the chance, out of 100, to lose at
+least one of its fights for the weakest class at its gate level. Scenes are
+flagged when hard to win (or trivial) at the gate level, adventures when their
+score is far from those of the same difficulty label.
+"""
+import hashlib
+import json
+import math
+import os
+import statistics
+import time
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict, astuple, dataclass, field
+
+import django
+from django.conf import settings
+from django.db import connections
+from django.db.models import Avg
+
+from game.models import Enemy, MatchupSimulation
+from game.simulation import FIGHTS, SIMULATION_VERSION, CharacterProfile, simulate_fights
+from users.models import Character, CharacterClass
+from .models import Scene
+
+LEVEL_BAND = 5
+UNWINNABLE = 0.05
+MIN_WIN_PROBABILITY = 0.5
+TRIVIAL_WIN_PROBABILITY = 0.999
+TRIVIAL_HP_LOST = 0.05  # Of the character's HP
+OUTLIER_DEVIATIONS = 3  # Median absolute deviations from the median of the label
+WRITE_BATCH = 500
+LOAD_BATCH = 500
+
+
+@dataclass(frozen=True)
+class Matchup:
+    enemy_hp: int
+    min_damage: int
+    max_damage: int
+    level: int
+    hp: int
+    fights: int
+
+    @property
+    def key(self):
+        return hashlib.sha256(json.dumps([SIMULATION_VERSION, *astuple(self)]).encode()).hexdigest()
+
+
+def simulate_matchup(matchup):
+    """Worker: the results of a matchup, seeded by its key so they don't depend on the process."""
+    simulation = simulate_fights(
+        CharacterProfile(level=matchup.level, hp=matchup.hp),
+        Enemy(hp=matchup.enemy_hp, min_damage=matchup.min_damage, max_damage=matchup.max_damage),
+        fights=matchup.fights,
+        seed=int(matchup.key[:16], 16),
+    )
+    summary = simulation.summary()
+    return {name: summary[name] for name in ('win_probability', 'mean_turns', 'turns_p90', 'expected_hp_lost')}
+
+
+@dataclass
+class SceneBalance:
+    scene: object
+    gate_level: int
+    levels: list
+    # {(class name, level): (Matchup, MatchupSimulation or None when not simulated)}
+    results: dict
+    flags: list = field(default_factory=list)
+
+    def win_probabilities(self):
+        """[(level, win probability of the weakest class)] over the band, None when not simulated."""
+        rows = []
+        for level in self.levels:
+            probabilities = [result and result.win_probability for (_, at), (_, result) in self.results.items() if at == level]
+            rows.append((level, None if None in probabilities else min(probabilities, default=None)))
+        return rows
+
+    @property
+    def gate_win_probability(self):
+        return self.win_probabilities()[0][1]
+
+    @property
+    def weakest_class(self):
+        at_gate = [(result.win_probability, name) for (name, level), (_, result) in self.results.items()
+                   if level == self.gate_level and result]
+        return min(at_gate)[1] if at_gate else None
+
+
+@dataclass
+class AdventureBalance:
+    adventure: object
+    scenes: list
+    flags: list = field(default_factory=list)
+
+    @property
+    def difficulty_score(self):
+        """Chance out of 100 to lose at least one fight at the gate level, None when not simulated."""
+        probabilities = [scene.gate_win_probability for scene in self.scenes]
+        if None in probabilities:
+            return None
+        return 100 * (1 - math.prod(probabilities))
+
+    @property
+    def flagged(self):
+        return bool(self.flags) or any(scene.flags for scene in self.scenes)
+
+
+@dataclass
+class BalanceReport:
+    adventures: list = field(default_factory=list)
+    matchups: int = 0
+    simulated: int = 0
+    missing: int = 0
+    seconds: float = 0.0
+
+    @property
+    def cached(self):
+        return self.matchups - self.simulated - self.missing
+
+    @property
+    def rate(self):
+        return self.simulated / self.seconds if self.seconds else 0
+
+
+class EncounterBalancer:
+    def __init__(self, fights=FIGHTS, workers=None, level_band=LEVEL_BAND, adventure_ids=None):
+        self.fights = fights
+        self.workers = workers or os.cpu_count() or 1
+        self.level_band = level_band
+        self.adventure_ids = adventure_ids
+
+    def scenes(self):
+        scenes = Scene.objects.filter(is_fight_scene=True, enemy__isnull=False).select_related('adventure', 'enemy')
+        if self.adventure_ids is not None:
+            scenes = scenes.filter(adventure_id__in=self.adventure_ids)
+        return list(scenes.order_by('adventure__title', 'adventure_id', 'scene_order'))
+
+    def profiles(self, levels):
+        """{level: {class name: HP}}; the class None stands for every class when none is defined."""
+        default_hp = getattr(settings, 'BALANCE_DEFAULT_HP', 100)
+        characters = Character.objects.order_by()
+        by_class_level = {
+            (row['character_class_id'], row['level']): row['hp']
+            for row in characters.filter(level__in=levels).values('character_class_id', 'level').annotate(hp=Avg('hp'))
+        }
+        by_level = {row['level']: row['hp'] for row in characters.filter(level__in=levels).values('level').annotate(hp=Avg('hp'))}
+        classes = list(CharacterClass.objects.values_list('pk', 'name')) or [(None, None)]
+        return {
+            level: {
+                name: round(by_class_level.get((pk, level)) or by_level.get(level) or default_hp)
+                for pk, name in classes
+            }
+            for level in levels
+        }
+
+    def load(self, keys):
+        keys = list(keys)
+        results = {}
+        for start in range(0, len(keys), LOAD_BATCH):
+            for result in MatchupSimulation.objects.filter(key__in=keys[start:start + LOAD_BATCH]):
+                results[result.key] = result
+        return results
+
+    def simulate(self, matchups, progress=None):
+        """Simulate `matchups` in the process pool and store them; `progress(done, total)` is called per batch stored."""
+        results = {}
+        pool = None
+        if self.workers > 1 and len(matchups) > 1:
+            # The workers must not share the parent's database connection
+            connections.close_all()
+            pool = ProcessPoolExecutor(max_workers=self.workers, initializer=django.setup)
+            summaries = pool.map(simulate_matchup, matchups, chunksize=max(1, len(matchups) // (self.workers * 4)))
+        else:
+            summaries = map(simulate_matchup, matchups)
+        try:
+            batch = []
+            for matchup, summary in zip(matchups, summaries):
+                batch.append(MatchupSimulation(key=matchup.key, **asdict(matchup), **summary))
+                if len(batch) >= WRITE_BATCH:
+                    results.update(self.store(batch))
+                    batch = []
+                    if progress:
+                        progress(len(results), len(matchups))
+            results.update(self.store(batch))
+        finally:
+            if pool:
+                pool.shutdown(cancel_futures=True)
+        return results
+
+    def store(self, rows):
+        # A concurrent run may have stored the same matchups: theirs are as good
+        MatchupSimulation.objects.bulk_create(rows, ignore_conflicts=True)
+        return {row.key: row for row in rows}
+
+    def run(self, simulate=True, progress=None):
+        """Build the report; with simulate=False, the matchups never simulated are left out (see BalanceReport.missing)."""
+        started = time.perf_counter()
+        report = BalanceReport()
+        scenes = self.scenes()
+        levels_of = {scene.pk: list(range(scene.adventure.min_level, scene.adventure.min_level + self.level_band)) for scene in scenes}
+        profiles = self.profiles(sorted({level for levels in levels_of.values() for level in levels}))
+
+        grids = {}
+        for scene in scenes:
+            grids[scene.pk] = {
+                (name, level): Matchup(scene.enemy.hp, scene.enemy.min_damage, scene.enemy.max_damage, level, hp, self.fights)
+                for level in levels_of[scene.pk]
+                for name, hp in profiles[level].items()
+            }
+        matchups = {matchup.key: matchup for grid in grids.values() for matchup in grid.values()}
+        report.matchups = len(matchups)
+
+        results = self.load(matchups)
+        missing = [matchup for key, matchup in matchups.items() if key not in results]
+        if simulate and missing:
+            results.update(self.simulate(missing, progress))
+            report.simulated = len(missing)
+        else:
+            report.missing = len(missing)
+
+        by_adventure = {}
+        for scene in scenes:
+            balance = SceneBalance(
+                scene=scene,
+                gate_level=scene.adventure.min_level,
+                levels=levels_of[scene.pk],
+                results={cell: (matchup, results.get(matchup.key)) for cell, matchup in grids[scene.pk].items()},
+            )
+            self.flag_scene(balance)
+            by_adventure.setdefault(scene.adventure_id, AdventureBalance(adventure=scene.adventure, scenes=[])).scenes.append(balance)
+        report.adventures = list(by_adventure.values())
+        self.flag_outliers(report.adventures)
+        report.seconds = time.perf_counter() - started
+        return report
+
+    def flag_scene(self, balance):
+        probability = balance.gate_win_probability
+        if probability is None:
+            balance.flags.append("not simulated")
+        elif probability < UNWINNABLE:
+            balance.flags.append(f"unwinnable at level {balance.gate_level} ({balance.weakest_class or 'any class'})")
+        elif probability < MIN_WIN_PROBABILITY:
+            balance.flags.append(f"too hard at level {balance.gate_level} ({balance.weakest_class or 'any class'})")
+        elif probability >= TRIVIAL_WIN_PROBABILITY and all(
+            result.expected_hp_lost <= TRIVIAL_HP_LOST * matchup.hp
+            for (_, level), (matchup, result) in balance.results.items() if level == balance.gate_level
+        ):
+            balance.flags.append(f"trivial at level {balance.gate_level}")
+
+    def flag_outliers(self, adventures):
+        by_label = defaultdict(list)
+        for balance in adventures:
+            if balance.difficulty_score is not None:
+                by_label[balance.adventure.difficulty.strip().lower()].append(balance)
+        for label, group in by_label.items():
+            if len(group) < 3:
+                continue
+            scores = [balance.difficulty_score for balance in group]
+            median = statistics.median(scores)
+            # At least 1 point, so that a label whose adventures all score the same flags no small difference
+            deviation = max(statistics.median(abs(score - median) for score in scores), 1.0)
+            for balance in group:
+                if abs(balance.difficulty_score - median) > OUTLIER_DEVIATIONS * deviation:
+                    balance.flags.append(f"outlier among the '{label}' adventures (median {median:.0f})")
@@ -0,0 +1,61 @@
+from django.core.management.base import BaseCommand
+
+from adventures.balance import LEVEL_BAND, EncounterBalancer
+from game.simulation import FIGHTS
+
+
+def percent(probability):
+    return "  n/a" if probability is None else f"{probability:5.0%}"
+
+
+class Command(BaseCommand):
+    help = (
+        "Simulate every fight scene against the levels around the level of its adventure and every class, "
+        "and report the difficulty of the adventures and the scenes to look at."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--adventure', type=int, action='append', help="Only this adventure (repeatable).")
+        parser.add_argument('--fights', type=int, default=FIGHTS, help="Fights per matchup.")
+        parser.add_argument('--workers', type=int, help="Processes simulating the matchups (one per CPU by default).")
+        parser.add_argument('--levels', type=int, default=LEVEL_BAND, help="Levels simulated from the level of each adventure.")
+        parser.add_argument('--flagged', action='store_true', help="Only list the flagged adventures and scenes.")
+
+    def handle(self, *args, **options):
+        balancer = EncounterBalancer(
+            fights=options['fights'],
+            workers=options['workers'],
+            level_band=options['levels'],
+            adventure_ids=options['adventure'],
+        )
+        progress = self.report_progress if options['verbosity'] >= 2 else None
+        report = balancer.run(progress=progress)
+
+        for adventure in report.adventures:
+            if options['flagged'] and not adventure.flagged:
+                continue
+            score = adventure.difficulty_score
+            self.stdout.write(
+                f"{adventure.adventure.title} ({adventure.adventure.difficulty}, level {adventure.adventure.min_level}): "
+                f"difficulty {'n/a' if score is None else f'{score:.0f}/100'}"
+            )
+            for flag in adventure.flags:
+                self.stdout.write(self.style.WARNING(f"  ! {flag}"))
+            for scene in adventure.scenes:
+                if options['flagged'] and not scene.flags:
+                    continue
+                probabilities = ' '.join(f"L{level} {percent(probability)}" for level, probability in scene.win_probabilities())
+                line = f"  {scene.scene.scene_order}. {scene.scene.title} vs {scene.scene.enemy.name}: {probabilities}"
+                if scene.flags:
+                    line = self.style.WARNING(f"{line}  [{', '.join(scene.flags)}]")
+                self.stdout.write(line)
+
+        scenes = sum(len(adventure.scenes) for adventure in report.adventures)
+        self.stdout.write(self.style.SUCCESS(
+            f"{len(report.adventures)} adventures, {scenes} fight scenes: {report.matchups} matchups "
+            f"({report.simulated} simulated, {report.cached} already known) in {report.seconds:.1f}s "
+            f"({report.rate:.1f} matchups/s)."
+        ))
+
+    def report_progress(self, done, total):
+        self.stdout.write(f"{done}/{total} matchups simulated")
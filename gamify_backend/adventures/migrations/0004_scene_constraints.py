@@ -0,0 +1,21 @@
+# Generated by Django 5.2.7 on 2026-10-16 21:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('adventures', '0003_scenechoice_effect_type_scenechoice_effect_value'),
+    ]
+
+    operations = [
+        migrations.AddConstraint(
+            model_name='scene',
+            constraint=models.UniqueConstraint(condition=models.Q(('is_starting_scene', True)), fields=('adventure',), name='scene_single_start_per_adventure'),
+        ),
+        migrations.AddConstraint(
+            model_name='scene',
+            constraint=models.UniqueConstraint(fields=('adventure', 'scene_order'), name='scene_unique_order_per_adventure'),
+        ),
+    ]
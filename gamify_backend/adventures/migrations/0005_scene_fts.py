@@ -0,0 +1,26 @@
+# Generated by Django 5.2.7 on 2026-10-16 22:40
+
+from django.db import migrations
+
+from gamify_backend.fulltext import drop_sqlite_index, install_sqlite_index
+
+
+def create_scene_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        install_sqlite_index(schema_editor.connection, 'adventures_scene', ['title', 'content'])
+
+
+def drop_scene_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        drop_sqlite_index(schema_editor.connection, 'adventures_scene')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('adventures', '0004_scene_constraints'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_scene_index, drop_scene_index),
+    ]
@@ -1,10 +1,11 @@
-from datetime import timezone
 from django.db import models
-from django.utils.text import slugify
 from django.core.validators import MinValueValidator
 from django.core.exceptions import ValidationError
 from django.db.models import UniqueConstraint, Q
 
+from gamify_backend.integrity import save_with_constraint_messages
+from users.slugs import save_with_unique_slug
+
 # from users.models import CharacterClass, Character
 # from game.models import Enemy, Skill, Equipment, CharacterSkill
 
@@ -51,10 +52,11 @@ class Adventure(models.Model):
 
     def save(self, *args, **kwargs):
         """Sauvegarde avec validation"""
-        if not self.slug:
-            self.slug = slugify(self.title)
-        self.full_clean()
-        super().save(*args, **kwargs)
+        self.full_clean(exclude=['slug'])
+        if self.slug:
+            super().save(*args, **kwargs)
+        else:
+            save_with_unique_slug(self, self.title, lambda: super(Adventure, self).save(*args, **kwargs))
     
     def __str__(self):
         return self.title
@@ -86,36 +88,23 @@ class Scene(models.Model):
         ordering = ['scene_order']
         verbose_name = "Scene"
         verbose_name_plural = "Scenes"
+        constraints = [
+            UniqueConstraint(
+                fields=['adventure'],
+                condition=Q(is_starting_scene=True),
+                name='scene_single_start_per_adventure'
+            ),
+            UniqueConstraint(
+                fields=['adventure', 'scene_order'],
+                name='scene_unique_order_per_adventure'
+            ),
+        ]
 
 
     def clean(self):
         super().clean()
 
-        if self.is_starting_scene:
-            other_starting = Scene.objects.filter(
-                adventure=self.adventure,
-                is_starting_scene=True
-            ).exclude(pk=self.pk)
-
-            if other_starting.exists():
-                other_scene = other_starting.first()
-                raise ValidationError({
-                    'is_starting_scene': f"A starting scene already exists: '{other_scene.title}'. "
-                                        f"An adventure can only have one starting scene."
-                })
-            
-        if self.scene_order is not None:
-            other_scenes = Scene.objects.filter(
-                adventure=self.adventure,
-                scene_order=self.scene_order
-            ).exclude(pk=self.pk)
-        
-            if other_scenes.exists():
-                other_scene = other_scenes.first()  # Récupère la première scène en conflit
-                raise ValidationError({
-                    'scene_order': f"A scene with that order already exists: '{other_scene.title}'. "
-                                  f"An adventure can only have one scene of that order."
-                })
+        # One starting scene and unique scene_order per adventure: checked by the database (see save)
 
         if self.is_fight_scene and not self.enemy:
             raise ValidationError({
@@ -131,9 +120,26 @@ class Scene(models.Model):
     # - Une seule scène `is_starting_scene=True` par adventure
     # - Au moins une scène `is_ending_scene=True` par adventure
 
+    def constraint_messages(self):
+        def conflicting_title(**lookups):
+            # Only called after a violation, to name the scene in conflict
+            other = Scene.objects.filter(adventure_id=self.adventure_id, **lookups).exclude(pk=self.pk).first()
+            return other.title if other else ""
+
+        return {
+            'scene_single_start_per_adventure': lambda: {
+                'is_starting_scene': f"A starting scene already exists: '{conflicting_title(is_starting_scene=True)}'. "
+                                     f"An adventure can only have one starting scene."
+            },
+            'scene_unique_order_per_adventure': lambda: {
+                'scene_order': f"A scene with that order already exists: '{conflicting_title(scene_order=self.scene_order)}'. "
+                               f"An adventure can only have one scene of that order."
+            },
+        }
+
     def save(self, *args, **kwargs):
-        self.full_clean()
-        super().save(*args, **kwargs)
+        self.full_clean(validate_constraints=False)
+        save_with_constraint_messages(self, lambda: super(Scene, self).save(*args, **kwargs), self.constraint_messages())
     
     def __str__(self):
         prefix = "✓ START" if self.is_starting_scene else ""
@@ -257,13 +263,13 @@ class AdventureProgress(models.Model):
         ]
 
     def mark_as_completed(self):
-        """Mark adventure as completed and update the associated field in the model."""
-        if not self.current_scene.is_ending_scene:
-            raise ValueError("Current scene is not the end scene.")
+        """
+        Complete the adventure and grant its rewards (see RewardService.complete_adventure).
+        Return the RewardGrant, None if the progress was already completed.
+        """
+        from game.services import RewardService
 
-        self.completed = True
-        self.completed_at = timezone.now()
-        self.save()
+        return RewardService.complete_adventure(self)
 
     def clean(self):
         super().clean()
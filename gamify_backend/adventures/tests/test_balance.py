@@ -0,0 +1,93 @@
+import io
+
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+from users.models import User, Character, Race, CharacterClass
+from adventures.balance import EncounterBalancer
+from adventures.models import Adventure, Scene
+from game.models import Enemy, MatchupSimulation
+
+
+class EncounterBalanceTest(TestCase):
+    def setUp(self):
+        self.warrior = CharacterClass.objects.create(name="Warrior", description="Strong.", primary_attribute="Strength")
+        self.mage = CharacterClass.objects.create(name="Mage", description="Casts spells.", primary_attribute="Intelligence")
+        self.rat = Enemy.objects.create(name="Rat", hp=3, min_damage=0, max_damage=1)
+        self.dragon = Enemy.objects.create(name="Dragon", hp=500, min_damage=60, max_damage=80)
+        self.meadows = [self.adventure(f"Meadow {index}", self.rat) for index in range(3)]
+        self.lair = self.adventure("Dragon lair", self.dragon)
+
+    def adventure(self, title, enemy):
+        adventure = Adventure.objects.create(title=title, description="Fights.", min_level=1, base_xp_reward=100, difficulty="easy")
+        Scene.objects.create(adventure=adventure, scene_order=1, title=f"{enemy.name} fight", content="A fight.", is_fight_scene=True, enemy=enemy)
+        return adventure
+
+    def run_balancer(self, **kwargs):
+        return EncounterBalancer(fights=2000, workers=1, level_band=3, **kwargs).run()
+
+    def by_title(self, report):
+        return {balance.adventure.title: balance for balance in report.adventures}
+
+    def test_report(self):
+        report = self.run_balancer()
+        # 2 enemies x 3 levels, both classes share the default HP
+        self.assertEqual((report.matchups, report.simulated), (6, 6))
+        adventures = self.by_title(report)
+
+        lair = adventures["Dragon lair"]
+        self.assertEqual(lair.scenes[0].levels, [1, 2, 3])
+        self.assertGreater(lair.difficulty_score, 99)
+        self.assertIn("unwinnable at level 1", lair.scenes[0].flags[0])
+        self.assertIn("outlier among the 'easy' adventures", lair.flags[0])
+
+        meadow = adventures["Meadow 0"]
+        self.assertEqual(meadow.difficulty_score, 0)
+        self.assertEqual(meadow.scenes[0].flags, ["trivial at level 1"])
+        self.assertEqual(meadow.flags, [])
+
+    def test_known_matchups_are_not_simulated_again(self):
+        first = self.run_balancer()
+        self.assertEqual(MatchupSimulation.objects.count(), 6)
+        again = self.run_balancer()
+        self.assertEqual((again.simulated, again.cached), (0, 6))
+        self.assertEqual(self.by_title(again)["Dragon lair"].difficulty_score, self.by_title(first)["Dragon lair"].difficulty_score)
+
+        # Only the matchups of the changed enemy
+        self.dragon.hp = 400
+        self.dragon.save()
+        self.assertEqual(self.run_balancer().simulated, 3)
+
+    def test_profiles_from_characters(self):
+        user = User.objects.create_user(username="testuser", email="test@example.com", password="testpassword")
+        race = Race.objects.create(name="Human", description="Humans are versatile.")
+        character = Character.objects.create(user=user, name="TestChar", race=race, character_class=self.mage)
+        Character.objects.filter(pk=character.pk).update(level=2, hp=40)
+        profiles = EncounterBalancer().profiles([1, 2])
+        self.assertEqual(profiles[2], {"Mage": 40, "Warrior": 40})
+        self.assertEqual(profiles[1], {"Mage": 100, "Warrior": 100})
+
+    def test_only_some_adventures(self):
+        report = self.run_balancer(adventure_ids=[self.lair.pk])
+        self.assertEqual([balance.adventure for balance in report.adventures], [self.lair])
+        self.assertEqual(report.adventures[0].flags, [])  # No other adventure to compare with
+
+    def test_command_and_admin_report(self):
+        admin = User.objects.create_superuser(username="admin", email="admin@example.com", password="testpassword")
+        self.client.force_login(admin)
+        url = reverse('admin:adventures_adventure_balance_report')
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, "10 matchups were never simulated")  # 2 enemies x 5 levels
+
+        out = io.StringIO()
+        call_command('balance_encounters', '--workers', '1', '--fights', '100000', '--levels', '5', '--flagged', stdout=out)
+        output = out.getvalue()
+        self.assertIn("Dragon lair (easy, level 1): difficulty 100/100", output)
+        self.assertIn("unwinnable at level 1", output)
+        self.assertIn("4 adventures, 4 fight scenes: 10 matchups (10 simulated, 0 already known)", output)
+
+        response = self.client.get(url, {'ids': str(self.lair.pk)})
+        self.assertNotContains(response, "never simulated")
+        self.assertContains(response, "Dragon lair")
+        self.assertNotContains(response, "Meadow 0")
@@ -1,5 +1,7 @@
 from django.test import TestCase
 from django.core.exceptions import ValidationError
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from users.models import User, Character, Race, CharacterClass
 from adventures.models import Adventure, Scene, SceneChoice, AdventureProgress
 
@@ -69,6 +71,30 @@ class SceneModelTest(TestCase):
             ).full_clean()
 
 
+    def test_single_starting_scene(self):
+        """Test that a second starting scene is refused with the name of the first one."""
+        with self.assertRaises(ValidationError) as context:
+            Scene.objects.create(
+                adventure=self.adventure,
+                title="Another Start",
+                content="Test content for scene",
+                scene_order=2,
+                is_starting_scene=True
+            )
+        self.assertIn("A starting scene already exists: 'Test Scene'", str(context.exception))
+
+    def test_unique_scene_order(self):
+        with self.assertRaises(ValidationError) as context:
+            Scene.objects.create(adventure=self.adventure, title="Same Order", content="Test content", scene_order=1)
+        self.assertIn('scene_order', context.exception.message_dict)
+
+    def test_scene_save_does_not_read_other_scenes(self):
+        """Test that the uniqueness checks are left to the database."""
+        with CaptureQueriesContext(connection) as queries:
+            Scene.objects.create(adventure=self.adventure, title="Second", content="Test content", scene_order=2)
+        self.assertFalse([query for query in queries if query['sql'].startswith('SELECT') and 'FROM "adventures_scene"' in query['sql']])
+
+
 class SceneChoiceModelTest(TestCase):
     def setUp(self):
         self.adventure = Adventure.objects.create(
@@ -0,0 +1,63 @@
+from django.contrib import admin
+from django.test import RequestFactory
+from django.urls import reverse
+from rest_framework.test import APITestCase
+from users.models import User
+from adventures.models import Adventure, Scene
+
+
+class SceneSearchTest(APITestCase):
+    def setUp(self):
+        self.admin = User.objects.create_superuser(username="admin", email="admin@example.com", password="testpassword")
+        self.adventure = Adventure.objects.create(
+            title="Test Adventure",
+            description="Test Description",
+            min_level=1,
+            base_xp_reward=100,
+            difficulty="easy"
+        )
+        self.cave = Scene.objects.create(
+            adventure=self.adventure, scene_order=1, title="The cave",
+            content="A dark cave. Deep inside, a dragon sleeps on its gold.",
+        )
+        self.lair = Scene.objects.create(
+            adventure=self.adventure, scene_order=2, title="The dragon lair",
+            content="You enter the lair.",
+        )
+        self.village = Scene.objects.create(
+            adventure=self.adventure, scene_order=3, title="The village",
+            content="Villagers greet you.",
+        )
+        self.url = reverse('scene-search')
+
+    def test_title_matches_rank_first(self):
+        self.client.force_authenticate(user=self.admin)
+        response = self.client.get(self.url, {'q': "dragon"})
+        self.assertEqual(response.status_code, 200)
+        results = response.data['results']
+        self.assertEqual([result['id'] for result in results], [self.lair.pk, self.cave.pk])
+        self.assertIn("<mark>dragon</mark>", results[1]['snippet'])
+        self.assertEqual(results[0]['adventure__title'], "Test Adventure")
+
+    def test_index_follows_edits(self):
+        self.client.force_authenticate(user=self.admin)
+        self.village.content = "A dragon burnt the village."
+        self.village.save()
+        response = self.client.get(self.url, {'q': "burnt dragon"})
+        self.assertEqual([result['id'] for result in response.data['results']], [self.village.pk])
+
+    def test_admin_only(self):
+        user = User.objects.create_user(username="testuser", email="test@example.com", password="testpassword")
+        self.client.force_authenticate(user=user)
+        self.assertEqual(self.client.get(self.url, {'q': "dragon"}).status_code, 403)
+
+    def test_admin_changelist_search(self):
+        request = RequestFactory().get('/admin/adventures/scene/', {'q': "dragon"})
+        request.user = self.admin
+        model_admin = admin.site._registry[Scene]
+        queryset, may_have_duplicates = model_admin.get_search_results(request, Scene.objects.all(), "dragon")
+        self.assertEqual(set(queryset), {self.cave, self.lair})
+        self.assertFalse(may_have_duplicates)
+        # The adventure titles are searched as well
+        queryset, _ = model_admin.get_search_results(request, Scene.objects.all(), "test adventure")
+        self.assertEqual(queryset.count(), 3)
@@ -0,0 +1,6 @@
+from django.urls import path
+from .views import SceneSearchView
+
+urlpatterns = [
+    path('adventures/scenes/search/', SceneSearchView.as_view(), name='scene-search'),
+]
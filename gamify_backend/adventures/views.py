@@ -1,3 +1,17 @@
-from django.shortcuts import render
+from rest_framework import permissions
 
-# Create your views here.
+from gamify_backend.views import FullTextSearchView
+from .models import Scene
+
+
+class SceneSearchView(FullTextSearchView):
+    """Search in the titles and texts of the scenes, for the authors of the adventures."""
+    fulltext_index = 'scenes'
+    permission_classes = [permissions.IsAdminUser]
+
+    def get_queryset(self):
+        queryset = Scene.objects.all()
+        adventure_pk = self.request.query_params.get('adventure')
+        if adventure_pk is not None and adventure_pk.isdigit():
+            queryset = queryset.filter(adventure_id=adventure_pk)
+        return queryset
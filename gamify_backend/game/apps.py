@@ -4,3 +4,18 @@ from django.apps import AppConfig
 class GameConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'game'
+
+    def ready(self):
+        import game.signals
+        from gamify_backend.search import register_catalog
+        from .models import Equipment, Skill
+
+        register_catalog(
+            'skills', Skill, fields=['name', 'skill_type'],
+            values=['id', 'name', 'skill_type', 'character_class', 'unlock_at_level', 'icon'],
+            filters={'is_npc_skill': False},
+        )
+        register_catalog(
+            'equipment', Equipment, fields=['name', 'slot', 'rarity'],
+            values=['id', 'name', 'slot', 'rarity', 'required_level', 'icon'],
+        )
@@ -0,0 +1,141 @@
+"""
+Deterministic fight engine: a fight is a function of the fighters' stats and
+a seed, and is kept as a compact binary log that replays and verifies it.
+
+The rules (also those of game.simulation): each turn the character strikes
+first, for 1 to 2 x level, then the enemy, if still alive, for min_damage to
+max_damage; the fight ends as soon as one of them is at 0 HP or less.
+
+Each fight draws from its own stream, FightRandom(seed), built only on
+random.Random(seed).random(), whose sequence Python keeps across versions
+(randint() is not guaranteed to).
+
+Log layout, little-endian (pack/unpack):
+
+    header   version (B), damage width (c: 'H' or 'I'), seed (Q), level (I),
+             character HP (i), enemy HP (i), enemy min/max damage (I, I)
+    strikes  the damage of each strike, in order: character, enemy, character...
+
+A 20-turn fight is 30 + 80 bytes. The client replays it from the log alone,
+the server verifies it (verify_fight) by playing it again from its seed.
+"""
+import random
+import secrets
+import struct
+import sys
+from array import array
+from dataclasses import dataclass
+
+ENGINE_VERSION = 1
+HEADER = struct.Struct('<BcQIiiII')
+
+
+class FightLogError(ValueError):
+    pass
+
+
+def character_damage_range(level):
+    """Damages of a character's strike, bounds included (shared with game.simulation)."""
+    return 1, level * 2
+
+
+def new_seed():
+    return secrets.randbits(63)
+
+
+class FightRandom:
+    """The draws of one fight."""
+
+    def __init__(self, seed):
+        self._random = random.Random(seed)
+
+    def randint(self, low, high):
+        return low + int(self._random.random() * (high - low + 1))
+
+
+@dataclass(frozen=True)
+class Fight:
+    seed: int
+    level: int
+    character_hp: int
+    enemy_hp: int
+    min_damage: int
+    max_damage: int
+    damages: array
+
+    @property
+    def turns(self):
+        return (len(self.damages) + 1) // 2
+
+    @property
+    def character_hp_left(self):
+        return self.character_hp - sum(self.damages[1::2])
+
+    @property
+    def enemy_hp_left(self):
+        return self.enemy_hp - sum(self.damages[::2])
+
+    @property
+    def winner(self):
+        if not self.damages:
+            return None
+        # The character strikes the odd strikes: the last strike is the winner's
+        return 'character' if len(self.damages) % 2 else 'enemy'
+
+    def pack(self):
+        damages = self.damages
+        if sys.byteorder == 'big':
+            damages = array(damages.typecode, damages)
+            damages.byteswap()
+        header = HEADER.pack(
+            ENGINE_VERSION, damages.typecode.encode(), self.seed, self.level,
+            self.character_hp, self.enemy_hp, self.min_damage, self.max_damage,
+        )
+        return header + damages.tobytes()
+
+    @classmethod
+    def unpack(cls, data):
+        if len(data) < HEADER.size:
+            raise FightLogError("Truncated fight log.")
+        version, typecode, seed, level, character_hp, enemy_hp, min_damage, max_damage = HEADER.unpack_from(data)
+        if version != ENGINE_VERSION:
+            raise FightLogError(f"Unknown fight engine version: {version}.")
+        if typecode not in (b'H', b'I'):
+            raise FightLogError("Malformed fight log.")
+        damages = array(typecode.decode())
+        if (len(data) - HEADER.size) % damages.itemsize:
+            raise FightLogError("Malformed fight log.")
+        damages.frombytes(data[HEADER.size:])
+        if sys.byteorder == 'big':
+            damages.byteswap()
+        return cls(seed, level, character_hp, enemy_hp, min_damage, max_damage, damages)
+
+
+def play_fight(level, character_hp, enemy_hp, min_damage, max_damage, seed=None):
+    """Play a fight from its stats and seed (a new one when None)."""
+    if seed is None:
+        seed = new_seed()
+    rng = FightRandom(seed)
+    low, high = character_damage_range(level)
+    # 2 bytes per strike unless a strike may not fit
+    damages = array('H' if max(high, max_damage) < 2 ** 16 else 'I')
+    character_left, enemy_left = character_hp, enemy_hp
+    while character_left > 0 and enemy_left > 0:
+        damage = rng.randint(low, high)
+        damages.append(damage)
+        enemy_left -= damage
+        if enemy_left <= 0:
+            break
+        damage = rng.randint(min_damage, max_damage)
+        damages.append(damage)
+        character_left -= damage
+    return Fight(seed, level, character_hp, enemy_hp, min_damage, max_damage, damages)
+
+
+def verify_fight(data):
+    """Return the fight of a log once played again from its seed, FightLogError if the log differs."""
+    logged = Fight.unpack(data)
+    played = play_fight(logged.level, logged.character_hp, logged.enemy_hp, logged.min_damage, logged.max_damage, seed=logged.seed)
+    if played.damages.tolist() != logged.damages.tolist():
+        raise FightLogError("The fight log does not match its seed.")
+    return played
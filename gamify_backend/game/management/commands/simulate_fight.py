@@ -0,0 +1,62 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from game.models import Enemy
+from game.simulation import FIGHTS, CharacterProfile, simulate_fights
+from users.models import Character
+
+
+class Command(BaseCommand):
+    help = (
+        "Simulate N fights against an enemy, for a character or a --level/--hp profile, "
+        "and report the win probability, the number of turns and the HP lost."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('enemy', type=int, help="Enemy id.")
+        parser.add_argument('--character', type=int, help="Use the level and HP of this character.")
+        parser.add_argument('--level', type=int, default=1)
+        parser.add_argument('--hp', type=int, default=100)
+        parser.add_argument('--fights', type=int, default=FIGHTS)
+        parser.add_argument('--seed', type=int)
+        # Stats to try before saving them
+        parser.add_argument('--enemy-hp', type=int)
+        parser.add_argument('--min-damage', type=int)
+        parser.add_argument('--max-damage', type=int)
+
+    def handle(self, *args, **options):
+        try:
+            enemy = Enemy.objects.get(pk=options['enemy'])
+        except Enemy.DoesNotExist:
+            raise CommandError(f"Enemy {options['enemy']} does not exist.")
+        for option, field in (('enemy_hp', 'hp'), ('min_damage', 'min_damage'), ('max_damage', 'max_damage')):
+            if options[option] is not None:
+                setattr(enemy, field, options[option])
+        if enemy.min_damage > enemy.max_damage:
+            raise CommandError("The minimum damage is above the maximum damage.")
+
+        if options['character']:
+            try:
+                profile = CharacterProfile.from_character(Character.objects.get(pk=options['character']))
+            except Character.DoesNotExist:
+                raise CommandError(f"Character {options['character']} does not exist.")
+        else:
+            profile = CharacterProfile(level=options['level'], hp=options['hp'])
+
+        simulation = simulate_fights(profile, enemy, fights=options['fights'], seed=options['seed'])
+        summary = simulation.summary()
+        self.stdout.write(
+            f"Level {profile.level}, {profile.hp} HP against {enemy.name} "
+            f"({enemy.hp} HP, {enemy.min_damage}-{enemy.max_damage} damages):"
+        )
+        self.stdout.write(
+            f"  win probability {summary['win_probability']:.1%}, "
+            f"turns mean {summary['mean_turns']:.2f} / p50 {summary['turns_p50']:.0f} / p90 {summary['turns_p90']:.0f} / max {summary['max_turns']}, "
+            f"expected HP lost {summary['expected_hp_lost']:.1f}"
+        )
+        if options['verbosity'] >= 2:
+            for turns, probability in simulation.turn_distribution().items():
+                self.stdout.write(f"  {turns:4d} turns: {probability:.2%}")
+        self.stdout.write(self.style.SUCCESS(
+            f"{simulation.fights} fights simulated in {simulation.seconds:.3f}s "
+            f"({simulation.fights / simulation.seconds if simulation.seconds else 0:.0f} fights/s)."
+        ))
@@ -0,0 +1,45 @@
+# Generated by Django 5.2.7 on 2026-10-16 21:10
+
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def copy_equipment_slot(apps, schema_editor):
+    CharacterEquipment = apps.get_model('game', 'CharacterEquipment')
+    Equipment = apps.get_model('game', 'Equipment')
+    CharacterEquipment.objects.update(
+        slot=Subquery(Equipment.objects.filter(pk=OuterRef('equipment_id')).values('slot')[:1])
+    )
+    # Only the last acquired item of a slot stays equipped
+    seen = set()
+    unequip = []
+    for pk, character_id, slot in (
+        CharacterEquipment.objects.filter(is_equipped=True)
+        .order_by('-acquired_at', '-pk')
+        .values_list('pk', 'character_id', 'slot')
+    ):
+        if (character_id, slot) in seen:
+            unequip.append(pk)
+        seen.add((character_id, slot))
+    CharacterEquipment.objects.filter(pk__in=unequip).update(is_equipped=False)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('game', '0002_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='characterequipment',
+            name='slot',
+            field=models.CharField(default='', editable=False, max_length=20, verbose_name='Equipment slot'),
+            preserve_default=False,
+        ),
+        migrations.RunPython(copy_equipment_slot, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='characterequipment',
+            constraint=models.UniqueConstraint(condition=models.Q(('is_equipped', True)), fields=('character', 'slot'), name='one_equipped_item_per_slot'),
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.2.7 on 2026-10-16 23:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('game', '0003_characterequipment_slot'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MatchupSimulation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=64, unique=True, verbose_name='Content hash of the matchup')),
+                ('enemy_hp', models.IntegerField(verbose_name='Enemy health points')),
+                ('min_damage', models.IntegerField(verbose_name='Enemy minimum damages')),
+                ('max_damage', models.IntegerField(verbose_name='Enemy maximum damages')),
+                ('level', models.IntegerField(verbose_name='Character level')),
+                ('hp', models.IntegerField(verbose_name='Character health points')),
+                ('fights', models.IntegerField(verbose_name='Fights simulated')),
+                ('win_probability', models.FloatField(verbose_name='Win probability')),
+                ('mean_turns', models.FloatField(verbose_name='Mean number of turns')),
+                ('turns_p90', models.FloatField(verbose_name='90th percentile of the number of turns')),
+                ('expected_hp_lost', models.FloatField(verbose_name='Expected HP lost')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Simulation date')),
+            ],
+            options={
+                'verbose_name': 'Matchup simulation',
+                'verbose_name_plural': 'Matchup simulations',
+            },
+        ),
+    ]
@@ -2,6 +2,8 @@ from django.db import models
 from django.core.validators import MinValueValidator
 from django.core.exceptions import ValidationError
 
+from gamify_backend.integrity import save_with_constraint_messages
+
 # from users.models import CharacterClass, Character
 
 class Skill(models.Model):
@@ -38,7 +40,8 @@ class Skill(models.Model):
         return (self.is_active and
             not self.is_npc_skill and
             character.level >= self.unlock_at_level and
-            self.character_class == character.character_class)
+            # The ids: comparing the instances would load both classes
+            self.character_class_id == character.character_class_id)
 
     # **Exemples :**
     # ```
@@ -133,11 +136,20 @@ class CharacterEquipment(models.Model):
     character = models.ForeignKey('users.Character', on_delete=models.CASCADE, related_name="owned_equipments", verbose_name="Character")
     equipment = models.ForeignKey(Equipment, on_delete=models.CASCADE, related_name="characters", verbose_name="Equipment")
     is_equipped = models.BooleanField(default=False, verbose_name="Is currently equipped")
+    # Copy of equipment.slot, so the database can enforce one equipped item per slot
+    slot = models.CharField(max_length=20, editable=False, verbose_name="Equipment slot")
     acquired_at = models.DateTimeField(auto_now_add=True, verbose_name="Acquisition date")
     acquired_from = models.CharField(max_length=50, verbose_name="Source (level_up, adventure...)")
 
     class Meta:
         unique_together = [['character', 'equipment']]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['character', 'slot'],
+                condition=models.Q(is_equipped=True),
+                name='one_equipped_item_per_slot'
+            )
+        ]
         verbose_name = "Character equipment"
         verbose_name_plural = "Characters equipments"
         ordering = ['acquired_at']
@@ -161,19 +173,21 @@ class CharacterEquipment(models.Model):
                 'equipment': f"{self.equipment.name} is reserve to the {self.equipment.required_class.name} class, "
                              f"but you are {self.character.character_class.name}."
             })
-        
-        def save(self, *args, **kwargs):
-            self.full_clean()
-            super().save(*args, **kwargs)
 
-        def __str__(self):
-            status = "Equipped" if self.is_equipped else "In bags"
-            return f"{self.character.name} - {self.equipment.name} [{status}]"
+    def save(self, *args, **kwargs):
+        self.slot = self.equipment.slot
+        # The required level and class (clean()); the equipped slot is left to its constraint
+        self.full_clean(exclude=['slot'], validate_constraints=False)
+        save_with_constraint_messages(self, lambda: super(CharacterEquipment, self).save(*args, **kwargs), {
+            'one_equipped_item_per_slot': lambda: {
+                'is_equipped': f"{self.character.name} already has an equipped {self.slot}. Unequip it first."
+            },
+        })
 
 
     # **Contraintes :**
     # - Paire `(character, equipment)` unique
-    # - Un seul équipement équipé par slot (validation applicative)
+    # - Un seul équipement équipé par slot (contrainte `one_equipped_item_per_slot`)
     # - `equipment.required_level <= character.level`
     # - `equipment.required_class` compatible avec `character.character_class`
 
@@ -204,4 +218,30 @@ class Enemy(models.Model):
     def get_random_damage(self):
         """Return random damages based on the damage range."""
         import random
-        return random.randint(self.min_damage, self.max_damage)
\ No newline at end of file
+        return random.randint(self.min_damage, self.max_damage)
+
+class MatchupSimulation(models.Model):
+    """
+    Result of a simulated matchup (game.simulation), kept by the content hash
+    of its inputs: a matchup is only simulated again when the enemy's stats,
+    the character profile, the number of fights or the rules change.
+    """
+    key = models.CharField(max_length=64, unique=True, verbose_name="Content hash of the matchup")
+    enemy_hp = models.IntegerField(verbose_name="Enemy health points")
+    min_damage = models.IntegerField(verbose_name="Enemy minimum damages")
+    max_damage = models.IntegerField(verbose_name="Enemy maximum damages")
+    level = models.IntegerField(verbose_name="Character level")
+    hp = models.IntegerField(verbose_name="Character health points")
+    fights = models.IntegerField(verbose_name="Fights simulated")
+    win_probability = models.FloatField(verbose_name="Win probability")
+    mean_turns = models.FloatField(verbose_name="Mean number of turns")
+    turns_p90 = models.FloatField(verbose_name="90th percentile of the number of turns")
+    expected_hp_lost = models.FloatField(verbose_name="Expected HP lost")
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name="Simulation date")
+
+    class Meta:
+        verbose_name = "Matchup simulation"
+        verbose_name_plural = "Matchup simulations"
+
+    def __str__(self):
+        return f"Level {self.level} ({self.hp} HP) vs {self.enemy_hp} HP {self.min_damage}-{self.max_damage}: {self.win_probability:.0%}"
@@ -1,75 +1,169 @@
-import random
+from dataclasses import dataclass, field
+
+from django.db import transaction
 from django.utils import timezone
 
+from tracking.models import XPLedgerEntry
+from tracking.services import XPLedgerService
+from users.levels import get_level_curve
+from .fights import play_fight
 from .models import CharacterEquipment, CharacterSkill
 
-def resolve_fight(character, enemy):
+
+def resolve_fight(character, enemy, seed=None):
     """
-    Résout un combat entre un personnage et un ennemi.
-    Retourne un dictionnaire avec le résultat du combat.
+    Résout un combat entre un personnage et un ennemi (voir game.fights).
+    Retourne un dictionnaire avec le résultat du combat, sa graine et son journal
+    compact ('log'), qui suffit à le rejouer et à le vérifier (verify_fight).
     """
+    if not character or not enemy:
+        raise ValueError("Character or enemy missing.")
+
+    fight = play_fight(character.level, character.hp, enemy.hp, enemy.min_damage, enemy.max_damage, seed=seed)
     result = {
-        'character_hp': character.hp,
-        'enemy_hp': enemy.hp,
-        'turns': 0,
-        'winner': None,
+        'character_hp': fight.character_hp_left,
+        'enemy_hp': fight.enemy_hp_left,
+        'turns': fight.turns,
+        'winner': fight.winner,
         'xp_gained': 0,
         'rewards': [],
+        'enemy_id': enemy.pk,
+        'seed': fight.seed,
+        'log': fight.pack(),
     }
+    if fight.winner == 'character':
+        result['xp_gained'] = enemy.xp_reward
+        if enemy.reward:
+            result['rewards'].append(enemy.reward)
+    return result
+
 
-    if not character or not enemy:
-        raise ValueError("Character or enemy missing.")
-    
-    # if character.hp <= 0 or enemy.hp <= 0:
-    #     raise ValueError("The character or the enemy is already defeated.")
 
-    while result['character_hp'] > 0 and result['enemy_hp'] > 0:
-        result['turns'] += 1
+@dataclass
+class RewardGrant:
+    xp: int = 0
+    items: list = field(default_factory=list)
+    skills: list = field(default_factory=list)
+    # (reward, reason) of the rewards the character cannot receive
+    skipped: list = field(default_factory=list)
 
-        # Tour du personnage
-        damage_to_enemy = random.randint(1, character.level * 2)  # Exemple simple
-        result['enemy_hp'] -= damage_to_enemy
 
-        if result['enemy_hp'] <= 0:
-            result['winner'] = 'character'
-            result['xp_gained'] = enemy.xp_reward
-            if enemy.reward:
-                result['rewards'].append(enemy.reward)
-            break
+class RewardService:
+    """
+    Grant XP and rewards (XP, items, skills) in one transaction and a constant
+    number of queries, whatever the number of rewards: one INSERT per kind of
+    row (ledger entries, equipments, skills), then the ledger flush and its
+    single UPDATE of the character. Grants are idempotent: the ledger entries
+    are keyed by the grant, and an item or skill already owned is left as is.
+    """
 
-        # Tour de l'ennemi
-        damage_to_character = enemy.get_random_damage()
-        result['character_hp'] -= damage_to_character
+    @staticmethod
+    def grant(character, rewards, xp=0, source_type='reward', source_id=None, key=None, acquired_from='reward'):
+        """
+        Grant `xp` plus `rewards` (Reward instances, with their item and skill
+        loaded) to `character`. `key` identifies the grant, so granting it twice
+        changes nothing. Items and skills the character could not own (class,
+        level once the XP is added) are skipped. Return a RewardGrant.
+        """
+        key = key or XPLedgerEntry.make_key(source_type, source_id)
+        result = RewardGrant(xp=xp)
+        entries = []
+        if xp:
+            entries.append(XPLedgerEntry(character_id=character.pk, amount=xp, source_type=source_type, source_id=source_id, idempotency_key=key))
+        items, skills = {}, {}
+        for reward in rewards:
+            if reward.type == 'xp':
+                entries.append(XPLedgerEntry(
+                    character_id=character.pk, amount=reward.value, source_type='reward', source_id=reward.pk,
+                    idempotency_key=f"{key}:reward:{reward.pk}",
+                ))
+                result.xp += reward.value
+            elif reward.type in ('item', 'skill'):
+                (items if reward.type == 'item' else skills)[reward.pk] = reward
+            else:
+                result.skipped.append((reward, f"{reward.get_type_display()} rewards are not supported."))
 
-        if result['character_hp'] <= 0:
-            result['winner'] = 'enemy'
-            break
+        # The checks of CharacterEquipment.clean and CharacterSkill.clean, without a query per reward
+        level = get_level_curve().normalize(character.level, character.current_xp + result.xp)[0]
+        equipments, character_skills = [], []
+        for reward in items.values():
+            equipment = reward.item
+            if equipment.required_level > level:
+                result.skipped.append((reward, f"{equipment.name} requires level {equipment.required_level}."))
+            elif equipment.required_class_id and equipment.required_class_id != character.character_class_id:
+                result.skipped.append((reward, f"{equipment.name} is reserved to another class."))
+            else:
+                equipments.append(CharacterEquipment(
+                    character=character, equipment=equipment, slot=equipment.slot, acquired_from=acquired_from,
+                ))
+        for reward in skills.values():
+            skill = reward.skill
+            if skill.character_class_id != character.character_class_id:
+                result.skipped.append((reward, f"{skill.name} is reserved to another class."))
+            elif skill.unlock_at_level > level:
+                result.skipped.append((reward, f"{skill.name} requires level {skill.unlock_at_level}."))
+            else:
+                character_skills.append(CharacterSkill(character=character, skill=skill, acquired_level=level))
+
+        with transaction.atomic():
+            if entries:
+                XPLedgerService.record_many(entries)
+            if equipments:
+                # Already owned: kept as is (unique character/equipment)
+                CharacterEquipment.objects.bulk_create(equipments, ignore_conflicts=True)
+            if character_skills:
+                CharacterSkill.objects.bulk_create(character_skills, ignore_conflicts=True)
+            if entries:
+                XPLedgerService.flush([character.pk])
+        result.items = [equipment.equipment for equipment in equipments]
+        result.skills = [character_skill.skill for character_skill in character_skills]
+        return result
+
+    @staticmethod
+    def apply_fight(character, fight_result):
+        """Grant the XP and rewards of a won fight (see resolve_fight), once per fight."""
+        if fight_result['winner'] != 'character':
+            return RewardGrant()
+        return RewardService.grant(
+            character,
+            fight_result['rewards'],
+            xp=fight_result['xp_gained'],
+            source_type='fight',
+            source_id=fight_result.get('enemy_id'),
+            key=f"fight:{character.pk}:{fight_result['seed']}",
+            acquired_from='fight',
+        )
+
+    @staticmethod
+    def complete_adventure(progress):
+        """
+        Complete an adventure whose current scene is an ending one, and grant its
+        XP and rewards, in one transaction. Return the RewardGrant, None if the
+        progress was already completed (by a concurrent request for instance).
+        """
+        if not progress.current_scene.is_ending_scene:
+            raise ValueError("Current scene is not the end scene.")
+        adventure = progress.adventure
+        rewards = list(adventure.rewards.select_related('item', 'skill'))
+        xp_earned = adventure.base_xp_reward + sum(reward.value for reward in rewards if reward.type == 'xp')
+        with transaction.atomic():
+            completed_at = timezone.now()
+            # The condition makes the completion happen once
+            completed = type(progress).objects.filter(pk=progress.pk, completed=False).update(
+                completed=True, completed_at=completed_at, xp_earned=xp_earned, updated_at=completed_at,
+            )
+            if not completed:
+                return None
+            result = RewardService.grant(
+                progress.character, rewards, xp=adventure.base_xp_reward, source_type='adventure',
+                source_id=adventure.pk, key=f"adventure:{progress.pk}", acquired_from='adventure',
+            )
+        progress.completed, progress.completed_at, progress.xp_earned = True, completed_at, result.xp
+        return result
 
-    return result
 
 def apply_fight_results(character, fight_result):
     """
-    Applique les résultats du combat au personnage (XP, récompenses).
+    Applique les résultats du combat au personnage (XP, récompenses), voir RewardService.
     """
-    if fight_result['winner'] == 'character':
-        character.xp += fight_result['xp_gained']
-        character.save()
-
-        # Appliquer les récompenses (ex: objets, compétences)
-        for reward in fight_result['rewards']:
-            if reward.type == 'xp':
-                character.xp += reward.value
-            elif reward.type == 'item':
-                CharacterEquipment.objects.create(
-                    character=character,
-                    equipment=reward.item,
-                    is_equiped=False
-                )
-            elif reward.type == 'skill':
-                CharacterSkill.objects.create(
-                    character=character,
-                    skill=reward.skill,
-                    acquired_level=character.level
-                )
-
-        character.save()
\ No newline at end of file
+    return RewardService.apply_fight(character, fight_result)
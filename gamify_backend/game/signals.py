@@ -0,0 +1,19 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from .models import Equipment, CharacterEquipment, Skill
+from .unlocks import SKILL_UNLOCKS
+
+@receiver(post_save, sender=Equipment)
+def sync_character_equipment_slot(sender, instance, created, **kwargs):
+    """Keep CharacterEquipment.slot in sync, an equipment moved to another slot is unequipped."""
+    if not created:
+        CharacterEquipment.objects.filter(equipment=instance).exclude(slot=instance.slot).update(
+            slot=instance.slot,
+            is_equipped=False,
+        )
+
+
+@receiver(post_save, sender=Skill)
+@receiver(post_delete, sender=Skill)
+def reset_skill_unlocks(sender, **kwargs):
+    SKILL_UNLOCKS.changed()
@@ -0,0 +1,146 @@
+"""
+Monte Carlo simulation of fights, to balance the enemies' stats.
+
+simulate_fights() plays N fights of a character (or a CharacterProfile) against
+an enemy, saved or not, with the rules of game.fights:
+
+    - each turn the character strikes first, for randint(*character_damage_range()),
+    - the enemy strikes back if still alive, for randint(min_damage, max_damage),
+    - the fight ends as soon as one of them is at 0 HP or less.
+
+The fights are played as NumPy arrays, a block of turns at a time: the strikes
+of the block are drawn at once, their cumulated sums give the turn each fight
+ends, and the next block only plays the fights still running. A character
+strikes for 1 at least, so no fight lasts more than enemy.hp turns.
+
+    simulation = simulate_fights(CharacterProfile(level=5, hp=40), enemy, fights=100_000, seed=0)
+    simulation.win_probability, simulation.mean_turns, simulation.expected_hp_lost
+"""
+import time
+from dataclasses import dataclass
+
+import numpy as np
+
+from .fights import character_damage_range
+
+FIGHTS = 100_000
+# Part of the keys of the stored simulations (see adventures.balance): to bump when the rules change
+SIMULATION_VERSION = 1
+# Strikes drawn per block, all fights together: bounds the memory (~16 MB per array)
+MAX_BLOCK_CELLS = 2_000_000
+
+WON, LOST, NOT_FOUGHT = 1, -1, 0
+
+
+@dataclass(frozen=True)
+class CharacterProfile:
+    """What a fight reads of a character, to simulate characters that don't exist."""
+    level: int
+    hp: int
+
+    @classmethod
+    def from_character(cls, character):
+        return cls(level=character.level, hp=character.hp)
+
+
+@dataclass
+class FightSimulation:
+    # Per fight: WON/LOST/NOT_FOUGHT, number of turns, HP the character lost (up to its HP)
+    outcomes: np.ndarray
+    turns: np.ndarray
+    hp_lost: np.ndarray
+    seconds: float = 0.0
+
+    @property
+    def fights(self):
+        return len(self.outcomes)
+
+    @property
+    def wins(self):
+        return int(np.count_nonzero(self.outcomes == WON))
+
+    @property
+    def losses(self):
+        return int(np.count_nonzero(self.outcomes == LOST))
+
+    @property
+    def win_probability(self):
+        return self.wins / self.fights if self.fights else 0.0
+
+    @property
+    def mean_turns(self):
+        return float(self.turns.mean()) if self.fights else 0.0
+
+    @property
+    def expected_hp_lost(self):
+        return float(self.hp_lost.mean()) if self.fights else 0.0
+
+    def turn_percentile(self, percent):
+        return float(np.percentile(self.turns, percent)) if self.fights else 0.0
+
+    def turn_distribution(self):
+        """{number of turns: probability}, for the numbers of turns that happened."""
+        counts = np.bincount(self.turns)
+        return {turns: count / self.fights for turns, count in enumerate(counts.tolist()) if count}
+
+    def summary(self):
+        return {
+            'fights': self.fights,
+            'win_probability': self.win_probability,
+            'mean_turns': self.mean_turns,
+            'turns_p50': self.turn_percentile(50),
+            'turns_p90': self.turn_percentile(90),
+            'max_turns': int(self.turns.max()) if self.fights else 0,
+            'expected_hp_lost': self.expected_hp_lost,
+        }
+
+
+def first_turn(mask, block):
+    """Index of the first True of each row, `block` when none."""
+    return np.where(mask.any(axis=1), mask.argmax(axis=1), block)
+
+
+def simulate_fights(character, enemy, fights=FIGHTS, seed=None):
+    """Play `fights` fights of `character` against `enemy`; see FightSimulation."""
+    started = time.perf_counter()
+    rng = np.random.default_rng(seed)
+    low, high = character_damage_range(character.level)
+    enemy_low, enemy_high = enemy.min_damage, enemy.max_damage
+
+    character_hp = np.full(fights, character.hp, dtype=np.int64)
+    enemy_hp = np.full(fights, enemy.hp, dtype=np.int64)
+    turns = np.zeros(fights, dtype=np.int64)
+    outcomes = np.full(fights, NOT_FOUGHT, dtype=np.int8)
+    # No turn is played when one of them is already down
+    running = np.arange(fights) if character.hp > 0 and enemy.hp > 0 else np.arange(0)
+
+    # About the expected length of a fight, within the memory bound
+    expected_turns = enemy.hp / ((low + high) / 2)
+    block = int(max(1, min(enemy.hp, 2 * expected_turns + 2, MAX_BLOCK_CELLS // max(fights, 1))))
+
+    while running.size:
+        size = running.size
+        rows = np.arange(size)
+        # HP of the enemy after each strike of the character, and of the character after each strike of the enemy
+        enemy_after = enemy_hp[running, None] - np.cumsum(rng.integers(low, high, size=(size, block), endpoint=True), axis=1)
+        character_after = character_hp[running, None] - np.cumsum(
+            rng.integers(enemy_low, enemy_high, size=(size, block), endpoint=True), axis=1,
+        )
+        kill = first_turn(enemy_after <= 0, block)
+        death = first_turn(character_after <= 0, block)
+        # The character strikes first: the enemy does not strike on the turn it dies
+        won = (kill < block) & (kill <= death)
+        lost = death < kill
+        done = won | lost
+        last = np.minimum(np.minimum(kill, death), block - 1)
+
+        enemy_hp[running] = enemy_after[rows, last]
+        before_kill = np.where(kill > 0, character_after[rows, np.maximum(kill - 1, 0)], character_hp[running])
+        character_hp[running] = np.where(won, before_kill, character_after[rows, last])
+        turns[running] += np.where(done, last + 1, block)
+        outcomes[running[won]] = WON
+        outcomes[running[lost]] = LOST
+        running = running[~done]
+
+    hp_lost = character.hp - np.clip(character_hp, 0, None) if character.hp > 0 else np.zeros(fights, dtype=np.int64)
+    return FightSimulation(outcomes=outcomes, turns=turns, hp_lost=hp_lost, seconds=time.perf_counter() - started)
@@ -0,0 +1,74 @@
+from django.test import SimpleTestCase
+from game.fights import HEADER, Fight, FightLogError, play_fight, verify_fight
+from game.models import Enemy
+from game.services import resolve_fight
+from game.simulation import CharacterProfile
+
+
+class FightEngineTest(SimpleTestCase):
+    def test_same_seed_same_fight(self):
+        first = play_fight(level=3, character_hp=30, enemy_hp=40, min_damage=1, max_damage=5, seed=1234)
+        second = play_fight(level=3, character_hp=30, enemy_hp=40, min_damage=1, max_damage=5, seed=1234)
+        self.assertEqual(first.pack(), second.pack())
+        others = {play_fight(level=3, character_hp=30, enemy_hp=40, min_damage=1, max_damage=5, seed=seed).pack() for seed in range(20)}
+        self.assertGreater(len(others), 1)
+
+    def test_log_replays_the_fight(self):
+        fight = play_fight(level=4, character_hp=50, enemy_hp=80, min_damage=2, max_damage=7, seed=99)
+        data = fight.pack()
+        # 2 bytes per strike after the header
+        self.assertEqual(len(data), HEADER.size + 2 * len(fight.damages))
+        self.assertLess(len(data), 300)
+
+        replayed = Fight.unpack(data)
+        self.assertEqual(replayed, fight)
+        self.assertEqual((replayed.winner, replayed.turns), (fight.winner, fight.turns))
+        low_strikes = replayed.damages[::2]
+        self.assertTrue(all(1 <= damage <= 8 for damage in low_strikes))
+        self.assertTrue(all(2 <= damage <= 7 for damage in replayed.damages[1::2]))
+
+        # The last strike ends the fight
+        if fight.winner == 'character':
+            self.assertLessEqual(fight.enemy_hp_left, 0)
+            self.assertGreater(fight.enemy_hp_left + fight.damages[-1], 0)
+        else:
+            self.assertLessEqual(fight.character_hp_left, 0)
+
+    def test_verify(self):
+        data = play_fight(level=2, character_hp=20, enemy_hp=30, min_damage=1, max_damage=4, seed=7).pack()
+        self.assertEqual(verify_fight(data).pack(), data)
+
+        tampered = bytearray(data)
+        tampered[HEADER.size] ^= 0x01  # First strike of the character
+        with self.assertRaises(FightLogError):
+            verify_fight(bytes(tampered))
+        with self.assertRaises(FightLogError):
+            verify_fight(data[:-1])
+        with self.assertRaises(FightLogError):
+            verify_fight(data[:10])
+        with self.assertRaises(FightLogError):
+            verify_fight(b'\x09' + data[1:])  # Unknown version
+
+    def test_wide_damages(self):
+        fight = play_fight(level=1, character_hp=10, enemy_hp=100, min_damage=70_000, max_damage=80_000, seed=3)
+        self.assertEqual(fight.damages.typecode, 'I')
+        self.assertEqual(fight.winner, 'enemy')
+        self.assertEqual(verify_fight(fight.pack()).damages[1], fight.damages[1])
+
+    def test_no_fight_when_down(self):
+        fight = play_fight(level=2, character_hp=0, enemy_hp=10, min_damage=1, max_damage=2, seed=1)
+        self.assertEqual((fight.winner, fight.turns, len(fight.pack())), (None, 0, HEADER.size))
+
+    def test_resolve_fight(self):
+        enemy = Enemy(name="Wolf", hp=25, min_damage=1, max_damage=5, xp_reward=30)
+        result = resolve_fight(CharacterProfile(level=3, hp=30), enemy, seed=5)
+        self.assertEqual(result, resolve_fight(CharacterProfile(level=3, hp=30), enemy, seed=5))
+        fight = verify_fight(result['log'])
+        self.assertEqual(fight.seed, result['seed'])
+        self.assertEqual((fight.winner, fight.turns, fight.character_hp_left, fight.enemy_hp_left),
+                         (result['winner'], result['turns'], result['character_hp'], result['enemy_hp']))
+        self.assertEqual(result['xp_gained'], 30 if result['winner'] == 'character' else 0)
+
+        # Without a seed, each fight gets its own
+        self.assertNotEqual(resolve_fight(CharacterProfile(level=3, hp=30), enemy)['seed'],
+                            resolve_fight(CharacterProfile(level=3, hp=30), enemy)['seed'])
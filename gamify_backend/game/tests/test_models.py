@@ -201,7 +201,8 @@ class CharacterEquipmentModelTest(TestCase):
         character_equipment = CharacterEquipment.objects.create(
             character=self.character,
             equipment=self.equipment,
-            is_equipped=True
+            is_equipped=True,
+            acquired_from="adventure"
         )
         self.assertEqual(character_equipment.character, self.character)
         self.assertEqual(character_equipment.equipment, self.equipment)
@@ -215,8 +216,10 @@ class CharacterEquipmentModelTest(TestCase):
         with self.assertRaises(ValidationError):
             CharacterEquipment.objects.create(
                 character=self.character,
-                equipment=self.equipment
-            ).full_clean()
+                equipment=self.equipment,
+                acquired_from="adventure"
+            )
+        self.assertFalse(CharacterEquipment.objects.exists())
 
         other_class = CharacterClass.objects.create(
             name="Warrior",
@@ -233,8 +236,30 @@ class CharacterEquipmentModelTest(TestCase):
         with self.assertRaises(ValidationError):
             CharacterEquipment.objects.create(
                 character=other_character,
-                equipment=self.equipment  # Classe requise = Mage
-            ).full_clean()
+                equipment=self.equipment,  # Classe requise = Mage
+                acquired_from="adventure"
+            )
+        self.assertFalse(CharacterEquipment.objects.exists())
+
+
+    def test_one_equipped_item_per_slot(self):
+        """Test that a character cannot equip two items in the same slot."""
+        other_staff = Equipment.objects.create(name="Old Staff", description="An old staff.", slot="weapon", rarity="common")
+        CharacterEquipment.objects.create(character=self.character, equipment=self.equipment, is_equipped=True, acquired_from="adventure")
+        owned = CharacterEquipment.objects.create(character=self.character, equipment=other_staff, acquired_from="adventure")
+        self.assertEqual(owned.slot, "weapon")
+        owned.is_equipped = True
+        with self.assertRaises(ValidationError) as context:
+            owned.save()
+        self.assertIn('is_equipped', context.exception.message_dict)
+
+    def test_equipment_slot_change(self):
+        """Test that moving an equipment to another slot keeps the copies in sync."""
+        owned = CharacterEquipment.objects.create(character=self.character, equipment=self.equipment, is_equipped=True, acquired_from="adventure")
+        self.equipment.slot = "relic"
+        self.equipment.save()
+        owned.refresh_from_db()
+        self.assertEqual((owned.slot, owned.is_equipped), ("relic", False))
 
 
 class EnemyModelTest(TestCase):
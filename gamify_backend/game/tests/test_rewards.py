@@ -0,0 +1,140 @@
+from unittest import mock
+
+from django.contrib import admin
+from django.db import connection
+from django.test import RequestFactory, TestCase
+from django.test.utils import CaptureQueriesContext
+from users.models import User, Character, Race, CharacterClass
+from adventures.models import Adventure, AdventureProgress, Reward, Scene
+from game.models import CharacterEquipment, CharacterSkill, Enemy, Equipment, Skill
+from game.services import RewardService, apply_fight_results, resolve_fight
+from tracking.models import XPLedgerEntry
+
+
+class RewardServiceTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="testuser", email="test@example.com", password="testpassword")
+        self.race = Race.objects.create(name="Human", description="Humans are versatile.")
+        self.warrior = CharacterClass.objects.create(name="Warrior", description="Strong.", primary_attribute="Strength")
+        self.mage = CharacterClass.objects.create(name="Mage", description="Casts spells.", primary_attribute="Intelligence")
+        self.character = Character.objects.create(user=self.user, name="TestChar", race=self.race, character_class=self.warrior)
+
+    def chest(self, size, prefix):
+        """`size` rewards: XP, items and skills in turn."""
+        rewards = []
+        for index in range(size):
+            kind = ('xp', 'item', 'skill')[index % 3]
+            reward = Reward(type=kind, value=10, description=f"{prefix} {index}")
+            if kind == 'item':
+                reward.item = Equipment.objects.create(name=f"{prefix} item {index}", description="Loot.", slot="relic", rarity="common")
+            elif kind == 'skill':
+                reward.skill = Skill.objects.create(name=f"{prefix} skill {index}", description="A skill.", character_class=self.warrior, unlock_at_level=1)
+            reward.save()
+            rewards.append(reward)
+        return rewards
+
+    def test_chest(self):
+        result = RewardService.grant(self.character, self.chest(10, "Chest"), xp=100, source_type='reward', key="chest:1")
+        self.assertEqual((result.xp, len(result.items), len(result.skills), result.skipped), (140, 3, 3, []))
+        self.character.refresh_from_db()
+        self.assertEqual(self.character.total_xp, 140)
+        self.assertEqual(CharacterEquipment.objects.filter(character=self.character, slot="relic", is_equipped=False).count(), 3)
+        self.assertEqual(CharacterSkill.objects.filter(character=self.character).count(), 3)
+        self.assertFalse(XPLedgerEntry.objects.filter(applied_at__isnull=True).exists())
+
+    def test_constant_number_of_queries(self):
+        small, large = self.chest(3, "Small"), self.chest(10, "Large")
+        other = Character.objects.create(user=self.user, name="OtherChar", race=self.race, character_class=self.warrior)
+        with CaptureQueriesContext(connection) as small_queries:
+            RewardService.grant(self.character, small, xp=50, key="chest:small")
+        with CaptureQueriesContext(connection) as large_queries:
+            RewardService.grant(other, large, xp=50, key="chest:large")
+        self.assertEqual(len(large_queries), len(small_queries))
+        self.assertEqual(sum('UPDATE "users_character"' in query['sql'] for query in large_queries), 1)
+
+    def test_granted_once(self):
+        rewards = self.chest(6, "Chest")
+        RewardService.grant(self.character, rewards, xp=100, key="chest:1")
+        RewardService.grant(self.character, rewards, xp=100, key="chest:1")
+        self.character.refresh_from_db()
+        self.assertEqual(self.character.total_xp, 120)
+        self.assertEqual(CharacterEquipment.objects.filter(character=self.character).count(), 2)
+
+    def test_rewards_the_character_cannot_receive(self):
+        rewards = [
+            Reward.objects.create(type='skill', value=0, description="Fire", skill=Skill.objects.create(
+                name="Fireball", description="Fire.", character_class=self.mage, unlock_at_level=1)),
+            Reward.objects.create(type='item', value=0, description="Axe", item=Equipment.objects.create(
+                name="Great axe", description="Heavy.", slot="weapon", rarity="rare", required_level=50)),
+            Reward.objects.create(type='currency', value=100, description="Gold"),
+        ]
+        result = RewardService.grant(self.character, rewards, key="chest:1")
+        self.assertEqual([reason for _, reason in result.skipped], [
+            "Currency rewards are not supported.",
+            "Great axe requires level 50.",
+            "Fireball is reserved to another class.",
+        ])
+        self.assertFalse(CharacterEquipment.objects.exists())
+        self.assertFalse(CharacterSkill.objects.exists())
+
+    def test_fight(self):
+        reward = self.chest(2, "Loot")[1]
+        enemy = Enemy.objects.create(name="Rat", hp=1, min_damage=0, max_damage=1, xp_reward=25, reward=reward)
+        fight = resolve_fight(self.character, enemy, seed=1)
+        self.assertEqual(fight['winner'], 'character')
+        result = apply_fight_results(self.character, fight)
+        self.assertEqual(([item.name for item in result.items], result.xp), (["Loot item 1"], 25))
+        apply_fight_results(self.character, fight)  # The same fight again
+        self.character.refresh_from_db()
+        self.assertEqual(self.character.total_xp, 25)
+        self.assertEqual(XPLedgerEntry.objects.get().idempotency_key, f"fight:{self.character.pk}:1")
+
+        lost = resolve_fight(self.character, Enemy(hp=100, min_damage=50, max_damage=50, xp_reward=25), seed=2)
+        self.assertEqual(apply_fight_results(self.character, lost).xp, 0)
+
+    def test_adventure_completion(self):
+        adventure = Adventure.objects.create(title="Quest", description="A quest.", min_level=1, base_xp_reward=200, difficulty="easy")
+        adventure.rewards.set(self.chest(4, "Quest"))
+        start = Scene.objects.create(adventure=adventure, scene_order=1, title="Start", content="Go.", is_starting_scene=True)
+        end = Scene.objects.create(adventure=adventure, scene_order=2, title="End", content="Done.", is_ending_scene=True)
+        progress = AdventureProgress.objects.create(character=self.character, adventure=adventure, current_scene=start)
+        with self.assertRaises(ValueError):
+            RewardService.complete_adventure(progress)
+
+        progress.current_scene = end
+        progress.save()
+        result = RewardService.complete_adventure(progress)
+        self.assertEqual((result.xp, len(result.items), len(result.skills)), (220, 1, 1))
+        progress.refresh_from_db()
+        self.assertTrue(progress.completed)
+        self.assertEqual(progress.xp_earned, 220)
+        self.assertIsNotNone(progress.completed_at)
+
+        self.assertIsNone(RewardService.complete_adventure(progress))
+        self.character.refresh_from_db()
+        self.assertEqual(self.character.total_xp, 220)
+
+    def test_manual_completions_grant_rewards(self):
+        """Test that the model method and the admin action go through complete_adventure()."""
+        adventure = Adventure.objects.create(title="Quest", description="A quest.", min_level=1, base_xp_reward=200, difficulty="easy")
+        start = Scene.objects.create(adventure=adventure, scene_order=1, title="Start", content="Go.", is_starting_scene=True)
+        end = Scene.objects.create(adventure=adventure, scene_order=2, title="End", content="Done.", is_ending_scene=True)
+        other = Character.objects.create(user=self.user, name="Other", race=self.race, character_class=self.warrior)
+        third = Character.objects.create(user=self.user, name="Third", race=self.race, character_class=self.warrior)
+
+        progress = AdventureProgress.objects.create(character=self.character, adventure=adventure, current_scene=end)
+        self.assertEqual(progress.mark_as_completed().xp, 200)
+        self.assertIsNone(progress.mark_as_completed())
+
+        finished = AdventureProgress.objects.create(character=other, adventure=adventure, current_scene=end)
+        ongoing = AdventureProgress.objects.create(character=third, adventure=adventure, current_scene=start)
+        model_admin = admin.site._registry[AdventureProgress]
+        request = RequestFactory().post('/admin/adventures/adventureprogress/')
+        with mock.patch.object(model_admin, 'message_user'):
+            model_admin.mark_as_completed(request, AdventureProgress.objects.filter(pk__in=[progress.pk, finished.pk, ongoing.pk]))
+        self.assertEqual(
+            dict(Character.objects.filter(pk__in=[self.character.pk, other.pk, third.pk]).values_list('name', 'total_xp')),
+            {"TestChar": 200, "Other": 200, "Third": 0},
+        )
+        ongoing.refresh_from_db()
+        self.assertFalse(ongoing.completed)
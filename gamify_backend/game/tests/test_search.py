@@ -0,0 +1,30 @@
+from django.urls import reverse
+from rest_framework.test import APITestCase
+from users.models import User, CharacterClass
+from game.models import Skill, Equipment
+
+
+class CatalogAutocompleteTest(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="testuser", email="test@example.com", password="testpassword")
+        self.client.force_authenticate(user=self.user)
+        self.character_class = CharacterClass.objects.create(name="Mage", description="Casts spells.", primary_attribute="Intelligence")
+        for name, is_npc_skill in (("Fireball", False), ("Fire Shield", False), ("Fire Breath", True)):
+            Skill.objects.create(
+                name=name, description="Fire.", character_class=self.character_class,
+                unlock_at_level=3, is_npc_skill=is_npc_skill,
+            )
+        Equipment.objects.create(name="Épée de Fer", description="A sword.", slot="weapon", rarity="common")
+        Equipment.objects.create(name="Bouclier", description="A shield.", slot="armor", rarity="rare")
+
+    def search(self, catalog, text):
+        response = self.client.get(reverse('autocomplete', kwargs={'catalog': catalog}), {'q': text})
+        self.assertEqual(response.status_code, 200)
+        return [row['name'] for row in response.data['results']]
+
+    def test_skills_without_npc_skills(self):
+        self.assertEqual(self.search('skills', "fire"), ["Fireball", "Fire Shield"])
+
+    def test_equipment(self):
+        self.assertEqual(self.search('equipment', "epee"), ["Épée de Fer"])
+        self.assertEqual(self.search('equipment', "rare"), ["Bouclier"])
@@ -0,0 +1,72 @@
+import io
+
+import numpy as np
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase
+from game.models import Enemy
+from game.services import resolve_fight
+from game.simulation import LOST, NOT_FOUGHT, WON, CharacterProfile, simulate_fights
+
+
+class FightSimulationTest(SimpleTestCase):
+    def test_agrees_with_resolve_fight(self):
+        """Test that the simulation and resolve_fight give the same statistics."""
+        for profile, enemy in (
+            (CharacterProfile(level=5, hp=40), Enemy(name="Orc", hp=60, min_damage=2, max_damage=6)),
+            (CharacterProfile(level=3, hp=30), Enemy(name="Wolf", hp=25, min_damage=1, max_damage=5)),
+            (CharacterProfile(level=2, hp=20), Enemy(name="Rat", hp=20, min_damage=0, max_damage=3)),
+        ):
+            with self.subTest(enemy=enemy.name):
+                played = [resolve_fight(profile, enemy, seed=seed) for seed in range(4000)]
+                simulation = simulate_fights(profile, enemy, fights=100_000, seed=0)
+
+                win_probability = sum(fight['winner'] == 'character' for fight in played) / len(played)
+                mean_turns = sum(fight['turns'] for fight in played) / len(played)
+                hp_lost = sum(profile.hp - max(fight['character_hp'], 0) for fight in played) / len(played)
+                self.assertAlmostEqual(simulation.win_probability, win_probability, delta=0.03)
+                self.assertAlmostEqual(simulation.mean_turns, mean_turns, delta=0.25)
+                self.assertAlmostEqual(simulation.expected_hp_lost, hp_lost, delta=1.0)
+                self.assertEqual(simulation.wins + simulation.losses, simulation.fights)
+
+    def test_certain_outcomes(self):
+        simulation = simulate_fights(CharacterProfile(level=4, hp=10), Enemy(hp=1, min_damage=5, max_damage=9), fights=1000)
+        self.assertTrue(np.all(simulation.outcomes == WON))
+        self.assertEqual(simulation.turn_distribution(), {1: 1.0})
+        self.assertEqual(simulation.expected_hp_lost, 0)
+
+        # A level 1 character strikes for 2 at most: dead on the first strike of the enemy
+        simulation = simulate_fights(CharacterProfile(level=1, hp=3), Enemy(hp=100, min_damage=3, max_damage=3), fights=1000)
+        self.assertTrue(np.all(simulation.outcomes == LOST))
+        self.assertEqual((simulation.mean_turns, simulation.expected_hp_lost), (1.0, 3.0))
+
+    def test_turns_of_a_harmless_enemy(self):
+        """Test that long fights span several blocks of turns."""
+        simulation = simulate_fights(CharacterProfile(level=1, hp=10), Enemy(hp=300, min_damage=0, max_damage=0), fights=5000, seed=1)
+        self.assertEqual(simulation.win_probability, 1.0)
+        self.assertAlmostEqual(simulation.mean_turns, 200, delta=2)  # 1.5 per strike
+        self.assertLessEqual(simulation.summary()['max_turns'], 300)
+
+    def test_no_fight_when_down(self):
+        simulation = simulate_fights(CharacterProfile(level=3, hp=0), Enemy(hp=10, min_damage=1, max_damage=2), fights=10)
+        self.assertTrue(np.all(simulation.outcomes == NOT_FOUGHT))
+        self.assertEqual((simulation.win_probability, simulation.mean_turns, simulation.expected_hp_lost), (0.0, 0.0, 0.0))
+
+    def test_seeded_runs_repeat(self):
+        enemy = Enemy(hp=50, min_damage=1, max_damage=8)
+        first = simulate_fights(CharacterProfile(level=4, hp=35), enemy, fights=2000, seed=42)
+        second = simulate_fights(CharacterProfile(level=4, hp=35), enemy, fights=2000, seed=42)
+        self.assertTrue(np.array_equal(first.turns, second.turns))
+        self.assertTrue(np.array_equal(first.hp_lost, second.hp_lost))
+
+
+class SimulateFightCommandTest(TestCase):
+    def test_command(self):
+        enemy = Enemy.objects.create(name="Goblin", hp=30, min_damage=1, max_damage=4)
+        out = io.StringIO()
+        call_command('simulate_fight', enemy.pk, '--level', '3', '--hp', '25', '--fights', '1000', '--seed', '0', '--max-damage', '6', stdout=out)
+        output = out.getvalue()
+        self.assertIn("Level 3, 25 HP against Goblin (30 HP, 1-6 damages)", output)
+        self.assertIn("win probability", output)
+        self.assertIn("1000 fights simulated", output)
+        enemy.refresh_from_db()
+        self.assertEqual(enemy.max_damage, 4)
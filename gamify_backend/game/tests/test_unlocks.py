@@ -0,0 +1,82 @@
+from django.urls import reverse
+from rest_framework.test import APITestCase
+from users.models import User, Character, Race, CharacterClass
+from game.models import Skill
+from game.serializers import SkillSerializer
+from game.unlocks import SkillUnlockTable, get_skill_unlocks
+
+
+class SkillUnlocksTest(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="testuser", email="test@example.com", password="testpassword")
+        self.client.force_authenticate(user=self.user)
+        race = Race.objects.create(name="Elf", description="Agile and wise.")
+        self.mage = CharacterClass.objects.create(name="Mage", description="Casts spells.", primary_attribute="Intelligence")
+        self.warrior = CharacterClass.objects.create(name="Warrior", description="Hits hard.", primary_attribute="Strength")
+        self.character = Character.objects.create(user=self.user, name="Gandalf", race=race, character_class=self.mage, level=5)
+        self.skills = {}
+        for name, character_class, level, is_active, is_npc_skill in (
+            ("Spark", self.mage, 1, True, False),
+            ("Mana Flow", self.mage, 3, False, False),
+            ("Fireball", self.mage, 5, True, False),
+            ("Ice Shard", self.mage, 7, True, False),
+            ("Frost Armor", self.mage, 7, False, False),
+            ("Meteor", self.mage, 12, True, False),
+            ("Fire Breath", self.mage, 1, True, True),
+            ("Cleave", self.warrior, 1, True, False),
+        ):
+            self.skills[name] = Skill.objects.create(
+                name=name, description="A skill.", character_class=character_class,
+                unlock_at_level=level, is_active=is_active, is_npc_skill=is_npc_skill,
+            )
+
+    def names(self, ids):
+        return [Skill.objects.get(pk=pk).name for pk in ids]
+
+    def test_table(self):
+        table = SkillUnlockTable(Skill.objects.filter(is_npc_skill=False))
+        self.assertEqual(self.names(table.unlocked(self.mage.pk, 5)), ["Spark", "Mana Flow", "Fireball"])
+        self.assertEqual(self.names(table.upcoming(self.mage.pk, 5)), ["Frost Armor", "Ice Shard"])
+        self.assertEqual(self.names(table.locked(self.mage.pk, 5)), ["Frost Armor", "Ice Shard", "Meteor"])
+        self.assertEqual(self.names(table.unlocked(self.mage.pk, 0)), [])
+        self.assertEqual(self.names(table.upcoming(self.mage.pk, 0)), ["Spark"])
+        self.assertEqual(self.names(table.unlocked(self.mage.pk, 50)), ["Spark", "Mana Flow", "Fireball", "Frost Armor", "Ice Shard", "Meteor"])
+        self.assertEqual(table.upcoming(self.mage.pk, 50), [])
+        self.assertEqual(table.unlocked(0, 5), [])
+
+    def test_endpoint(self):
+        get_skill_unlocks()
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse('character-skills', kwargs={'character_pk': self.character.pk}))
+        self.assertEqual(response.status_code, 200)
+        names = {group: [skill['name'] for skill in response.data[group]] for group in ('usable', 'passive', 'locked', 'upcoming')}
+        self.assertEqual(names, {
+            'usable': ["Spark", "Fireball"],
+            'passive': ["Mana Flow"],
+            'locked': ["Frost Armor", "Ice Shard", "Meteor"],
+            'upcoming': ["Frost Armor", "Ice Shard"],
+        })
+        self.assertTrue(all(skill['is_usable'] for skill in response.data['usable']))
+        self.assertFalse(any(skill['is_usable'] for skill in response.data['locked']))
+
+    def test_skill_changes_rebuild_the_table(self):
+        self.assertEqual(len(get_skill_unlocks()), 7)
+        meteor = self.skills["Meteor"]
+        meteor.unlock_at_level = 4
+        meteor.save()
+        self.assertIn(meteor.pk, get_skill_unlocks().unlocked(self.mage.pk, 5))
+        meteor.delete()
+        self.assertEqual(len(get_skill_unlocks()), 6)
+
+    def test_other_users_characters(self):
+        other = User.objects.create_user(username="other", email="other@example.com", password="testpassword")
+        self.client.force_authenticate(user=other)
+        response = self.client.get(reverse('character-skills', kwargs={'character_pk': self.character.pk}))
+        self.assertEqual(response.status_code, 404)
+
+    def test_serializer_is_usable_without_queries(self):
+        skills = list(Skill.objects.filter(character_class=self.mage))
+        character = Character.objects.get(pk=self.character.pk)
+        with self.assertNumQueries(0):
+            data = SkillSerializer(skills, many=True, context={'character': character}).data
+        self.assertEqual({skill['name'] for skill in data if skill['is_usable']}, {"Spark", "Fireball"})
@@ -0,0 +1,91 @@
+"""
+Skill unlocks per (character class, level), with no query per skill.
+
+The player skills (not the NPC ones) are loaded once per process into a table:
+per class, its skills ordered by unlock level, and for every level up to the
+last unlock level, where the unlocked ones end and where the next ones to
+unlock end. A lookup is then two slices of the class' list:
+
+    unlocks = get_skill_unlocks()
+    unlocks.unlocked(class_id, level)   # unlock_at_level <= level
+    unlocks.upcoming(class_id, level)   # those of the next unlock level
+    unlocks.locked(class_id, level)     # every other one, upcoming included
+
+A save or a delete of a Skill rebuilds the table (see gamify_backend.localindex);
+an update() of the Skill queryset sends no signal, call SKILL_UNLOCKS.changed()
+after one.
+"""
+from collections import defaultdict
+
+from gamify_backend.localindex import LocalIndex
+from .models import Skill
+
+
+class SkillUnlockTable:
+    def __init__(self, skills):
+        self.skills = {skill.pk: skill for skill in skills}
+        by_class = defaultdict(list)
+        for skill in sorted(self.skills.values(), key=lambda skill: (skill.unlock_at_level, skill.name)):
+            by_class[skill.character_class_id].append(skill)
+        # {class id: [skill ids by unlock level]}, {class id: [(unlocked end, upcoming end) per level]}
+        self.ids = {}
+        self.bounds = {}
+        for class_id, class_skills in by_class.items():
+            levels = [skill.unlock_at_level for skill in class_skills]
+            self.ids[class_id] = [skill.pk for skill in class_skills]
+            self.bounds[class_id] = bounds = []
+            unlocked = 0
+            for level in range(levels[-1] + 1):
+                while unlocked < len(levels) and levels[unlocked] <= level:
+                    unlocked += 1
+                upcoming = unlocked
+                while upcoming < len(levels) and levels[upcoming] == levels[unlocked]:
+                    upcoming += 1
+                bounds.append((unlocked, upcoming))
+
+    def __len__(self):
+        return len(self.skills)
+
+    def split(self, class_id, level):
+        """(unlocked, upcoming) ends in the skill ids of the class."""
+        bounds = self.bounds.get(class_id)
+        if not bounds:
+            return 0, 0
+        if level >= len(bounds):
+            return bounds[-1]
+        return bounds[max(level, 0)]
+
+    def unlocked(self, class_id, level):
+        unlocked, _ = self.split(class_id, level)
+        return self.ids.get(class_id, [])[:unlocked]
+
+    def upcoming(self, class_id, level):
+        unlocked, upcoming = self.split(class_id, level)
+        return self.ids.get(class_id, [])[unlocked:upcoming]
+
+    def locked(self, class_id, level):
+        unlocked, _ = self.split(class_id, level)
+        return self.ids.get(class_id, [])[unlocked:]
+
+    def available(self, character):
+        """{'usable', 'passive', 'locked', 'upcoming'}: the skills of the character's class, by unlock level."""
+        class_id, level = character.character_class_id, character.level
+        unlocked = [self.skills[pk] for pk in self.unlocked(class_id, level)]
+        return {
+            'usable': [skill for skill in unlocked if skill.is_active],
+            'passive': [skill for skill in unlocked if not skill.is_active],
+            'locked': [self.skills[pk] for pk in self.locked(class_id, level)],
+            'upcoming': [self.skills[pk] for pk in self.upcoming(class_id, level)],
+        }
+
+
+class SkillUnlocks(LocalIndex):
+    def build(self):
+        return SkillUnlockTable(Skill.objects.filter(is_npc_skill=False).order_by('pk'))
+
+
+SKILL_UNLOCKS = SkillUnlocks('game:skill-unlocks:generation')
+
+
+def get_skill_unlocks():
+    return SKILL_UNLOCKS.index()
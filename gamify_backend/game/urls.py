@@ -0,0 +1,6 @@
+from django.urls import path
+from .views import AvailableSkillsView
+
+urlpatterns = [
+    path('characters/<int:character_pk>/skills/', AvailableSkillsView.as_view(), name='character-skills'),
+]
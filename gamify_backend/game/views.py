@@ -1,3 +1,27 @@
-from django.shortcuts import render
+from django.shortcuts import get_object_or_404
+from rest_framework import generics, permissions
+from rest_framework.response import Response
+from users.models import Character
+from .serializers import SkillSerializer
+from .unlocks import get_skill_unlocks
 
-# Create your views here.
+
+class AvailableSkillsView(generics.GenericAPIView):
+    """
+    The skills of a character's class: usable (active and unlocked), passive
+    (unlocked), locked, and upcoming (the locked ones of the next unlock level).
+    One query, on the character; the skills come from the unlock table.
+    """
+    serializer_class = SkillSerializer
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request, character_pk):
+        # Only the characters of the authenticated user
+        character = get_object_or_404(Character, pk=character_pk, user_id=request.user.pk)
+        context = {**self.get_serializer_context(), 'character': character}
+        skills = get_skill_unlocks().available(character)
+        return Response({
+            'character': character.pk,
+            'level': character.level,
+            **{name: SkillSerializer(group, many=True, context=context).data for name, group in skills.items()},
+        })
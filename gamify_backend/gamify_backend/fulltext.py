@@ -0,0 +1,201 @@
+"""
+Full-text search over long texts (activity notes, scene content), ranked and
+with highlighted snippets, without scanning the tables with LIKE.
+
+An index is registered on a model and some of its text fields, then searched
+within a queryset (the rows the user may see):
+
+    register_fulltext_index('activity-notes', Activity, fields=['notes'], values=['id', 'character_id', 'created_at'])
+    get_fulltext_index('activity-notes').search("park run", queryset=Activity.objects.filter(character__user=user))
+
+Each result is the `values` of the row, plus its 'rank' (higher first) and a
+'snippet' of the text, HTML-escaped, the matched words in <mark></mark>.
+
+The backend depends on the database:
+
+    - SQLite: an FTS5 table `<table>_fts` with external content (the text is
+      not copied), kept in sync by triggers on the source table, so bulk_create,
+      update() and raw deletes are indexed too. Ranking by bm25(), snippet().
+      The table and its triggers are created by a migration (install_sqlite_index);
+      Django rebuilds a SQLite table to alter some of its columns, which drops
+      its triggers: run `manage.py rebuild_fulltext` after such a migration.
+    - PostgreSQL: the tsvector is computed by the query (SearchVector,
+      SearchRank, SearchHeadline); an expression GIN index can come later
+      without changing the callers.
+    - Others: icontains on every word, unranked.
+
+Every word typed must match, as a prefix of a word on SQLite ("run" finds
+"running"); the query syntax of the backend is never exposed.
+"""
+import html
+import re
+
+from django.db import connections
+from django.db.models import Q
+
+MAX_LIMIT = 50  # Results per API request
+SNIPPET_WORDS = 12
+# Around the matched words in the snippets, replaced by <mark> once escaped
+START, STOP = '\x02', '\x03'
+ELLIPSIS = '…'
+
+
+def query_words(text):
+    return re.findall(r'\w+', str(text or ''))
+
+
+def highlight(snippet):
+    """Escape a snippet of the backend, then mark its matched words."""
+    return html.escape(snippet or '').replace(START, '<mark>').replace(STOP, '</mark>')
+
+
+def fts_table(table):
+    return f'{table}_fts'
+
+
+def install_sqlite_index(connection, table, fields):
+    """Create (if missing) the FTS5 table and the triggers indexing `fields` of `table`, and fill it."""
+    fts = fts_table(table)
+    columns = ', '.join(fields)
+    new_values = ', '.join(f'new.{field}' for field in fields)
+    old_values = ', '.join(f'old.{field}' for field in fields)
+    delete_old = f"INSERT INTO {fts}({fts}, rowid, {columns}) VALUES ('delete', old.id, {old_values});"
+    insert_new = f"INSERT INTO {fts}(rowid, {columns}) VALUES (new.id, {new_values});"
+    statements = [
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5({columns}, content='{table}', content_rowid='id', "
+        f"tokenize='unicode61 remove_diacritics 2')",
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_insert AFTER INSERT ON {table} BEGIN {insert_new} END",
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_delete AFTER DELETE ON {table} BEGIN {delete_old} END",
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_update AFTER UPDATE OF {columns} ON {table} BEGIN {delete_old} {insert_new} END",
+        # Index the existing rows again from the source table
+        f"INSERT INTO {fts}({fts}) VALUES ('rebuild')",
+    ]
+    with connection.cursor() as cursor:
+        for statement in statements:
+            cursor.execute(statement)
+
+
+def drop_sqlite_index(connection, table):
+    fts = fts_table(table)
+    with connection.cursor() as cursor:
+        for trigger in ('insert', 'delete', 'update'):
+            cursor.execute(f"DROP TRIGGER IF EXISTS {fts}_{trigger}")
+        cursor.execute(f"DROP TABLE IF EXISTS {fts}")
+
+
+class SQLiteBackend:
+    def install(self, index, connection):
+        install_sqlite_index(connection, index.model._meta.db_table, index.fields)
+
+    def search(self, index, text, queryset, limit):
+        """Return [(pk, rank, snippet)] of the rows of `queryset` matching `text`, best first."""
+        words = query_words(text)
+        if not words:
+            return []
+        # Each word quoted (no FTS5 operator from the user), as a prefix, all required
+        match = ' '.join(f'"{word}"*' for word in words)
+        fts = fts_table(index.model._meta.db_table)
+        weights = ''.join(f', {float(weight)}' for weight in index.weights)
+        scope, scope_params = queryset.order_by().values('pk').query.sql_with_params()
+        sql = (
+            f"SELECT {fts}.rowid, bm25({fts}{weights}) AS score, snippet({fts}, %s, %s, %s, %s, %s) "
+            f"FROM {fts} WHERE {fts} MATCH %s AND {fts}.rowid IN ({scope}) ORDER BY score LIMIT %s"
+        )
+        params = [index.fields.index(index.snippet_field), START, STOP, ELLIPSIS, SNIPPET_WORDS, match, *scope_params, limit]
+        with connections[queryset.db].cursor() as cursor:
+            cursor.execute(sql, params)
+            # bm25() is lower for better matches
+            return [(pk, -score, snippet) for pk, score, snippet in cursor.fetchall()]
+
+
+class PostgresBackend:
+    def install(self, index, connection):
+        pass  # The vectors are computed by the queries
+
+    def search(self, index, text, queryset, limit):
+        from django.contrib.postgres.search import SearchHeadline, SearchQuery, SearchRank, SearchVector
+
+        if not query_words(text):
+            return []
+        if index.weights:
+            # PostgreSQL has 4 weight classes: A for the heaviest field, and so on
+            ordered = sorted(zip(index.weights, index.fields), key=lambda item: -item[0])
+            classes = {field: 'ABCD'[min(position, 3)] for position, (_, field) in enumerate(ordered)}
+            vector = SearchVector(index.fields[0], weight=classes[index.fields[0]])
+            for field in index.fields[1:]:
+                vector = vector + SearchVector(field, weight=classes[field])
+        else:
+            vector = SearchVector(*index.fields)
+        query = SearchQuery(text, search_type='websearch')
+        rows = (
+            queryset.annotate(document=vector).filter(document=query)
+            .annotate(
+                score=SearchRank(vector, query),
+                snippet=SearchHeadline(index.snippet_field, query, start_sel=START, stop_sel=STOP, max_words=SNIPPET_WORDS),
+            )
+            .order_by('-score', 'pk')
+            .values_list('pk', 'score', 'snippet')[:limit]
+        )
+        return list(rows)
+
+
+class LikeBackend:
+    def install(self, index, connection):
+        pass
+
+    def search(self, index, text, queryset, limit):
+        words = query_words(text)
+        if not words:
+            return []
+        for word in words:
+            queryset = queryset.filter(Q(*[Q(**{f'{field}__icontains': word}) for field in index.fields], _connector=Q.OR))
+        rows = queryset.order_by('pk').values_list('pk', index.snippet_field)[:limit]
+        return [(pk, 0.0, (value or '')[:SNIPPET_WORDS * 10]) for pk, value in rows]
+
+
+BACKENDS = {
+    'sqlite': SQLiteBackend(),
+    'postgresql': PostgresBackend(),
+}
+
+
+def get_backend(connection):
+    return BACKENDS.get(connection.vendor, LikeBackend())
+
+
+class FullTextIndex:
+    def __init__(self, name, model, fields, values, snippet_field=None, weights=None):
+        self.name = name
+        self.model = model
+        self.fields = list(fields)
+        self.values = values
+        self.snippet_field = snippet_field or self.fields[-1]
+        # Relative importance of `fields` in the rank, e.g. a title over the text
+        self.weights = list(weights or ())
+
+    def search(self, text, queryset=None, limit=20):
+        """Return up to `limit` rows of `queryset` matching `text`, best first, each with its 'rank' and 'snippet'."""
+        if queryset is None:
+            queryset = self.model.objects.all()
+        backend = get_backend(connections[queryset.db])
+        hits = backend.search(self, text, queryset, limit)
+        if not hits:
+            return []
+        rows = {row['id']: row for row in self.model.objects.filter(pk__in=[pk for pk, _, _ in hits]).values(*self.values)}
+        return [
+            {**rows[pk], 'rank': rank, 'snippet': highlight(snippet)}
+            for pk, rank, snippet in hits if pk in rows
+        ]
+
+
+FULLTEXT_INDEXES = {}
+
+
+def register_fulltext_index(name, model, fields, values, snippet_field=None, weights=None):
+    """Make `fields` of `model` searchable as `name` (from an AppConfig.ready()); `values` must include 'id'."""
+    index = FULLTEXT_INDEXES[name] = FullTextIndex(name, model, fields, values, snippet_field, weights)
+    return index
+
+
+def get_fulltext_index(name):
+    return FULLTEXT_INDEXES[name]
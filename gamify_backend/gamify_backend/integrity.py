@@ -0,0 +1,61 @@
+"""
+Database constraint violations turned back into ValidationError.
+
+Invariants like "one starting scene per adventure" are enforced by unique
+indexes and check constraints instead of SELECTs in clean(): a save is a single
+INSERT/UPDATE, two concurrent saves cannot both pass, and the IntegrityError
+of a violation is translated into the message clean() used to raise.
+"""
+import re
+
+from django.core.exceptions import ValidationError
+from django.db import IntegrityError, transaction
+from django.db.models import CheckConstraint, UniqueConstraint
+
+# SQLite lists the columns of the violated unique index, or names the check constraint
+SQLITE_VIOLATION = re.compile(r'(?:UNIQUE|CHECK) constraint failed: (.+)$')
+
+
+def model_constraints(model):
+    """Yield (name, columns) for the unique fields and the constraints of `model`."""
+    opts = model._meta
+    for field in opts.local_fields:
+        if field.unique and not field.primary_key:
+            yield field.name, [field.column]
+    for constraint in opts.constraints:
+        if isinstance(constraint, UniqueConstraint) and constraint.fields:
+            yield constraint.name, [opts.get_field(name).column for name in constraint.fields]
+        elif isinstance(constraint, CheckConstraint):
+            yield constraint.name, []
+
+
+def violated_constraint(model, error):
+    """Name of the constraint (or unique field) of `model` that raised `error`, None if unknown."""
+    message = str(error)
+    table = model._meta.db_table
+    match = SQLITE_VIOLATION.search(message)
+    for name, columns in model_constraints(model):
+        if match:
+            if match.group(1) in (name, ', '.join(f'{table}.{column}' for column in columns)):
+                return name
+        # PostgreSQL names the constraint, and details the key: 'Key (adventure_id)=(1) already exists.'
+        elif f'"{name}"' in message or (columns and f"Key ({', '.join(columns)})=" in message):
+            return name
+    return None
+
+
+def save_with_constraint_messages(instance, save, messages):
+    """
+    Call `save()` in a savepoint. If it violates one of the constraints of
+    `messages` ({constraint or unique field name: callable returning the
+    ValidationError message}), raise that ValidationError instead. The
+    callables only run after a violation, so they can query to describe it.
+    """
+    try:
+        with transaction.atomic():
+            return save()
+    except IntegrityError as error:
+        name = violated_constraint(type(instance), error)
+        if name not in messages:
+            raise
+        raise ValidationError(messages[name]()) from error
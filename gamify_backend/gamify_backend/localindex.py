@@ -0,0 +1,71 @@
+"""
+Structures built from the database once per process (search catalogs, skill
+unlocks, XP rules, level curve), and built again when the data changed.
+
+changed() drops the structure of the process at once and, after the commit,
+bumps a generation in the cache that the other processes compare with the one
+they built from. The generation is read at most every `check_interval` seconds
+(0: on each lookup), so that the hot paths do not pay a cache round-trip per
+call. It only reaches the other processes through a shared cache: with the
+per-process default (LocMemCache), `max_age` rebuilds the structure after that
+many seconds (None: only on a new generation).
+"""
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+MAX_AGE = getattr(settings, 'LOCAL_INDEX_MAX_AGE', 60)
+CHECK_INTERVAL = getattr(settings, 'LOCAL_INDEX_CHECK_INTERVAL', 5)
+
+
+class LocalIndex:
+    def __init__(self, generation_key, max_age=MAX_AGE, check_interval=0):
+        self.generation_key = generation_key
+        self.max_age = max_age
+        self.check_interval = check_interval
+        self._index = None
+        self._generation = None
+        self._built_at = 0.0
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+
+    def build(self):
+        raise NotImplementedError
+
+    def index(self):
+        """The index of this process, rebuilt when the data changed."""
+        now = time.monotonic()
+        index = self._index
+        if index is not None and now - self._checked_at <= self.check_interval and not self.expired(now):
+            return index
+        generation = cache.get(self.generation_key, 0)
+        if self.stale(index, generation, now):
+            with self._lock:
+                index = self._index
+                if self.stale(index, generation, now):
+                    index = self._index = self.build()
+                    self._generation = generation
+                    self._built_at = now
+        self._checked_at = now
+        return index
+
+    def expired(self, now):
+        return self.max_age is not None and now - self._built_at > self.max_age
+
+    def stale(self, index, generation, now):
+        return index is None or self._generation != generation or self.expired(now)
+
+    def changed(self, **kwargs):
+        """Signal receiver: the index of this process now, those of the others after the commit."""
+        self._index = None
+        transaction.on_commit(self.bump_generation)
+
+    def bump_generation(self):
+        cache.add(self.generation_key, 0, timeout=None)
+        try:
+            cache.incr(self.generation_key)
+        except ValueError:  # Evicted meanwhile
+            cache.set(self.generation_key, 1, timeout=None)
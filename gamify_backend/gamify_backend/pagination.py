@@ -0,0 +1,142 @@
+"""
+Keyset (cursor) pagination used by every list endpoint.
+
+Pages are read with "WHERE (created_at, id) < (last created_at, last id)
+ORDER BY created_at DESC, id DESC LIMIT n" instead of LIMIT/OFFSET, so a deep
+page costs the same as the first one as long as the ordering is backed by an
+index. The cursor is opaque to the clients (base64 encoded JSON).
+
+Views choose their ordering with an `ordering` attribute (all the fields in the
+same direction, the last one unique), the default is ('-created_at', '-id').
+"""
+import base64
+import json
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    cursor_query_param = 'cursor'
+    page_size = api_settings.PAGE_SIZE or 50
+    page_size_query_param = 'page_size'
+    max_page_size = 200
+    ordering = ('-created_at', '-id')
+    invalid_cursor_message = 'Invalid cursor'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        self.page_size = self.get_page_size(request)
+        self.ordering = self.get_ordering(view)
+        self.model = queryset.model
+
+        position, reverse = self.decode_cursor(request)
+        descending = self.ordering[0].startswith('-')
+        # Walking backwards is walking forwards with the opposite ordering
+        ordering = [self.flip(name) for name in self.ordering] if reverse else list(self.ordering)
+        queryset = queryset.order_by(*ordering)
+        if position is not None:
+            queryset = queryset.filter(self.keyset_filter(position, descending != reverse))
+
+        results = list(queryset[:self.page_size + 1])
+        has_more = len(results) > self.page_size
+        results = results[:self.page_size]
+        if reverse:
+            results.reverse()
+
+        self.has_next = position is not None if reverse else has_more
+        self.has_previous = has_more if reverse else position is not None
+        self.page = results
+        return results
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return max(1, min(page_size, self.max_page_size))
+
+    def get_ordering(self, view):
+        ordering = tuple(getattr(view, 'ordering', None) or self.ordering)
+        assert len({name.startswith('-') for name in ordering}) == 1, (
+            'Keyset pagination needs all the ordering fields in the same direction.'
+        )
+        return ordering
+
+    @staticmethod
+    def flip(name):
+        return name[1:] if name.startswith('-') else f'-{name}'
+
+    def get_field(self, name):
+        name = name.lstrip('-')
+        if name == 'pk':
+            return self.model._meta.pk
+        return self.model._meta.get_field(name)
+
+    def keyset_filter(self, position, descending):
+        """(a, b, c) < (x, y, z) written as a < x OR (a = x AND b < y) OR (a = x AND b = y AND c < z)."""
+        lookup = 'lt' if descending else 'gt'
+        names = [self.get_field(name).attname for name in self.ordering]
+        condition = Q()
+        for index, name in enumerate(names):
+            equal = {names[i]: position[i] for i in range(index)}
+            condition |= Q(**equal, **{f'{name}__{lookup}': position[index]})
+        return condition
+
+    # Cursors
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if encoded is None:
+            return None, False
+        try:
+            data = json.loads(base64.urlsafe_b64decode(encoded.encode('ascii')).decode('utf-8'))
+            values = data['p']
+            if len(values) != len(self.ordering):
+                raise ValueError
+            position = [self.get_field(name).to_python(value) for name, value in zip(self.ordering, values)]
+            return position, bool(data.get('r'))
+        except (TypeError, ValueError, KeyError, ValidationError, UnicodeError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def encode_cursor(self, instance, reverse):
+        values = [self.get_field(name).value_to_string(instance) for name in self.ordering]
+        data = {'p': values, 'r': 1} if reverse else {'p': values}
+        encoded = base64.urlsafe_b64encode(json.dumps(data, separators=(',', ':')).encode('utf-8')).decode('ascii')
+        return replace_query_param(self.base_url, self.cursor_query_param, encoded)
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(self.page[-1], reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        if not self.page:
+            return remove_query_param(self.base_url, self.cursor_query_param)
+        return self.encode_cursor(self.page[0], reverse=True)
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
@@ -0,0 +1,155 @@
+"""
+In-process autocomplete over the small catalogs (activity types, skills,
+equipment), with no query per keystroke.
+
+Each catalog is loaded once per process, on its first lookup, into:
+
+    - a sorted list of (word, entry) pairs: the entries with a word starting
+      with the typed text are a bisect range, O(log n + matches);
+    - a trigram -> entries map, for typos and text inside a word.
+
+The text is lowercased and stripped of its accents ("Épée" matches "epee").
+Every word typed must start a word of the entry. Ranking: exact name, name
+prefix, word prefix in the name, word prefix in another field, then the
+trigram matches by similarity; ties by shorter then alphabetical name.
+
+A save or a delete of a catalog model drops the index of the process, and bumps
+the catalog generation in the cache after the commit, so that every other
+process rebuilds its index on its next lookup (see gamify_backend.localindex).
+
+    register_catalog('activity-types', ActivityType, fields=['name', 'category'], values=['id', 'name', 'category', 'icon'])
+    get_catalog('activity-types').search("run", limit=10)
+"""
+import unicodedata
+from bisect import bisect_left
+from collections import defaultdict
+
+from django.db.models.signals import post_delete, post_save
+
+from .localindex import LocalIndex
+
+MIN_SIMILARITY = 0.3
+MAX_LIMIT = 50
+
+# Rank of a match, lower first
+EXACT, NAME_PREFIX, NAME_WORD, OTHER_WORD, FUZZY = range(5)
+
+
+def normalize(text):
+    """Lowercase, without accents nor punctuation."""
+    text = unicodedata.normalize('NFKD', str(text or '')).encode('ascii', 'ignore').decode().lower()
+    return ' '.join(''.join(char if char.isalnum() else ' ' for char in text).split())
+
+
+def trigrams(text):
+    padded = f"  {text} "
+    return {padded[index:index + 3] for index in range(len(padded) - 2)}
+
+
+class SearchIndex:
+    """Index of `rows` (dicts), searched on their `fields`, the first one being the name."""
+
+    def __init__(self, rows, fields):
+        self.rows = list(rows)
+        self.fields = list(fields)
+        self.names = [normalize(row[self.fields[0]]) for row in self.rows]
+        # Per entry: the words of the name, and those of the other fields
+        self.words = []
+        prefixes = []
+        self.trigrams = defaultdict(set)
+        for index, row in enumerate(self.rows):
+            name_words = set(self.names[index].split())
+            other_words = {word for field in self.fields[1:] for word in normalize(row[field]).split()} - name_words
+            self.words.append((name_words, other_words))
+            prefixes.extend((word, index) for word in name_words | other_words)
+            for gram in trigrams(self.names[index]):
+                self.trigrams[gram].add(index)
+        prefixes.sort()
+        self.prefix_words = [word for word, _ in prefixes]
+        self.prefix_entries = [index for _, index in prefixes]
+
+    def __len__(self):
+        return len(self.rows)
+
+    def prefix_matches(self, token):
+        """Entries with a word starting with `token`."""
+        start = bisect_left(self.prefix_words, token)
+        end = bisect_left(self.prefix_words, token + '\uffff', start)
+        return set(self.prefix_entries[start:end])
+
+    def rank(self, index, query, tokens):
+        name = self.names[index]
+        if name == query:
+            return EXACT
+        if name.startswith(query):
+            return NAME_PREFIX
+        name_words, _ = self.words[index]
+        if all(any(word.startswith(token) for word in name_words) for token in tokens):
+            return NAME_WORD
+        return OTHER_WORD
+
+    def search(self, text, limit=10):
+        """Return up to `limit` rows matching `text`, best first, each with its 'rank'."""
+        query = normalize(text)
+        if not query:
+            return []
+        tokens = query.split()
+        matches = self.prefix_matches(tokens[0])
+        for token in tokens[1:]:
+            if not matches:
+                break
+            matches &= self.prefix_matches(token)
+        ranked = sorted(
+            ((self.rank(index, query, tokens), 0.0, index) for index in matches),
+            key=lambda item: (item[0], len(self.names[item[2]]), self.names[item[2]]),
+        )
+
+        if len(ranked) < limit:
+            # Typos and text inside a word: names sharing enough trigrams
+            query_grams = trigrams(query)
+            shared = defaultdict(int)
+            for gram in query_grams:
+                for index in self.trigrams.get(gram, ()):
+                    if index not in matches:
+                        shared[index] += 1
+            fuzzy = []
+            for index, count in shared.items():
+                similarity = count / len(query_grams | trigrams(self.names[index]))
+                if similarity >= MIN_SIMILARITY:
+                    fuzzy.append((FUZZY, similarity, index))
+            fuzzy.sort(key=lambda item: (-item[1], len(self.names[item[2]]), self.names[item[2]]))
+            ranked.extend(fuzzy)
+
+        return [{**self.rows[index], 'rank': rank} for rank, _, index in ranked[:limit]]
+
+
+class Catalog(LocalIndex):
+    def __init__(self, name, model, fields, values, filters=None):
+        super().__init__(f'search:generation:{name}')
+        self.name = name
+        self.model = model
+        self.fields = fields
+        self.values = values
+        self.filters = filters or {}
+
+    def build(self):
+        rows = self.model.objects.filter(**self.filters).order_by('pk').values(*self.values)
+        return SearchIndex(rows, self.fields)
+
+    def search(self, text, limit=10):
+        return self.index().search(text, limit=min(limit, MAX_LIMIT))
+
+
+CATALOGS = {}
+
+
+def register_catalog(name, model, fields, values, filters=None):
+    """Make `model` searchable as `name` (from an AppConfig.ready())."""
+    catalog = CATALOGS[name] = Catalog(name, model, fields, values, filters)
+    post_save.connect(catalog.changed, sender=model, weak=False, dispatch_uid=f'search:{name}:save')
+    post_delete.connect(catalog.changed, sender=model, weak=False, dispatch_uid=f'search:{name}:delete')
+    return catalog
+
+
+def get_catalog(name):
+    return CATALOGS[name]
@@ -0,0 +1,96 @@
+"""
+Serializer helpers shared by the apps.
+
+ExpandableFieldsMixin lets the clients choose the representation with query
+parameters, and lets the views load exactly the relations it needs:
+
+    GET /characters/?fields=id,name,level      -> only these fields
+    GET /characters/?expand=race               -> race nested, user and class as ids
+    GET /characters/?expand=                   -> every relation as an id
+
+Serializers declare their relations in Meta:
+
+    class Meta:
+        expandable_fields = ['user', 'race', 'character_class']  # nested by default
+        select_related_fields = ['user', 'race', 'character_class']
+        prefetch_related_fields = []
+"""
+from rest_framework import permissions, serializers
+
+
+def parse_field_list(value):
+    """'a, b,,c' -> {'a', 'b', 'c'} (None stays None)."""
+    if value is None:
+        return None
+    return {name.strip() for name in value.split(',') if name.strip()}
+
+
+class ExpandableFieldsMixin:
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        request = self.context.get('request')
+        # Only the top-level serializer gets a request in its context (nested ones
+        # are built with the class), and write requests always use every field
+        if request is None or request.method not in permissions.SAFE_METHODS:
+            return
+        self.select_fields(
+            fields=parse_field_list(request.query_params.get('fields')),
+            expand=parse_field_list(request.query_params.get('expand')),
+        )
+
+    def select_fields(self, fields=None, expand=None):
+        """Drop the fields that were not asked for, and collapse the relations that are not expanded."""
+        if fields is not None:
+            for name in set(self.fields) - fields:
+                self.fields.pop(name)
+        if expand is not None:
+            for name in self.get_expandable_fields() - expand:
+                if name in self.fields:
+                    source = self.fields[name].source
+                    options = {'source': source} if source != name else {}
+                    self.fields[name] = serializers.PrimaryKeyRelatedField(read_only=True, **options)
+
+    @classmethod
+    def get_expandable_fields(cls):
+        return set(getattr(cls.Meta, 'expandable_fields', []))
+
+    @classmethod
+    def get_related_lookups(cls, fields=None, expand=None, prefix=''):
+        """
+        Return the (select_related, prefetch_related) lookups needed to render
+        `fields` with the `expand` relations nested, including the relations of
+        the nested serializers.
+        """
+        select = []
+        prefetch = []
+        expandable = cls.get_expandable_fields()
+        declared = cls._declared_fields
+        for lookups, related in (
+            (select, getattr(cls.Meta, 'select_related_fields', [])),
+            (prefetch, getattr(cls.Meta, 'prefetch_related_fields', [])),
+        ):
+            for name in related:
+                if fields is not None and name not in fields:
+                    continue
+                # A collapsed relation is rendered from its "<name>_id" column, no join needed
+                if expand is not None and name in expandable and name not in expand:
+                    continue
+                lookups.append(prefix + name)
+                nested = declared.get(name)
+                nested = getattr(nested, 'child', nested)
+                if isinstance(nested, ExpandableFieldsMixin):
+                    nested_select, nested_prefetch = nested.get_related_lookups(prefix=f'{prefix}{name}__')
+                    # Below a prefetched relation, everything has to be prefetched too
+                    lookups.extend(nested_select)
+                    prefetch.extend(nested_prefetch)
+        return select, prefetch
+
+    @classmethod
+    def plan_queryset(cls, queryset, fields=None, expand=None):
+        """Add the select_related/prefetch_related needed by this representation to `queryset`."""
+        select, prefetch = cls.get_related_lookups(fields, expand)
+        if select:
+            queryset = queryset.select_related(*select)
+        if prefetch:
+            queryset = queryset.prefetch_related(*prefetch)
+        return queryset
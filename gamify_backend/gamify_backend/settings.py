@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+from datetime import timedelta
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -42,6 +43,7 @@ INSTALLED_APPS = [
     'tracking',
     'adventures',
     'rest_framework',
+    'rest_framework_simplejwt.token_blacklist',
 ]
 
 MIDDLEWARE = [
@@ -105,6 +107,59 @@ AUTH_PASSWORD_VALIDATORS = [
 
 AUTH_USER_MODEL = 'users.User'
 
+REST_FRAMEWORK = {
+    # Stateless JWT first (no session read, no user fetch), session for the browsable API and the admin
+    'DEFAULT_AUTHENTICATION_CLASSES': [
+        'users.authentication.StatelessJWTAuthentication',
+        'rest_framework.authentication.SessionAuthentication',
+    ],
+    # Keyset pagination on indexed orderings for every list endpoint
+    'DEFAULT_PAGINATION_CLASS': 'gamify_backend.pagination.KeysetPagination',
+    'PAGE_SIZE': 50,
+}
+
+SIMPLE_JWT = {
+    'ACCESS_TOKEN_LIFETIME': timedelta(minutes=15),
+    'REFRESH_TOKEN_LIFETIME': timedelta(days=7),
+    'ROTATE_REFRESH_TOKENS': True,
+    'BLACKLIST_AFTER_ROTATION': True,
+    'UPDATE_LAST_LOGIN': False,  # No write on each login
+    'TOKEN_OBTAIN_SERIALIZER': 'users.authentication.GamifyTokenObtainPairSerializer',
+    'TOKEN_USER_CLASS': 'users.authentication.GamifyTokenUser',
+}
+
+# Level progression (see users/levels.py): 'linear', 'quadratic' or 'table'
+LEVEL_CURVE = 'linear'
+
+# XP grants are appended to the XP ledger (tracking.XPLedgerEntry) and folded into
+# the characters after each commit (one flush per transaction, one UPDATE per
+# character). Set to False to fold them in batches instead
+# with the flush_xp_ledger command.
+XP_LEDGER_FLUSH_ON_COMMIT = True
+
+# Activities older than this (rounded down to the start of the month) are moved
+# to the archive by the archive_activities command (see tracking/archive.py)
+ACTIVITY_ARCHIVE_AFTER_DAYS = 365
+
+
+# The leaderboards (tracking.leaderboards) share their versions and locks through
+# this cache. LocMemCache is per process: with several processes, use a shared
+# backend (Redis, Memcached, database), or the other processes keep serving
+# their top-N for up to LEADERBOARD_TOP_TIMEOUT seconds after a change.
+# The same goes for the generations of the in-process structures
+# (gamify_backend.localindex): the search catalogs and the skill unlocks are
+# also rebuilt every LOCAL_INDEX_MAX_AGE seconds for that reason (None: only
+# after a change), the level curve and the XP rules, read on every XP grant,
+# only follow their generation, read at most every LOCAL_INDEX_CHECK_INTERVAL
+# seconds.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    }
+}
+LOCAL_INDEX_MAX_AGE = 60
+LOCAL_INDEX_CHECK_INTERVAL = 5
+
 
 # Internationalization
 # https://docs.djangoproject.com/en/5.2/topics/i18n/
@@ -16,8 +16,13 @@ Including another URLconf
 """
 from django.contrib import admin
 from django.urls import path, include
+from .views import AutocompleteView
 
 urlpatterns = [
     path('admin/', admin.site.urls),
-    path('', include('users.urls'))
+    path('', include('users.urls')),
+    path('', include('tracking.urls')),
+    path('', include('adventures.urls')),
+    path('', include('game.urls')),
+    path('search/<slug:catalog>/', AutocompleteView.as_view(), name='autocomplete'),
 ]
@@ -0,0 +1,184 @@
+"""View helpers shared by the apps."""
+import hashlib
+
+from django.db.models import Count, Max
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, quote_etag
+from rest_framework import generics, permissions
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from . import fulltext
+from .search import CATALOGS, MAX_LIMIT
+from .serializers import parse_field_list
+
+
+class QueryPlanMixin:
+    """
+    For generic views whose serializer uses ExpandableFieldsMixin: load the
+    relations the serializer declares (select_related/prefetch_related), limited
+    to the ?fields= and ?expand= asked by the client, so lists cost a constant
+    number of queries.
+    """
+
+    def get_field_selection(self):
+        params = self.request.query_params
+        return parse_field_list(params.get('fields')), parse_field_list(params.get('expand'))
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        fields, expand = self.get_field_selection()
+        return self.get_serializer_class().plan_queryset(queryset, fields=fields, expand=expand)
+
+
+def latest(dates):
+    return max((date for date in dates if date is not None), default=None)
+
+
+class ConditionalResponse(Exception):
+    """Raised to answer a request with a 304/412 before the handler runs."""
+
+    def __init__(self, response):
+        self.response = response
+
+
+class ConditionalRequestMixin:
+    """
+    ETag / Last-Modified for generic views, derived from the `updated_at`
+    column without loading the rows:
+
+        GET + If-None-Match / If-Modified-Since        -> 304 when unchanged
+        PUT/PATCH/DELETE + If-Match / If-Unmodified-Since -> 412 when stale
+
+    Detail views read (pk, updated_at) of the object, list views read
+    Max(updated_at) and Count() of the queryset (a deletion changes the count).
+    The `updated_at` of the relations the representation nests are listed in
+    related_last_modified_fields, and the latest of them all is the version.
+    The ETag also depends on the query string, so ?fields=, ?expand= and the
+    cursor pages get their own tags. The header matching is Django's
+    get_conditional_response.
+    """
+    last_modified_field = 'updated_at'
+    # e.g. ['race__updated_at']: a nested relation changed, the representation did too
+    related_last_modified_fields = []
+
+    def get_resource_state(self):
+        """Return (identity, last modification) of the resource, None if it doesn't exist."""
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        queryset = self.get_queryset()
+        fields = [self.last_modified_field, *self.related_last_modified_fields]
+        if lookup_url_kwarg not in self.kwargs:
+            state = queryset.aggregate(count=Count('pk'), **{f'last_modified_{index}': Max(field) for index, field in enumerate(fields)})
+            return state.pop('count'), latest(state.values())
+        row = (
+            queryset
+            .filter(**{self.lookup_field: self.kwargs[lookup_url_kwarg]})
+            .values_list('pk', *fields)
+            .first()
+        )
+        return row and (row[0], latest(row[1:]))
+
+    def get_validators(self):
+        """Return (etag, last_modified timestamp), or (None, None) when there is nothing to validate."""
+        state = self.get_resource_state()
+        if state is None:
+            return None, None
+        identity, last_modified = state
+        renderer = getattr(self.request, 'accepted_renderer', None)
+        key = repr((
+            type(self).__name__,
+            identity,
+            last_modified and last_modified.isoformat(),
+            sorted(self.request.query_params.lists()),
+            getattr(renderer, 'format', None),
+        ))
+        etag = quote_etag(hashlib.md5(key.encode(), usedforsecurity=False).hexdigest())
+        return etag, last_modified and int(last_modified.timestamp())
+
+    def set_validator_headers(self, response, etag, last_modified):
+        if etag:
+            response['ETag'] = etag
+        if last_modified:
+            response['Last-Modified'] = http_date(last_modified)
+        # The client may keep the response but has to revalidate it each time
+        patch_cache_control(response, private=True, no_cache=True)
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        self.etag, self.last_modified = self.get_validators()
+        if self.etag is None:
+            return  # Let the handler answer (404)
+        response = get_conditional_response(request, etag=self.etag, last_modified=self.last_modified)
+        if response is not None:
+            if response.status_code == 304:
+                self.set_validator_headers(response, self.etag, self.last_modified)
+            raise ConditionalResponse(response)
+
+    def handle_exception(self, exc):
+        if isinstance(exc, ConditionalResponse):
+            return exc.response
+        return super().handle_exception(exc)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        if not 200 <= response.status_code < 300 or request.method not in ('GET', 'HEAD', 'PUT', 'PATCH'):
+            return response
+        if request.method in permissions.SAFE_METHODS:
+            etag, last_modified = getattr(self, 'etag', None), getattr(self, 'last_modified', None)
+        else:
+            # The write changed updated_at: send the new validators for the next If-Match
+            etag, last_modified = self.get_validators()
+        self.set_validator_headers(response, etag, last_modified)
+        return response
+
+
+def get_query_limit(request, default, maximum):
+    try:
+        limit = int(request.query_params.get('limit', default))
+    except ValueError:
+        raise ValidationError({'limit': "Expected an integer."})
+    if not 1 <= limit <= maximum:
+        raise ValidationError({'limit': f"The limit must be between 1 and {maximum}."})
+    return limit
+
+
+class AutocompleteView(APIView):
+    """
+    As-you-type search in a catalog (see gamify_backend.search):
+    GET /search/<catalog>/?q=run&limit=10. Answered from the index kept in
+    memory, without any query once the index is built.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request, catalog):
+        if catalog not in CATALOGS:
+            raise NotFound(f"Unknown catalog: {catalog}")
+        limit = get_query_limit(request, 10, MAX_LIMIT)
+        query = request.query_params.get('q', '')
+        return Response({
+            'catalog': catalog,
+            'query': query,
+            'results': CATALOGS[catalog].search(query, limit=limit),
+        })
+
+
+class FullTextSearchView(generics.GenericAPIView):
+    """
+    Ranked full-text search in `fulltext_index` (see gamify_backend.fulltext),
+    restricted to get_queryset(): GET ?q=words&limit=20. Each result has its
+    'rank' and a highlighted 'snippet'.
+    """
+    fulltext_index = None
+    pagination_class = None  # Bounded by the limit
+
+    def get(self, request, *args, **kwargs):
+        query = request.query_params.get('q', '').strip()
+        if not query:
+            raise ValidationError({'q': "This parameter is required."})
+        limit = get_query_limit(request, 20, fulltext.MAX_LIMIT)
+        index = fulltext.get_fulltext_index(self.fulltext_index)
+        return Response({
+            'query': query,
+            'results': index.search(query, queryset=self.get_queryset(), limit=limit),
+        })
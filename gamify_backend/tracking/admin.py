@@ -5,7 +5,7 @@ from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin
 from django.urls import reverse
 from django.utils.html import format_html
-from .models import Activity, ActivityType
+from .models import Activity, ActivityType, XPLedgerEntry, XPRule
 
 @admin.register(Activity)
 class ActivityAdmin(admin.ModelAdmin):
@@ -34,3 +34,22 @@ class ActivityAdmin(admin.ModelAdmin):
 
 admin.site.register(ActivityType)
 
+
+@admin.register(XPRule)
+class XPRuleAdmin(admin.ModelAdmin):
+    list_display = ('name', 'is_active', 'priority', 'category', 'activity_type', 'xp_per_minute', 'bonus_xp', 'multiplier')
+    list_filter = ('is_active', 'category')
+    list_editable = ('is_active', 'priority')
+    ordering = ('priority', 'id')
+
+
+@admin.register(XPLedgerEntry)
+class XPLedgerEntryAdmin(admin.ModelAdmin):
+    list_display = ('id', 'character', 'source_type', 'source_id', 'amount', 'created_at', 'applied_at')
+    list_filter = ('source_type', 'applied_at')
+    search_fields = ('character__name', 'idempotency_key')
+    readonly_fields = ('character', 'source_type', 'source_id', 'idempotency_key', 'amount', 'created_at', 'flush_id', 'applied_at')
+
+    def has_change_permission(self, request, obj=None):
+        # Append-only
+        return False
@@ -7,3 +7,12 @@ class TrackingConfig(AppConfig):
 
     def ready(self):
         import tracking.signals  # Importe les signaux
+        from gamify_backend.fulltext import register_fulltext_index
+        from gamify_backend.search import register_catalog
+        from .models import Activity, ActivityType
+
+        register_catalog('activity-types', ActivityType, fields=['name', 'category'], values=['id', 'name', 'category', 'icon'])
+        register_fulltext_index(
+            'activity-notes', Activity, fields=['notes'],
+            values=['id', 'character_id', 'activity_type_id', 'duration_minutes', 'xp_earned', 'created_at'],
+        )
@@ -0,0 +1,124 @@
+"""
+Archival of old activities, to keep the activity table and its indexes small.
+
+The activities created before the archival cutoff (the first day of the month
+ACTIVITY_ARCHIVE_AFTER_DAYS days ago, so whole months are archived) are moved
+by chunks of primary keys, one transaction per chunk:
+
+    - copied with their original id into ArchivedActivity (a single index),
+    - added to the per-character MonthlyActivityArchive totals,
+    - deleted from the activity table without signals: the rollups, streaks and
+      the XP ledger still count them.
+
+monthly_history() reads a character's whole history per month from the
+archive totals merged with the live activities. The exports and the rebuilds of
+the rollups and streaks read ArchivedActivity as well; the XP backfill does not
+score archived activities again.
+"""
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Count, DateField, Sum, Value
+from django.db.models.functions import Coalesce, TruncMonth
+from django.utils import timezone
+
+from .models import Activity, ArchivedActivity, MonthlyActivityArchive
+from .rollups import TOTALS, ActivityRollupService, activity_day
+
+CHUNK_SIZE = 2000
+ARCHIVED_FIELDS = [field.attname for field in ArchivedActivity._meta.concrete_fields if field.name != 'archived_at']
+
+
+@dataclass
+class ArchiveResult:
+    archived: int = 0
+    cutoff: object = None
+    seconds: float = 0.0
+
+    @property
+    def rate(self):
+        return self.archived / self.seconds if self.seconds else 0
+
+
+def archive_cutoff(days=None, now=None):
+    """Start of the first month kept in the activity table."""
+    if days is None:
+        days = getattr(settings, 'ACTIVITY_ARCHIVE_AFTER_DAYS', 365)
+    day = timezone.localdate(now) - timedelta(days=days)
+    return timezone.make_aware(datetime(day.year, day.month, 1))
+
+
+class ActivityArchiver:
+    def __init__(self, days=None, chunk_size=CHUNK_SIZE):
+        self.cutoff = archive_cutoff(days)
+        self.chunk_size = chunk_size
+
+    def run(self, progress=None):
+        """Move every activity older than the cutoff. `progress(result)` is called after each chunk."""
+        result = ArchiveResult(cutoff=self.cutoff)
+        started = time.perf_counter()
+        while archived := self.archive_chunk():
+            result.archived += archived
+            result.seconds = time.perf_counter() - started
+            if progress:
+                progress(result)
+        result.seconds = time.perf_counter() - started
+        return result
+
+    def archive_chunk(self):
+        with transaction.atomic():
+            rows = list(
+                Activity.objects.select_for_update()
+                .filter(created_at__lt=self.cutoff)
+                .order_by('pk')
+                .values(*ARCHIVED_FIELDS)[:self.chunk_size]
+            )
+            if not rows:
+                return 0
+            ArchivedActivity.objects.bulk_create([ArchivedActivity(**row) for row in rows], batch_size=self.chunk_size)
+            self.add_to_totals(rows)
+            # No signal: the rollups and the streaks keep counting the archived activities
+            Activity.objects.filter(pk__in=[row['id'] for row in rows])._raw_delete(Activity.objects.db)
+        return len(rows)
+
+    def add_to_totals(self, rows):
+        deltas = {}
+        for row in rows:
+            key = (row['character_id'], activity_day(row['created_at']).replace(day=1))
+            totals = deltas.setdefault(key, [0] * len(TOTALS))
+            for index, value in enumerate((1, row['duration_minutes'], row['calories'] or 0, row['xp_earned'], row['satisfaction'])):
+                totals[index] += value
+        try:
+            with transaction.atomic():
+                ActivityRollupService.apply_deltas(MonthlyActivityArchive, deltas, key_fields=('month',))
+        except IntegrityError:
+            # A concurrent archival created one of the rows: read them again
+            ActivityRollupService.apply_deltas(MonthlyActivityArchive, deltas, key_fields=('month',))
+
+
+def monthly_history(character_id):
+    """
+    Totals of a character per month, oldest first, as MonthlyActivityArchive
+    instances (unsaved for the live months): the archive rows merged with a
+    GROUP BY on the live activities, which only hold the recent months.
+    """
+    months = {archive.month: archive for archive in MonthlyActivityArchive.objects.filter(character_id=character_id)}
+    live = (
+        Activity.objects.filter(character_id=character_id).order_by()
+        .values(month=TruncMonth('created_at', tzinfo=timezone.get_default_timezone(), output_field=DateField()))
+        .annotate(
+            activity_count=Count('id'),
+            total_minutes=Sum('duration_minutes'),
+            total_calories=Coalesce(Sum('calories'), Value(0)),
+            total_xp=Sum('xp_earned'),
+            satisfaction_sum=Sum('satisfaction'),
+        )
+    )
+    for row in live:
+        month = months.setdefault(row['month'], MonthlyActivityArchive(character_id=character_id, month=row['month']))
+        for name in TOTALS:
+            setattr(month, name, getattr(month, name) + row[name])
+    return [months[month] for month in sorted(months)]
@@ -0,0 +1,257 @@
+"""
+XP backfill after a change of the XP rules or of the level curve.
+
+The activities are read by chunks (keyset on the primary key) and scored again
+with the active XP rule set in one NumPy pass per chunk. Only the activities
+whose xp_earned changes are written (bulk_update, no save() nor signal), each
+with an 'adjustment' entry of the difference in the XP ledger. The entries of a
+chunk are applied at once to their characters (one relative UPDATE per
+character, so XP earned outside the ledger is kept, with total_xp floored at 0
+and the level updated in the same statement). At the end the levels are
+recomputed with the active level curve (it may have changed too) and the rollups
+of the changed characters are rebuilt, both with set-based queries.
+
+Each activity keeps the character multiplier it was logged with. Activities
+logged before the multiplier was recorded get the one of the character's level
+before the run, which is then stored with them.
+
+A chunk, its ledger entries and their XP are committed together, then the position is
+saved in the checkpoint file (if any), so an interrupted run resumes after its
+last committed chunk. Scoring a committed chunk again changes nothing.
+"""
+import json
+import os
+import time
+import uuid
+from dataclasses import dataclass, field
+
+import numpy as np
+from django.db import transaction
+from django.db.models import Sum, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from users.levels import get_level_curve
+from users.models import Character
+from users.services import CharacterService
+from .leaderboards import LeaderboardService
+from .models import Activity, XPLedgerEntry
+from .rollups import ActivityRollupService
+from .scoring import get_rule_set
+from .services import XPLedgerService
+
+CHUNK_SIZE = 5000
+MAX_REPORTED_DIFFS = 20
+
+
+class XPBackfillError(ValueError):
+    """The checkpoint cannot be used for this run."""
+
+
+@dataclass
+class BackfillResult:
+    scanned: int = 0
+    changed: int = 0
+    xp_delta: int = 0
+    characters: int = 0  # Characters with a new level, or whose XP or level would change in a dry run
+    last_pk: int = 0
+    resumed: bool = False
+    seconds: float = 0.0
+    activity_diffs: list = field(default_factory=list)  # (activity id, old XP, new XP), the first MAX_REPORTED_DIFFS
+    character_diffs: list = field(default_factory=list)  # (character id, (level, total XP) before, after), dry run only
+
+    @property
+    def rate(self):
+        return self.scanned / self.seconds if self.seconds else 0
+
+
+class Checkpoint:
+    """Position of a run, saved in a JSON file after each committed chunk."""
+
+    def __init__(self, path):
+        self.path = path
+
+    def load(self):
+        try:
+            with open(self.path) as stream:
+                return json.load(stream)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as error:
+            raise XPBackfillError(f"Unreadable checkpoint {self.path}: {error}")
+
+    def save(self, state):
+        # Written aside then renamed, so an interruption never leaves half a file
+        with open(f"{self.path}.tmp", 'w') as stream:
+            json.dump(state, stream)
+        os.replace(f"{self.path}.tmp", self.path)
+
+    def clear(self):
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+
+
+class XPBackfill:
+    def __init__(self, character_ids=None, chunk_size=CHUNK_SIZE, dry_run=False, checkpoint_path=None):
+        self.character_ids = sorted(character_ids) if character_ids else None
+        self.chunk_size = chunk_size
+        self.dry_run = dry_run
+        self.checkpoint = Checkpoint(checkpoint_path) if checkpoint_path and not dry_run else None
+        self._multipliers = {}
+
+    def characters(self):
+        queryset = Character.objects.all()
+        if self.character_ids is not None:
+            queryset = queryset.filter(pk__in=self.character_ids)
+        return queryset
+
+    def multipliers(self, character_ids):
+        """XP multiplier of each row's character (levels read once per character)."""
+        unique_ids, inverse = np.unique(character_ids, return_inverse=True)
+        missing = [pk for pk in unique_ids.tolist() if pk not in self._multipliers]
+        if missing:
+            for pk, level in Character.objects.filter(pk__in=missing).values_list('pk', 'level'):
+                self._multipliers[pk] = Character(level=level).xp_multiplier
+        return np.array([self._multipliers[pk] for pk in unique_ids.tolist()], dtype=np.float64)[inverse]
+
+    def restore(self, result):
+        """Resume from the checkpoint, return the run id."""
+        state = self.checkpoint.load() if self.checkpoint else None
+        if state is None:
+            return uuid.uuid4().hex
+        if state.get('character_ids') != self.character_ids:
+            raise XPBackfillError("The checkpoint was written by a run on other characters.")
+        result.resumed = True
+        result.last_pk, result.scanned, result.changed, result.xp_delta = (
+            state['last_pk'], state['scanned'], state['changed'], state['xp_delta']
+        )
+        return state['run_id']
+
+    def run(self, progress=None):
+        """
+        Score every activity again. `progress(result)` is called after each chunk.
+        Nothing is written in a dry run, the differences are only reported.
+        """
+        result = BackfillResult()
+        started = time.perf_counter()
+        run_id = self.restore(result)
+        rule_set = get_rule_set()
+        xp_deltas = {}
+
+        activities = Activity.objects.annotate(
+            calories_or_0=Coalesce('calories', Value(0)),
+            multiplier_or_0=Coalesce('xp_multiplier', Value(0.0)),
+        ).order_by('pk').values_list(
+            'pk', 'character_id', 'activity_type_id', 'duration_minutes', 'calories_or_0', 'satisfaction', 'xp_earned', 'multiplier_or_0',
+        )
+        if self.character_ids is not None:
+            activities = activities.filter(character_id__in=self.character_ids)
+
+        while True:
+            rows = list(activities.filter(pk__gt=result.last_pk)[:self.chunk_size])
+            if not rows:
+                break
+            chunk = np.array([row[:7] for row in rows], dtype=np.int64)
+            stored_multipliers = np.array([row[7] for row in rows], dtype=np.float64)
+            pks, character_ids, type_ids, durations, calories, satisfactions, old_xp = chunk.T
+            unknown = stored_multipliers == 0
+            multipliers = stored_multipliers
+            if unknown.any():
+                multipliers = np.where(unknown, self.multipliers(character_ids), stored_multipliers)
+            new_xp = rule_set.score_arrays(type_ids, durations, calories, satisfactions, multipliers)
+            changed = new_xp != old_xp
+
+            if self.dry_run:
+                for character_id, delta in zip(character_ids[changed].tolist(), (new_xp - old_xp)[changed].tolist()):
+                    xp_deltas[character_id] = xp_deltas.get(character_id, 0) + delta
+            elif (changed | unknown).any():
+                with transaction.atomic():
+                    self.write(run_id, chunk[changed | unknown], new_xp[changed | unknown], multipliers[changed | unknown])
+            pks, old_xp, new_xp = pks[changed], old_xp[changed], new_xp[changed]
+
+            room = MAX_REPORTED_DIFFS - len(result.activity_diffs)
+            result.activity_diffs.extend(zip(pks[:room].tolist(), old_xp[:room].tolist(), new_xp[:room].tolist()))
+            result.scanned += len(chunk)
+            result.changed += len(pks)
+            result.xp_delta += int((new_xp - old_xp).sum())
+            result.last_pk = int(chunk[-1, 0])
+            if self.checkpoint:
+                self.checkpoint.save({
+                    'run_id': run_id, 'character_ids': self.character_ids, 'last_pk': result.last_pk,
+                    'scanned': result.scanned, 'changed': result.changed, 'xp_delta': result.xp_delta,
+                })
+            result.seconds = time.perf_counter() - started
+            if progress:
+                progress(result)
+
+        if self.dry_run:
+            self.project_characters(xp_deltas, result)
+        else:
+            with transaction.atomic():
+                # The XP was applied with each chunk, the curve may have changed too
+                result.characters = CharacterService.recompute_levels(self.characters())
+                LeaderboardService.invalidate_all()
+                if result.changed:
+                    ActivityRollupService.rebuild(self.character_ids)
+            if self.checkpoint:
+                self.checkpoint.clear()
+        result.seconds = time.perf_counter() - started
+        return result
+
+    def write(self, run_id, rows, new_xp, multipliers):
+        """Store the new XP (and multiplier) of `rows`, append the XP differences to the ledger and apply them."""
+        pks, character_ids, old_xp = rows[:, 0].tolist(), rows[:, 1].tolist(), rows[:, 6].tolist()
+        Activity.objects.bulk_update(
+            [Activity(pk=pk, xp_earned=xp, xp_multiplier=multiplier) for pk, xp, multiplier in zip(pks, new_xp.tolist(), multipliers.tolist())],
+            ['xp_earned', 'xp_multiplier'],
+            batch_size=self.chunk_size,
+        )
+        XPLedgerService.record_many([
+            XPLedgerEntry(
+                character_id=character_id,
+                amount=xp - old,
+                source_type='adjustment',
+                source_id=pk,
+                idempotency_key=f"recompute:{run_id}:{pk}",
+            )
+            for pk, character_id, old, xp in zip(pks, character_ids, old_xp, new_xp.tolist())
+            if xp != old
+        ], batch_size=self.chunk_size)
+
+        # Claim the entries of this chunk (those of the previous ones are applied) and apply them:
+        # a new rule may lower the XP, taken back down to 0 XP
+        flush_id = uuid.uuid4()
+        XPLedgerEntry.objects.filter(
+            source_type='adjustment', idempotency_key__startswith=f"recompute:{run_id}:", applied_at__isnull=True,
+        ).update(flush_id=flush_id, applied_at=timezone.now())
+        totals = XPLedgerEntry.objects.filter(flush_id=flush_id).values_list('character_id').annotate(total=Sum('amount')).order_by()
+        for character_id, total in totals:
+            if total < 0:
+                CharacterService.remove_xp(character_id, -total)
+            else:
+                CharacterService.grant_xp(character_id, total)
+
+    def project_characters(self, xp_deltas, result):
+        """Dry run: level and total XP each character would get."""
+        curve = get_level_curve()
+        rows = self.characters().order_by('pk').values_list('pk', 'level', 'total_xp')
+        last_pk = 0
+        while True:
+            chunk = np.array(list(rows.filter(pk__gt=last_pk)[:self.chunk_size]), dtype=np.int64).reshape(-1, 3)
+            if not len(chunk):
+                break
+            last_pk = int(chunk[-1, 0])
+            totals = chunk[:, 2] + np.array([xp_deltas.get(pk, 0) for pk in chunk[:, 0].tolist()], dtype=np.int64)
+            levels = curve.levels_for_xp_array(totals)
+            changed = (levels != chunk[:, 1]) | (totals != chunk[:, 2])
+            result.characters += int(changed.sum())
+            room = MAX_REPORTED_DIFFS - len(result.character_diffs)
+            result.character_diffs.extend(
+                (pk, (level, total), (new_level, new_total))
+                for pk, level, total, new_level, new_total in zip(
+                    chunk[changed, 0][:room].tolist(), chunk[changed, 1][:room].tolist(), chunk[changed, 2][:room].tolist(),
+                    levels[changed][:room].tolist(), totals[changed][:room].tolist(),
+                )
+            )
@@ -0,0 +1,85 @@
+"""
+Export of the whole activity history of a character (CSV or NDJSON).
+
+The rows are read with a server-side iterator (.iterator(chunk_size=...)) as
+plain tuples and encoded chunk by chunk into a StreamingHttpResponse: only one
+chunk of rows is in memory at a time, whatever the size of the history. The
+columns are those ActivityImporter reads back, so an export can be re-imported.
+"""
+import csv
+import heapq
+import json
+from itertools import islice
+
+from .models import Activity, ArchivedActivity
+
+EXPORT_TYPES = {
+    'csv': 'text/csv; charset=utf-8',
+    'ndjson': 'application/x-ndjson',
+}
+CHUNK_SIZE = 2000
+COLUMNS = ['id', 'activity_type', 'duration_minutes', 'calories', 'satisfaction', 'notes', 'xp_earned', 'created_at']
+
+
+def activity_rows(character_id, chunk_size=CHUNK_SIZE):
+    """
+    Tuples of COLUMNS, oldest first, fetched `chunk_size` rows at a time. The
+    archived activities (see tracking.archive) are merged in date order.
+    """
+    sources = [
+        source.objects.filter(character_id=character_id)
+        .order_by('created_at', 'id')
+        .values_list('id', 'activity_type__name', 'duration_minutes', 'calories', 'satisfaction', 'notes', 'xp_earned', 'created_at')
+        .iterator(chunk_size=chunk_size)
+        for source in (ArchivedActivity, Activity)
+    ]
+    return heapq.merge(*sources, key=lambda row: (row[7], row[0]))
+
+
+class LineBuffer:
+    """File-like object for csv.writer: keeps the written lines until they are taken."""
+
+    def __init__(self):
+        self.lines = []
+
+    def write(self, line):
+        self.lines.append(line)
+
+    def take(self):
+        text, self.lines = ''.join(self.lines), []
+        return text
+
+
+def export_csv(rows, chunk_size=CHUNK_SIZE):
+    buffer = LineBuffer()
+    writer = csv.writer(buffer)
+    writer.writerow(COLUMNS)
+    yield buffer.take()
+    while chunk := list(islice(rows, chunk_size)):
+        writer.writerows(
+            (pk, activity_type, duration, calories, satisfaction, notes, xp, created_at.isoformat())
+            for pk, activity_type, duration, calories, satisfaction, notes, xp, created_at in chunk
+        )
+        yield buffer.take()
+
+
+def export_ndjson(rows, chunk_size=CHUNK_SIZE):
+    encoder = json.JSONEncoder(ensure_ascii=False, separators=(',', ':'))
+    while chunk := list(islice(rows, chunk_size)):
+        lines = []
+        for row in chunk:
+            values = dict(zip(COLUMNS, row))
+            values['created_at'] = values['created_at'].isoformat()
+            lines.append(encoder.encode(values))
+        yield '\n'.join(lines) + '\n'
+
+
+EXPORTERS = {
+    'csv': export_csv,
+    'ndjson': export_ndjson,
+}
+
+
+def export_activities(character_id, file_type, chunk_size=CHUNK_SIZE):
+    """Iterator of text chunks of the export of a character's activities."""
+    return EXPORTERS[file_type](activity_rows(character_id, chunk_size), chunk_size)
@@ -0,0 +1,358 @@
+"""
+Bulk import of activities exported by fitness apps (CSV, JSON, NDJSON, GPX).
+
+The files are parsed as streams (one row, object or track at a time), mapped to
+ActivityType, and inserted by chunks with ActivityService.create_many: no
+per-row save, and the XP reaches the character once per import.
+
+    CSV     header with type, duration (minutes, "h:mm:ss") or duration_seconds
+            or end, date, calories, satisfaction, notes (a few aliases accepted)
+    JSON    an array of objects with the same keys (up to MAX_OBJECT_SIZE characters each)
+    NDJSON  one object per line
+    GPX     one activity per <trk>: type, name, first and last <time>
+"""
+import codecs
+import csv
+import json
+import re
+import time
+from dataclasses import dataclass, field
+from datetime import datetime
+from itertools import islice
+from xml.etree.ElementTree import ParseError, iterparse
+
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+from .models import Activity, ActivityType
+from .services import ActivityService, XPLedgerService
+
+FILE_TYPES = ['csv', 'json', 'ndjson', 'gpx']
+CHUNK_SIZE = 1000
+READ_SIZE = 64 * 1024
+MAX_REPORTED_ERRORS = 100
+IMPORTED_CATEGORY = "Imported"
+
+# Column/key names used by the common exports -> Activity field
+FIELD_ALIASES = {
+    'activity_type': 'activity_type', 'type': 'activity_type', 'activity': 'activity_type', 'sport': 'activity_type',
+    'duration_minutes': 'duration_minutes', 'duration': 'duration_minutes', 'minutes': 'duration_minutes',
+    'duration_seconds': 'duration_seconds', 'elapsed_time': 'duration_seconds', 'moving_time': 'duration_seconds',
+    'date': 'date', 'start': 'date', 'start_time': 'date', 'start_date': 'date', 'created_at': 'date',
+    'end': 'end', 'end_time': 'end',
+    'calories': 'calories', 'kcal': 'calories',
+    'satisfaction': 'satisfaction',
+    'notes': 'notes', 'name': 'notes', 'title': 'notes', 'description': 'notes',
+}
+
+
+class ActivityImportError(ValueError):
+    """The file cannot be read at all (wrong format, broken JSON/XML)."""
+
+
+class RowError(ValueError):
+    """A row the parser could not read: reported and skipped like an invalid one."""
+
+
+@dataclass
+class ImportResult:
+    created: int = 0
+    skipped: int = 0
+    errors: list = field(default_factory=list)  # (row number from 1, message), the first MAX_REPORTED_ERRORS
+    seconds: float = 0.0
+
+    def add_error(self, row_number, message):
+        self.skipped += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append((row_number, message))
+
+
+# Parsers: binary stream -> iterator of dicts
+
+def parse_csv(stream):
+    yield from csv.DictReader(codecs.getreader('utf-8-sig')(stream))
+
+
+def parse_ndjson(stream):
+    for line_number, line in enumerate(codecs.getreader('utf-8-sig')(stream), start=1):
+        if line.strip():
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError as error:
+                raise ActivityImportError(f"Line {line_number}: invalid JSON ({error.msg}).")
+
+
+WHITESPACE = re.compile(r'\s*')
+# Characters of one element of a JSON array: a longer one is skipped, not buffered
+MAX_OBJECT_SIZE = 64 * 1024
+
+
+def parse_json(stream, read_size=None, max_object_size=None):
+    """
+    Objects of a top-level JSON array, decoded one by one as the file is read.
+    An object longer than `max_object_size` is read past without being kept in
+    memory, and yielded as a RowError.
+    """
+    read_size = read_size or READ_SIZE
+    max_object_size = max_object_size or MAX_OBJECT_SIZE
+    reader = codecs.getreader('utf-8-sig')(stream)
+    decoder = json.JSONDecoder()
+    buffer, position, eof = '', 0, False
+
+    def read_more():
+        nonlocal buffer, position, eof
+        chunk = reader.read(read_size)
+        eof = not chunk
+        buffer, position = buffer[position:] + chunk, 0
+
+    def skip_value():
+        """Move `position` past the value starting there, following its strings and nesting."""
+        nonlocal buffer, position
+        depth, in_string, escaped = 0, False, False
+        while True:
+            for index in range(position, len(buffer)):
+                char = buffer[index]
+                if in_string:
+                    if escaped:
+                        escaped = False
+                    elif char == '\\':
+                        escaped = True
+                    elif char == '"':
+                        in_string = False
+                        if not depth:
+                            position = index + 1
+                            return
+                elif char == '"':
+                    in_string = True
+                elif char in '{[':
+                    depth += 1
+                elif char in '}]' and depth:
+                    depth -= 1
+                    if not depth:
+                        position = index + 1
+                        return
+                elif char in ',]' and not depth:
+                    position = index
+                    return
+            if eof:
+                raise ActivityImportError("Unexpected end of the JSON file.")
+            buffer, position = '', 0  # Scanned: dropped
+            read_more()
+
+    read_more()
+    while not buffer.strip() and not eof:
+        read_more()
+    buffer = buffer.lstrip()
+    if not buffer.startswith('['):
+        raise ActivityImportError("A JSON file must contain an array of activities.")
+    position = 1
+    expected = 'first'  # 'first' (an object or the end), 'object' (after a comma), 'separator'
+    while True:
+        position = WHITESPACE.match(buffer, position).end()
+        if position == len(buffer):
+            if eof:
+                raise ActivityImportError("Unexpected end of the JSON file.")
+            read_more()
+            continue
+        char = buffer[position]
+        if expected == 'separator':
+            if char == ']':
+                return
+            if char != ',':
+                raise ActivityImportError("Invalid JSON (expected ',' or ']' after an activity).")
+            position += 1
+            expected = 'object'
+            continue
+        if char == ']' and expected == 'first':
+            return
+        if char in ',]':
+            raise ActivityImportError("Invalid JSON (expected an activity).")
+        try:
+            value, end = decoder.raw_decode(buffer, position)
+        except json.JSONDecodeError as error:
+            if eof:
+                raise ActivityImportError(f"Invalid JSON ({error.msg}).")
+            if len(buffer) - position > max_object_size:
+                skip_value()
+                expected = 'separator'
+                yield RowError(f"Activity longer than {max_object_size} characters.")
+                continue
+            read_more()  # The object continues in the next chunk
+            continue
+        if end == len(buffer) and not eof:
+            read_more()  # A number may go on in the next chunk
+            continue
+        position = end
+        expected = 'separator'
+        yield value
+
+
+def local_name(tag):
+    return tag.rsplit('}', 1)[-1]
+
+
+def parse_gpx(stream):
+    """One dict per track: the points are only used for the first and last timestamps."""
+    root = None
+    track = None
+    try:
+        for event, element in iterparse(stream, events=('start', 'end')):
+            name = local_name(element.tag)
+            if event == 'start':
+                if root is None:
+                    root = element
+                if name == 'trk':
+                    track = {'first': None, 'last': None}
+                continue
+            if track is None:
+                continue
+            if name == 'time' and element.text:
+                track['first'] = track['first'] or element.text
+                track['last'] = element.text
+            elif name in ('name', 'type', 'desc') and element.text and name not in track:
+                # The track's own name/type (the points have none)
+                track[name] = element.text.strip()
+            elif name == 'trkpt':
+                element.clear()
+            elif name == 'trk':
+                yield {
+                    'activity_type': track.get('type'),
+                    'date': track['first'],
+                    'end': track['last'],
+                    'notes': track.get('name') or track.get('desc'),
+                }
+                track = None
+                root.clear()  # Free the parsed tracks
+    except ParseError as error:
+        raise ActivityImportError(f"Invalid GPX file ({error}).")
+
+
+PARSERS = {
+    'csv': parse_csv,
+    'json': parse_json,
+    'ndjson': parse_ndjson,
+    'gpx': parse_gpx,
+}
+
+
+def guess_file_type(filename):
+    extension = filename.rsplit('.', 1)[-1].lower() if '.' in filename else ''
+    return {'jsonl': 'ndjson'}.get(extension, extension) if extension in FILE_TYPES + ['jsonl'] else None
+
+
+# Row values
+
+def parse_timestamp(value):
+    if not value:
+        return None
+    value = str(value).strip().replace('Z', '+00:00')
+    moment = parse_datetime(value)
+    if moment is None:
+        day = parse_date(value)
+        if day is None:
+            raise ValueError(f"Invalid date: {value}")
+        moment = datetime.combine(day, datetime.min.time())
+    if timezone.is_naive(moment):
+        moment = timezone.make_aware(moment)
+    return moment
+
+
+def parse_minutes(value):
+    """'45', '45.5' or 'h:mm:ss' / 'mm:ss' -> minutes."""
+    value = str(value).strip()
+    if ':' in value:
+        seconds = 0
+        for part in value.split(':'):
+            seconds = seconds * 60 + float(part)
+        return seconds / 60
+    return float(value)
+
+
+def optional_int(value):
+    if value is None or str(value).strip() == '':
+        return None
+    return int(float(value))
+
+
+class ActivityImporter:
+    def __init__(self, character, create_missing_types=False, chunk_size=CHUNK_SIZE, default_satisfaction=5):
+        self.character = character
+        self.create_missing_types = create_missing_types
+        self.chunk_size = chunk_size
+        self.default_satisfaction = default_satisfaction
+        # Few activity types: loaded once, matched by name without case
+        self.types = {name.lower(): pk for pk, name in ActivityType.objects.values_list('pk', 'name')}
+
+    def activity_type_id(self, name):
+        if not name or not str(name).strip():
+            raise ValueError("Missing activity type.")
+        name = str(name).strip()
+        if name.lower() not in self.types:
+            if not self.create_missing_types:
+                raise ValueError(f"Unknown activity type: {name}")
+            activity_type, _ = ActivityType.objects.get_or_create(name=name, defaults={'category': IMPORTED_CATEGORY})
+            self.types[name.lower()] = activity_type.pk
+        return self.types[name.lower()]
+
+    def build_activity(self, raw):
+        """Map a parsed row to an unsaved Activity (ValueError if a value is invalid)."""
+        row = {}
+        for key, value in raw.items():
+            name = FIELD_ALIASES.get(str(key).strip().lower())
+            if name and name not in row:
+                row[name] = value
+
+        start = parse_timestamp(row.get('date'))
+        if row.get('duration_minutes') not in (None, ''):
+            minutes = parse_minutes(row['duration_minutes'])
+        elif row.get('duration_seconds') not in (None, ''):
+            minutes = float(row['duration_seconds']) / 60
+        elif start and row.get('end'):
+            minutes = (parse_timestamp(row['end']) - start).total_seconds() / 60
+        else:
+            raise ValueError("Missing duration.")
+        duration_minutes = max(1, round(minutes))
+
+        satisfaction = optional_int(row.get('satisfaction')) or self.default_satisfaction
+        if not 1 <= satisfaction <= 10:
+            raise ValueError("Satisfaction must be between 1 and 10.")
+        calories = optional_int(row.get('calories'))
+        if calories is not None and calories < 1:
+            calories = None
+        notes = (str(row['notes']).strip() or None) if row.get('notes') else None
+
+        return Activity(
+            activity_type_id=self.activity_type_id(row.get('activity_type')),
+            duration_minutes=duration_minutes,
+            calories=calories,
+            satisfaction=satisfaction,
+            notes=notes[:500] if notes else None,
+            created_at=start or timezone.now(),
+        )
+
+    def valid_activities(self, rows, result):
+        for row_number, raw in enumerate(rows, start=1):
+            try:
+                if isinstance(raw, RowError):
+                    raise raw
+                if not isinstance(raw, dict):
+                    raise ValueError("Expected an object.")
+                yield self.build_activity(raw)
+            except (ValueError, TypeError, OverflowError) as error:
+                result.add_error(row_number, str(error))
+
+    def run(self, stream, file_type):
+        """Import every valid row of `stream` (binary file) in one transaction."""
+        if file_type not in PARSERS:
+            raise ActivityImportError(f"Unsupported file type: {file_type}")
+        result = ImportResult()
+        started = time.perf_counter()
+        activities = self.valid_activities(PARSERS[file_type](stream), result)
+        with transaction.atomic():
+            while chunk := list(islice(activities, self.chunk_size)):
+                result.created += len(ActivityService.create_many(self.character, chunk, batch_size=self.chunk_size))
+            # The whole import reaches the character with one flush
+            XPLedgerService.schedule_flush([self.character.pk])
+        result.seconds = time.perf_counter() - started
+        return result
@@ -0,0 +1,225 @@
+"""
+XP leaderboards: global, per character class, per race, and weekly (XP earned
+during an ISO week, read from the weekly rollups).
+
+    get_leaderboard('class', 3).top()       cached top-N, with ranks
+    get_leaderboard('global').rank(42)      rank of a character
+
+The top-N is an index scan (ORDER BY score DESC LIMIT n, on an index of the
+score) cached under a version number. An XP flush only bumps the version of
+the boards whose cached top-N it can change (a new score reaching the cached
+cut-off). While one request recomputes a top-N, the others serve the previous
+one instead of all running the query (a cache lock against stampedes).
+
+The versions and the lock live in the default cache, so they are only shared
+by the processes when that cache is (see CACHES in the settings). With the
+per-process LocMemCache, a flush in one process does not reach the top-N
+cached by the others, which may serve it for up to TOP_TIMEOUT seconds, and
+each process recomputes its own top-N on a miss.
+
+A rank is 1 + the number of higher scores: a COUNT(*) WHERE score > %s on the
+index of the score, which only reads the index entries above the character, so
+the rank always agrees with the fresh score returned with it. The size of the
+board (a COUNT of all its rows) is cached like the top-N: it may be behind by
+up to TOP_TIMEOUT seconds.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import F
+from django.utils import timezone
+
+from users.models import Character
+from .models import WeeklyActivityRollup
+
+TOP_SIZE = getattr(settings, 'LEADERBOARD_TOP_SIZE', 100)
+TOP_TIMEOUT = getattr(settings, 'LEADERBOARD_TOP_TIMEOUT', 300)
+LOCK_TIMEOUT = 30
+GENERATION_KEY = 'leaderboard:generation'
+
+
+def current_week_start():
+    today = timezone.localdate()
+    return today - timedelta(days=today.weekday())
+
+
+class Leaderboard:
+    scope = None
+    model = Character
+    character_field = 'pk'
+    score_field = 'total_xp'
+    related_prefix = ''  # Path from the model to Character
+
+    def __init__(self, key=None):
+        self.key = key
+
+    def filters(self):
+        return {}
+
+    def queryset(self):
+        return self.model.objects.filter(**self.filters())
+
+    # Cache keys
+
+    @staticmethod
+    def generation():
+        return cache.get_or_set(GENERATION_KEY, 1, None)
+
+    def cache_prefix(self, generation=None):
+        key = self.key.isoformat() if hasattr(self.key, 'isoformat') else self.key
+        return f'leaderboard:{generation or self.generation()}:{self.scope}:{key}'
+
+    # Top-N
+
+    def compute_top(self, size=None):
+        columns = {
+            'character_id': self.character_field,
+            'name': f'{self.related_prefix}name',
+            'username': f'{self.related_prefix}user__username',
+            'level': f'{self.related_prefix}level',
+            'score': self.score_field,
+        }
+        # A name that is already the field's own name cannot be an alias
+        fields = [alias for alias, path in columns.items() if alias == path]
+        aliases = {alias: F(path) for alias, path in columns.items() if alias != path}
+        rows = (
+            self.queryset()
+            .order_by(f'-{self.score_field}', self.character_field)
+            .values(*fields, **aliases)[:size or TOP_SIZE]
+        )
+        entries = []
+        for index, row in enumerate(rows):
+            tied = entries and entries[-1]['score'] == row['score']
+            entries.append({'rank': entries[-1]['rank'] if tied else index + 1, **row})
+        return entries
+
+    def top(self, limit=None):
+        limit = limit or TOP_SIZE
+        prefix = self.cache_prefix()
+        version = cache.get_or_set(f'{prefix}:version', 1, None)
+        key = f'{prefix}:top:{version}'
+        entries = cache.get(key)
+        if entries is not None:
+            return entries[:limit]
+
+        lock = f'{prefix}:lock'
+        if cache.add(lock, 1, LOCK_TIMEOUT):
+            try:
+                entries = self.compute_top()
+                # Scores below the cut-off cannot enter this top-N (0 while it is not full)
+                cutoff = entries[-1]['score'] if len(entries) >= TOP_SIZE else 0
+                cache.set_many({key: entries, f'{prefix}:cutoff:{version}': cutoff}, TOP_TIMEOUT)
+                cache.set(f'{prefix}:top:last', entries, None)
+            finally:
+                cache.delete(lock)
+            return entries[:limit]
+
+        # Another request is computing it: serve the previous top-N meanwhile
+        entries = cache.get(f'{prefix}:top:last')
+        if entries is None:
+            entries = self.compute_top()
+        return entries[:limit]
+
+    def invalidate(self, score=None):
+        """Drop the cached top-N if `score` can enter it (always when `score` is None)."""
+        prefix = self.cache_prefix()
+        version = cache.get(f'{prefix}:version')
+        if version is None:
+            return  # Nothing cached yet
+        if score is not None:
+            cutoff = cache.get(f'{prefix}:cutoff:{version}')
+            if cutoff is not None and score < cutoff:
+                return
+        try:
+            cache.incr(f'{prefix}:version')
+        except ValueError:
+            pass  # Evicted meanwhile
+
+    # Ranks
+
+    def score_of(self, character_id):
+        return self.queryset().filter(**{self.character_field: character_id}).values_list(self.score_field, flat=True).first()
+
+    def total(self):
+        """Number of characters on the board (cached, see the module docstring)."""
+        key = f'{self.cache_prefix()}:total'
+        total = cache.get(key)
+        if total is None:
+            total = self.queryset().count()
+            cache.set(key, total, TOP_TIMEOUT)
+        return total
+
+    def rank(self, character_id):
+        """{'character_id', 'rank', 'score', 'total'} of a character, None if it is not on the board."""
+        score = self.score_of(character_id)
+        if score is None:
+            return None
+        higher = self.queryset().filter(**{f'{self.score_field}__gt': score}).count()
+        return {'character_id': character_id, 'rank': higher + 1, 'score': score, 'total': self.total()}
+
+
+class GlobalLeaderboard(Leaderboard):
+    scope = 'global'
+
+
+class ClassLeaderboard(Leaderboard):
+    scope = 'class'
+
+    def filters(self):
+        return {'character_class_id': self.key}
+
+
+class RaceLeaderboard(Leaderboard):
+    scope = 'race'
+
+    def filters(self):
+        return {'race_id': self.key}
+
+
+class WeeklyLeaderboard(Leaderboard):
+    """XP earned during the ISO week starting on `key` (a Monday, the current week by default)."""
+    scope = 'weekly'
+    model = WeeklyActivityRollup
+    character_field = 'character_id'
+    related_prefix = 'character__'
+
+    def __init__(self, key=None):
+        super().__init__(key or current_week_start())
+
+    def filters(self):
+        return {'week_start': self.key}
+
+
+LEADERBOARDS = {board.scope: board for board in (GlobalLeaderboard, ClassLeaderboard, RaceLeaderboard, WeeklyLeaderboard)}
+
+
+def get_leaderboard(scope, key=None):
+    return LEADERBOARDS[scope](key)
+
+
+class LeaderboardService:
+    @staticmethod
+    def scores_changed(character_ids):
+        """
+        XP was added to `character_ids`: bump the boards whose top-N one of their
+        new scores can enter (one query for the scores, none for the boards left alone).
+        """
+        best = {}
+        rows = Character.objects.filter(pk__in=list(character_ids)).values_list('character_class_id', 'race_id', 'total_xp')
+        for class_id, race_id, total_xp in rows:
+            for board in (('global', None), ('class', class_id), ('race', race_id)):
+                best[board] = max(best.get(board, 0), total_xp)
+        for (scope, key), score in best.items():
+            get_leaderboard(scope, key).invalidate(score)
+        if best:
+            # The weekly score is not total_xp, and only the current week moves
+            get_leaderboard('weekly').invalidate()
+
+    @staticmethod
+    def invalidate_all():
+        """Scores went down or characters left (rebuild, deletion): forget every cached board."""
+        try:
+            cache.incr(GENERATION_KEY)
+        except ValueError:
+            pass
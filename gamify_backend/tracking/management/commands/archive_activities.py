@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+
+from tracking.archive import CHUNK_SIZE, ActivityArchiver
+
+
+class Command(BaseCommand):
+    help = "Move the old activities to the archive tables (see ACTIVITY_ARCHIVE_AFTER_DAYS)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, help="Archive the months ended this many days ago (ACTIVITY_ARCHIVE_AFTER_DAYS by default).")
+        parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE, help="Activities moved per transaction.")
+
+    def handle(self, *args, **options):
+        archiver = ActivityArchiver(days=options['days'], chunk_size=options['chunk_size'])
+        progress = self.report_progress if options['verbosity'] >= 2 else None
+        result = archiver.run(progress=progress)
+        self.stdout.write(self.style.SUCCESS(
+            f"{result.archived} activities created before {result.cutoff.date()} archived "
+            f"in {result.seconds:.1f}s ({result.rate:.0f} rows/s)."
+        ))
+
+    def report_progress(self, result):
+        self.stdout.write(f"{result.archived} activities archived ({result.rate:.0f} rows/s)")
@@ -0,0 +1,43 @@
+import time
+
+import numpy as np
+from django.core.management.base import BaseCommand
+
+from tracking.leaderboards import LEADERBOARDS, get_leaderboard
+
+
+class Command(BaseCommand):
+    help = (
+        "Time leaderboard rank lookups (the score, then a COUNT of the higher scores "
+        "on the score index) for the characters of a board of the current database."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--scope', choices=sorted(LEADERBOARDS), default='global')
+        parser.add_argument('--key', type=int, help="Class or race id of the board.")
+        parser.add_argument('--lookups', type=int, default=1000, help="Number of rank lookups timed.")
+        parser.add_argument('--seed', type=int, default=0)
+
+    def report(self, label, durations):
+        durations = np.asarray(durations) * 1000
+        self.stdout.write(
+            f"{label}: mean {durations.mean():.4f} ms, p99 {np.percentile(durations, 99):.4f} ms, max {durations.max():.4f} ms"
+        )
+
+    def handle(self, *args, **options):
+        board = get_leaderboard(options['scope'], options['key'])
+        started = time.perf_counter()
+        total = board.total()
+        self.stdout.write(f"{total} characters on the board, counted in {time.perf_counter() - started:.2f}s")
+
+        # Characters drawn across the whole board: the count grows with the rank
+        character_ids = np.fromiter(board.queryset().values_list(board.character_field, flat=True).iterator(), dtype=np.int64)
+        rng = np.random.default_rng(options['seed'])
+        lookups = rng.choice(character_ids, size=min(options['lookups'], len(character_ids)), replace=False)
+        durations = []
+        for character_id in lookups.tolist():
+            started = time.perf_counter()
+            board.rank(character_id)
+            durations.append(time.perf_counter() - started)
+        if durations:
+            self.report("rank()", durations)
@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from tracking.services import XPLedgerService
+
+
+class Command(BaseCommand):
+    help = "Fold the pending XP ledger entries into the characters (or rebuild every character from the ledger)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rebuild', action='store_true', help="Recompute every character's XP and level from the whole ledger.")
+
+    def handle(self, *args, **options):
+        if options['rebuild']:
+            updated = XPLedgerService.rebuild()
+            self.stdout.write(self.style.SUCCESS(f"{updated} character(s) rebuilt from the XP ledger."))
+            return
+        updated = XPLedgerService.flush()
+        self.stdout.write(self.style.SUCCESS(f"{updated} character(s) updated."))
@@ -0,0 +1,38 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from tracking.importers import CHUNK_SIZE, FILE_TYPES, ActivityImporter, ActivityImportError, guess_file_type
+from users.models import Character
+
+
+class Command(BaseCommand):
+    help = "Import the activities of a fitness app export (CSV, JSON, NDJSON or GPX) for a character."
+
+    def add_arguments(self, parser):
+        parser.add_argument('character_id', type=int)
+        parser.add_argument('path')
+        parser.add_argument('--file-type', choices=FILE_TYPES, help="Guessed from the file extension by default.")
+        parser.add_argument('--create-types', action='store_true', help="Create the unknown activity types instead of skipping their rows.")
+        parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        try:
+            character = Character.objects.get(pk=options['character_id'])
+        except Character.DoesNotExist:
+            raise CommandError(f"Character {options['character_id']} does not exist.")
+        file_type = options['file_type'] or guess_file_type(options['path'])
+        if file_type is None:
+            raise CommandError("Cannot guess the file type, use --file-type.")
+
+        importer = ActivityImporter(character, create_missing_types=options['create_types'], chunk_size=options['chunk_size'])
+        try:
+            with open(options['path'], 'rb') as stream:
+                result = importer.run(stream, file_type)
+        except (OSError, ActivityImportError) as error:
+            raise CommandError(str(error))
+
+        for row, message in result.errors:
+            self.stderr.write(f"Row {row}: {message}")
+        rate = result.created / result.seconds if result.seconds else 0
+        self.stdout.write(self.style.SUCCESS(
+            f"{result.created} activities imported, {result.skipped} skipped in {result.seconds:.1f}s ({rate:.0f} rows/s)."
+        ))
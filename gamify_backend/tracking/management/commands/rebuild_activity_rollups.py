@@ -0,0 +1,20 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from tracking.rollups import ActivityRollupService
+
+
+class Command(BaseCommand):
+    help = "Recompute the daily, weekly and monthly activity rollups from the activities."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--character', type=int, action='append', dest='characters', help="Only this character (repeatable).")
+        parser.add_argument('--chunk-size', type=int, default=500, help="Characters rebuilt per transaction.")
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        rebuilt = ActivityRollupService.rebuild(options['characters'], chunk_size=options['chunk_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f"Rollups of {rebuilt} character(s) rebuilt in {time.perf_counter() - started:.1f}s."
+        ))
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from gamify_backend.fulltext import FULLTEXT_INDEXES, get_backend
+
+
+class Command(BaseCommand):
+    help = "Create the missing full-text tables and triggers, and index every row again (after a migration rebuilt a table on SQLite)."
+
+    def handle(self, *args, **options):
+        backend = get_backend(connection)
+        for name, index in FULLTEXT_INDEXES.items():
+            backend.install(index, connection)
+            self.stdout.write(self.style.SUCCESS(f"Full-text index {name} rebuilt."))
@@ -0,0 +1,20 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from tracking.streaks import StreakService
+
+
+class Command(BaseCommand):
+    help = "Recompute the daily streaks of the characters from their activities (after a backfill)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--character', type=int, action='append', dest='characters', help="Only this character (repeatable).")
+        parser.add_argument('--chunk-size', type=int, default=500, help="Characters recomputed per transaction.")
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        recomputed = StreakService.recompute(options['characters'], chunk_size=options['chunk_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f"Streaks of {recomputed} character(s) recomputed in {time.perf_counter() - started:.1f}s."
+        ))
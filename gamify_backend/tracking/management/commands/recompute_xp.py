@@ -0,0 +1,46 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from tracking.backfill import CHUNK_SIZE, XPBackfill, XPBackfillError
+
+
+class Command(BaseCommand):
+    help = (
+        "Score every activity again with the active XP rules, add the differences to the characters' XP, "
+        "then recompute their level with the active level curve (after a rule or curve change)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--character', type=int, action='append', dest='characters', help="Only this character (repeatable).")
+        parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE, help="Activities scored per transaction.")
+        parser.add_argument('--dry-run', action='store_true', help="Report the differences without writing anything.")
+        parser.add_argument('--checkpoint', help="Progress file: a run interrupted with the same file resumes where it stopped.")
+
+    def handle(self, *args, **options):
+        backfill = XPBackfill(
+            character_ids=options['characters'],
+            chunk_size=options['chunk_size'],
+            dry_run=options['dry_run'],
+            checkpoint_path=options['checkpoint'],
+        )
+        progress = self.report_progress if options['verbosity'] >= 2 else None
+        try:
+            result = backfill.run(progress=progress)
+        except XPBackfillError as error:
+            raise CommandError(str(error))
+
+        if result.resumed:
+            self.stdout.write("Resumed from the checkpoint.")
+        for pk, old_xp, new_xp in result.activity_diffs:
+            self.stdout.write(f"Activity {pk}: {old_xp} -> {new_xp} XP ({new_xp - old_xp:+d})")
+        for pk, (level, total_xp), (new_level, new_total_xp) in result.character_diffs:
+            self.stdout.write(f"Character {pk}: level {level} -> {new_level}, {total_xp} -> {new_total_xp} XP")
+
+        summary = (
+            f"{result.changed} of {result.scanned} activities {'would change' if options['dry_run'] else 'updated'} "
+            f"({result.xp_delta:+d} XP), {result.characters} character(s) "
+            f"{'would change' if options['dry_run'] else 'with a new level'} in {result.seconds:.1f}s ({result.rate:.0f} rows/s)."
+        )
+        self.stdout.write(self.style.SUCCESS(summary))
+
+    def report_progress(self, result):
+        self.stdout.write(f"{result.scanned} activities scored up to id {result.last_pk} ({result.rate:.0f} rows/s)")
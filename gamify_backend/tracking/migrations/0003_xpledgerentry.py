@@ -0,0 +1,35 @@
+# Generated by Django 5.2.7 on 2026-10-16 20:38
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tracking', '0002_initial'),
+        ('users', '0003_levelthreshold'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='XPLedgerEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('source_type', models.CharField(choices=[('activity', 'Activity'), ('fight', 'Fight'), ('adventure', 'Adventure completion'), ('reward', 'Reward'), ('adjustment', 'Adjustment')], max_length=20, verbose_name='Source type')),
+                ('source_id', models.BigIntegerField(blank=True, null=True, verbose_name='Source id (activity, enemy, adventure...)')),
+                ('idempotency_key', models.CharField(max_length=100, unique=True, verbose_name='Idempotency key (one grant per source)')),
+                ('amount', models.IntegerField(verbose_name='XP amount')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Creation date')),
+                ('flush_id', models.UUIDField(blank=True, null=True, verbose_name='Flush that applied the entry')),
+                ('applied_at', models.DateTimeField(blank=True, null=True, verbose_name='Date applied to the character')),
+                ('character', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='xp_entries', to='users.character', verbose_name='Associated character')),
+            ],
+            options={
+                'verbose_name': 'XP ledger entry',
+                'verbose_name_plural': 'XP ledger entries',
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['character', '-created_at'], name='tracking_xp_charact_a67eab_idx'), models.Index(fields=['flush_id'], name='tracking_xp_flush_i_412d73_idx'), models.Index(condition=models.Q(('applied_at__isnull', True)), fields=['character'], name='xp_ledger_pending_idx')],
+            },
+        ),
+    ]
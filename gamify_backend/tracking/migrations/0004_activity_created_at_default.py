@@ -0,0 +1,19 @@
+# Generated by Django 5.2.7 on 2026-10-16 20:54
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tracking', '0003_xpledgerentry'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='activity',
+            name='created_at',
+            field=models.DateTimeField(default=django.utils.timezone.now, editable=False, verbose_name='Creation date'),
+        ),
+    ]
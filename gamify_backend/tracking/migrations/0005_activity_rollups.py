@@ -0,0 +1,73 @@
+# Generated by Django 5.2.7 on 2026-10-16 20:58
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tracking', '0004_activity_created_at_default'),
+        ('users', '0006_database_constraints'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyActivityRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('activity_count', models.IntegerField(default=0, verbose_name='Number of activities')),
+                ('total_minutes', models.IntegerField(default=0, verbose_name='Total duration in minutes')),
+                ('total_calories', models.IntegerField(default=0, verbose_name='Total calories burned')),
+                ('total_xp', models.IntegerField(default=0, verbose_name='Total experience earned')),
+                ('satisfaction_sum', models.IntegerField(default=0, verbose_name='Sum of the satisfaction levels')),
+                ('day', models.DateField(verbose_name='Day')),
+                ('character', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='users.character', verbose_name='Associated character')),
+            ],
+            options={
+                'verbose_name': 'Daily activity rollup',
+                'verbose_name_plural': 'Daily activity rollups',
+                'ordering': ['character', 'day'],
+                'constraints': [models.UniqueConstraint(fields=('character', 'day'), name='daily_rollup_unique_day')],
+            },
+        ),
+        migrations.CreateModel(
+            name='MonthlyActivityTypeRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('activity_count', models.IntegerField(default=0, verbose_name='Number of activities')),
+                ('total_minutes', models.IntegerField(default=0, verbose_name='Total duration in minutes')),
+                ('total_calories', models.IntegerField(default=0, verbose_name='Total calories burned')),
+                ('total_xp', models.IntegerField(default=0, verbose_name='Total experience earned')),
+                ('satisfaction_sum', models.IntegerField(default=0, verbose_name='Sum of the satisfaction levels')),
+                ('month', models.DateField(verbose_name='First day of the month')),
+                ('activity_type', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='tracking.activitytype', verbose_name='Activity type')),
+                ('character', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='users.character', verbose_name='Associated character')),
+            ],
+            options={
+                'verbose_name': 'Monthly activity type rollup',
+                'verbose_name_plural': 'Monthly activity type rollups',
+                'ordering': ['character', 'month', 'activity_type'],
+                'constraints': [models.UniqueConstraint(fields=('character', 'month', 'activity_type'), name='monthly_rollup_unique_type_month')],
+            },
+        ),
+        migrations.CreateModel(
+            name='WeeklyActivityRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('activity_count', models.IntegerField(default=0, verbose_name='Number of activities')),
+                ('total_minutes', models.IntegerField(default=0, verbose_name='Total duration in minutes')),
+                ('total_calories', models.IntegerField(default=0, verbose_name='Total calories burned')),
+                ('total_xp', models.IntegerField(default=0, verbose_name='Total experience earned')),
+                ('satisfaction_sum', models.IntegerField(default=0, verbose_name='Sum of the satisfaction levels')),
+                ('week_start', models.DateField(verbose_name='Monday of the ISO week')),
+                ('character', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='users.character', verbose_name='Associated character')),
+            ],
+            options={
+                'verbose_name': 'Weekly activity rollup',
+                'verbose_name_plural': 'Weekly activity rollups',
+                'ordering': ['character', 'week_start'],
+                'constraints': [models.UniqueConstraint(fields=('character', 'week_start'), name='weekly_rollup_unique_week')],
+            },
+        ),
+    ]
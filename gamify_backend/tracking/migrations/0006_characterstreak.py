@@ -0,0 +1,29 @@
+# Generated by Django 5.2.7 on 2026-10-16 21:02
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tracking', '0005_activity_rollups'),
+        ('users', '0007_user_time_zone'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CharacterStreak',
+            fields=[
+                ('character', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='streak', serialize=False, to='users.character', verbose_name='Associated character')),
+                ('current_streak', models.PositiveIntegerField(default=0, verbose_name='Days of the streak ending on the last active day')),
+                ('longest_streak', models.PositiveIntegerField(default=0, verbose_name='Longest streak')),
+                ('last_active_date', models.DateField(blank=True, null=True, verbose_name="Last active day (user's time zone)")),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Last update')),
+            ],
+            options={
+                'verbose_name': 'Character streak',
+                'verbose_name_plural': 'Character streaks',
+            },
+        ),
+    ]
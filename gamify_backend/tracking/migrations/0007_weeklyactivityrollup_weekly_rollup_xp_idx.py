@@ -0,0 +1,18 @@
+# Generated by Django 5.2.7 on 2026-10-16 21:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tracking', '0006_characterstreak'),
+        ('users', '0008_character_leaderboard_indexes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='weeklyactivityrollup',
+            index=models.Index(fields=['week_start', '-total_xp', 'character'], name='weekly_rollup_xp_idx'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.7 on 2026-10-16 21:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tracking', '0007_weeklyactivityrollup_weekly_rollup_xp_idx'),
+        ('users', '0008_character_leaderboard_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='activity',
+            name='client_id',
+            field=models.CharField(blank=True, editable=False, max_length=64, null=True, verbose_name='Client idempotency key'),
+        ),
+        migrations.AddConstraint(
+            model_name='activity',
+            constraint=models.UniqueConstraint(condition=models.Q(('client_id__isnull', False)), fields=('character', 'client_id'), name='activity_unique_client_id'),
+        ),
+    ]
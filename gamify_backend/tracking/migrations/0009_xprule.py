@@ -0,0 +1,42 @@
+# Generated by Django 5.2.7 on 2026-10-16 21:34
+
+import django.core.validators
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tracking', '0008_activity_client_id'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='XPRule',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, unique=True, verbose_name='Rule name')),
+                ('is_active', models.BooleanField(default=True, verbose_name='Rule applied')),
+                ('priority', models.IntegerField(default=0, verbose_name='Evaluation order')),
+                ('category', models.CharField(blank=True, default='', max_length=50, verbose_name='Activity type category')),
+                ('min_duration', models.PositiveIntegerField(blank=True, null=True, verbose_name='Minimum duration in minutes')),
+                ('min_calories', models.PositiveIntegerField(blank=True, null=True, verbose_name='Minimum calories burned')),
+                ('min_satisfaction', models.IntegerField(blank=True, null=True, validators=[django.core.validators.MinValueValidator(1), django.core.validators.MaxValueValidator(10)], verbose_name='Minimum satisfaction level')),
+                ('max_satisfaction', models.IntegerField(blank=True, null=True, validators=[django.core.validators.MinValueValidator(1), django.core.validators.MaxValueValidator(10)], verbose_name='Maximum satisfaction level')),
+                ('xp_per_minute', models.FloatField(default=0, verbose_name='XP per minute')),
+                ('xp_per_calorie', models.FloatField(default=0, verbose_name='XP per calorie')),
+                ('xp_per_satisfaction', models.FloatField(default=0, verbose_name='XP per satisfaction point')),
+                ('bonus_xp', models.IntegerField(default=0, verbose_name='Flat XP bonus')),
+                ('multiplier', models.FloatField(default=1.0, validators=[django.core.validators.MinValueValidator(0)], verbose_name='Multiplier of the total')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Last update')),
+                ('activity_type', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='xp_rules', to='tracking.activitytype', verbose_name='Activity type')),
+            ],
+            options={
+                'verbose_name': 'XP rule',
+                'verbose_name_plural': 'XP rules',
+                'ordering': ['priority', 'id'],
+                'constraints': [models.CheckConstraint(condition=models.Q(('multiplier__gte', 0)), name='xp_rule_multiplier_gte_0')],
+            },
+        ),
+    ]
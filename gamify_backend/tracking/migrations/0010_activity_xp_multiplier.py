@@ -0,0 +1,18 @@
+# Generated by Django 5.2.7 on 2026-10-16 21:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tracking', '0009_xprule'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='activity',
+            name='xp_multiplier',
+            field=models.FloatField(blank=True, editable=False, null=True, verbose_name='Character XP multiplier when logged'),
+        ),
+    ]
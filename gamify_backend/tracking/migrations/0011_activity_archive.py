@@ -0,0 +1,57 @@
+# Generated by Django 5.2.7 on 2026-10-16 22:10
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tracking', '0010_activity_xp_multiplier'),
+        ('users', '0008_character_leaderboard_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedActivity',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False, verbose_name='Original activity id')),
+                ('duration_minutes', models.IntegerField(verbose_name='Duration in minutes')),
+                ('calories', models.IntegerField(blank=True, null=True, verbose_name='Calories burned')),
+                ('satisfaction', models.IntegerField(verbose_name='Satisfaction level')),
+                ('notes', models.TextField(blank=True, null=True, verbose_name='Optional commentary')),
+                ('xp_earned', models.IntegerField(verbose_name='Experience earned')),
+                ('xp_multiplier', models.FloatField(blank=True, null=True, verbose_name='Character XP multiplier when logged')),
+                ('created_at', models.DateTimeField(verbose_name='Creation date')),
+                ('client_id', models.CharField(blank=True, max_length=64, null=True, verbose_name='Client idempotency key')),
+                ('archived_at', models.DateTimeField(auto_now_add=True, verbose_name='Archival date')),
+                ('activity_type', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='+', to='tracking.activitytype', verbose_name='Activity type')),
+                ('character', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_activities', to='users.character', verbose_name='Associated character')),
+            ],
+            options={
+                'verbose_name': 'Archived activity',
+                'verbose_name_plural': 'Archived activities',
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['character', 'created_at'], name='archived_activity_char_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='MonthlyActivityArchive',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('activity_count', models.IntegerField(default=0, verbose_name='Number of activities')),
+                ('total_minutes', models.IntegerField(default=0, verbose_name='Total duration in minutes')),
+                ('total_calories', models.IntegerField(default=0, verbose_name='Total calories burned')),
+                ('total_xp', models.IntegerField(default=0, verbose_name='Total experience earned')),
+                ('satisfaction_sum', models.IntegerField(default=0, verbose_name='Sum of the satisfaction levels')),
+                ('month', models.DateField(verbose_name='First day of the month')),
+                ('character', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='users.character', verbose_name='Associated character')),
+            ],
+            options={
+                'verbose_name': 'Monthly activity archive',
+                'verbose_name_plural': 'Monthly activity archives',
+                'ordering': ['character', 'month'],
+                'constraints': [models.UniqueConstraint(fields=('character', 'month'), name='monthly_archive_unique_month')],
+            },
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 5.2.7 on 2026-10-16 22:40
+
+from django.db import migrations
+
+from gamify_backend.fulltext import drop_sqlite_index, install_sqlite_index
+
+
+def create_notes_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        install_sqlite_index(schema_editor.connection, 'tracking_activity', ['notes'])
+
+
+def drop_notes_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        drop_sqlite_index(schema_editor.connection, 'tracking_activity')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tracking', '0011_activity_archive'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_notes_index, drop_notes_index),
+    ]
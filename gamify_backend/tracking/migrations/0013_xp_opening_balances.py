@@ -0,0 +1,60 @@
+# Generated by Django 5.2.7 on 2026-10-17 09:10
+
+from django.db import migrations, models
+from django.db.models import Sum
+from django.utils import timezone
+
+BATCH_SIZE = 1000
+
+
+def record_opening_balances(apps, schema_editor):
+    """
+    One 'opening' entry per character for the XP it earned before the ledger
+    existed: its total_xp minus what the applied entries already brought, so
+    that a rebuild from the ledger gives its total back.
+    """
+    Character = apps.get_model('users', 'Character')
+    XPLedgerEntry = apps.get_model('tracking', 'XPLedgerEntry')
+    applied = dict(
+        XPLedgerEntry.objects.filter(applied_at__isnull=False)
+        .values_list('character_id').annotate(total=Sum('amount')).order_by()
+    )
+    now = timezone.now()
+    entries = []
+    for character_id, total_xp in Character.objects.values_list('pk', 'total_xp').iterator(chunk_size=BATCH_SIZE):
+        amount = total_xp - applied.get(character_id, 0)
+        if amount:
+            entries.append(XPLedgerEntry(
+                character_id=character_id,
+                source_type='opening',
+                source_id=character_id,
+                idempotency_key=f'opening:{character_id}',
+                amount=amount,
+                # Already in total_xp: never folded in again
+                applied_at=now,
+            ))
+        if len(entries) >= BATCH_SIZE:
+            XPLedgerEntry.objects.bulk_create(entries, ignore_conflicts=True)
+            entries = []
+    XPLedgerEntry.objects.bulk_create(entries, ignore_conflicts=True)
+
+
+def delete_opening_balances(apps, schema_editor):
+    apps.get_model('tracking', 'XPLedgerEntry').objects.filter(source_type='opening').delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tracking', '0012_activity_notes_fts'),
+        ('users', '0008_character_leaderboard_indexes'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='xpledgerentry',
+            name='source_type',
+            field=models.CharField(choices=[('activity', 'Activity'), ('fight', 'Fight'), ('adventure', 'Adventure completion'), ('reward', 'Reward'), ('adjustment', 'Adjustment'), ('opening', 'Opening balance')], max_length=20, verbose_name='Source type'),
+        ),
+        migrations.RunPython(record_opening_balances, delete_opening_balances),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.7 on 2026-10-17 10:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tracking', '0013_xp_opening_balances'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='archivedactivity',
+            index=models.Index(condition=models.Q(('client_id__isnull', False)), fields=['character', 'client_id'], name='archived_activity_client_idx'),
+        ),
+    ]
@@ -2,6 +2,7 @@ from django.db import models
 from django.core.exceptions import ValidationError
 from django.core.validators import MinValueValidator
 from django.core.validators import MaxValueValidator
+from django.utils import timezone
 
 # from users.models import Character
 
@@ -45,7 +46,12 @@ class Activity(models.Model):
     satisfaction = models.IntegerField(validators=[MinValueValidator(1), MaxValueValidator(10)], verbose_name="Satisfaction level")
     notes = models.TextField(blank=True, null=True, max_length=500, verbose_name="Optional commentary")
     xp_earned = models.IntegerField(default=0, validators=[MinValueValidator(0)], verbose_name="Experience earned")
-    created_at = models.DateTimeField(auto_now_add=True, verbose_name="Creation date")
+    # Kept so that the XP can be scored again after a rule change (see tracking.backfill)
+    xp_multiplier = models.FloatField(blank=True, null=True, editable=False, verbose_name="Character XP multiplier when logged")
+    # Not auto_now_add: imported activities keep their original date
+    created_at = models.DateTimeField(default=timezone.now, editable=False, verbose_name="Creation date")
+    # Idempotency key generated by the client (offline sync): a retried activity is stored once
+    client_id = models.CharField(max_length=64, blank=True, null=True, editable=False, verbose_name="Client idempotency key")
 
     class Meta:
         verbose_name = "Activity"
@@ -55,6 +61,13 @@ class Activity(models.Model):
             models.Index(fields=['character', '-created_at']),
             models.Index(fields=['activity_type', '-created_at']),
         ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['character', 'client_id'],
+                condition=models.Q(client_id__isnull=False),
+                name='activity_unique_client_id',
+            ),
+        ]
 
     def clean(self):
         super().clean()
@@ -66,16 +79,252 @@ class Activity(models.Model):
     def __str__(self):
         return f"{self.character.name} - {self.activity_type.name} ({self.duration_minutes}min)"
 
+    def character_multiplier(self):
+        """XP multiplier of the character's current level, without loading the whole character."""
+        character_field = self._meta.get_field('character')
+        if character_field.is_cached(self):
+            return self.character.xp_multiplier
+        character_model = character_field.related_model
+        return character_model(level=character_model.objects.values_list('level', flat=True).get(pk=self.character_id)).xp_multiplier
+
     def calculate_xp(self):
-        """Calc XP based on the duration and the character's multiplier"""
-        base_xp = self.duration_minutes * 5
-        return int(base_xp * self.character.xp_multiplier)
+        """Calc XP with the XP rule set and the character's multiplier"""
+        from .scoring import get_rule_set
+
+        multiplier = self.xp_multiplier if self.xp_multiplier is not None else self.character_multiplier()
+        return get_rule_set().score(
+            self.activity_type_id, self.duration_minutes, self.calories, self.satisfaction,
+            multiplier=multiplier,
+        )
     
     def save(self, *args, **kwargs):
+        # The XP is granted to the character through the XP ledger (see signals)
         if not self.pk:
+            if self.xp_multiplier is None:
+                self.xp_multiplier = self.character_multiplier()
             self.xp_earned = self.calculate_xp()
         super().save(*args, **kwargs)
-        
-        if not self.pk:
-            self.character.current_xp += self.xp_earned
-            self.character.save()
\ No newline at end of file
+
+
+class ArchivedActivity(models.Model):
+    """
+    Activity moved out of the activity table by the archival job (see
+    tracking.archive), with its original id. Kept for the exports and the
+    rebuilds of the rollups and streaks, never scored again.
+    """
+    id = models.BigIntegerField(primary_key=True, verbose_name="Original activity id")
+    character = models.ForeignKey('users.Character', on_delete=models.CASCADE, related_name="archived_activities", verbose_name="Associated character")
+    activity_type = models.ForeignKey(ActivityType, on_delete=models.PROTECT, related_name="+", verbose_name="Activity type")
+    duration_minutes = models.IntegerField(verbose_name="Duration in minutes")
+    calories = models.IntegerField(blank=True, null=True, verbose_name="Calories burned")
+    satisfaction = models.IntegerField(verbose_name="Satisfaction level")
+    notes = models.TextField(blank=True, null=True, verbose_name="Optional commentary")
+    xp_earned = models.IntegerField(verbose_name="Experience earned")
+    xp_multiplier = models.FloatField(blank=True, null=True, verbose_name="Character XP multiplier when logged")
+    created_at = models.DateTimeField(verbose_name="Creation date")
+    client_id = models.CharField(max_length=64, blank=True, null=True, verbose_name="Client idempotency key")
+    archived_at = models.DateTimeField(auto_now_add=True, verbose_name="Archival date")
+
+    class Meta:
+        verbose_name = "Archived activity"
+        verbose_name_plural = "Archived activities"
+        ordering = ['-created_at']
+        # Written once, read by character, and by client_id when an offline sync is replayed
+        indexes = [
+            models.Index(fields=['character', 'created_at'], name='archived_activity_char_idx'),
+            models.Index(
+                fields=['character', 'client_id'],
+                condition=models.Q(client_id__isnull=False),
+                name='archived_activity_client_idx',
+            ),
+        ]
+
+
+class XPRule(models.Model):
+    """
+    One rule of the activity scoring (see tracking.scoring). Every active rule
+    whose conditions match an activity adds its XP, and their multipliers are
+    applied to the sum. Empty conditions match every activity.
+    """
+    name = models.CharField(max_length=100, unique=True, verbose_name="Rule name")
+    is_active = models.BooleanField(default=True, verbose_name="Rule applied")
+    priority = models.IntegerField(default=0, verbose_name="Evaluation order")
+    # Conditions
+    category = models.CharField(max_length=50, blank=True, default='', verbose_name="Activity type category")
+    activity_type = models.ForeignKey(ActivityType, on_delete=models.CASCADE, blank=True, null=True, related_name="xp_rules", verbose_name="Activity type")
+    min_duration = models.PositiveIntegerField(blank=True, null=True, verbose_name="Minimum duration in minutes")
+    min_calories = models.PositiveIntegerField(blank=True, null=True, verbose_name="Minimum calories burned")
+    min_satisfaction = models.IntegerField(blank=True, null=True, validators=[MinValueValidator(1), MaxValueValidator(10)], verbose_name="Minimum satisfaction level")
+    max_satisfaction = models.IntegerField(blank=True, null=True, validators=[MinValueValidator(1), MaxValueValidator(10)], verbose_name="Maximum satisfaction level")
+    # Effects
+    xp_per_minute = models.FloatField(default=0, verbose_name="XP per minute")
+    xp_per_calorie = models.FloatField(default=0, verbose_name="XP per calorie")
+    xp_per_satisfaction = models.FloatField(default=0, verbose_name="XP per satisfaction point")
+    bonus_xp = models.IntegerField(default=0, verbose_name="Flat XP bonus")
+    multiplier = models.FloatField(default=1.0, validators=[MinValueValidator(0)], verbose_name="Multiplier of the total")
+    updated_at = models.DateTimeField(auto_now=True, verbose_name="Last update")
+
+    class Meta:
+        verbose_name = "XP rule"
+        verbose_name_plural = "XP rules"
+        ordering = ['priority', 'id']
+        constraints = [
+            models.CheckConstraint(condition=models.Q(multiplier__gte=0), name='xp_rule_multiplier_gte_0'),
+        ]
+
+    def __str__(self):
+        return self.name
+
+
+class XPLedgerEntry(models.Model):
+    """
+    Append-only journal of every XP grant. Entries are written on the hot path and
+    folded later into the character totals (see tracking.services.XPLedgerService),
+    so XP stays auditable and can be rebuilt from the journal.
+    """
+    SOURCE_TYPES = [
+        ('activity', 'Activity'),
+        ('fight', 'Fight'),
+        ('adventure', 'Adventure completion'),
+        ('reward', 'Reward'),
+        ('adjustment', 'Adjustment'),
+        ('opening', 'Opening balance'),
+    ]
+    character = models.ForeignKey('users.Character', on_delete=models.CASCADE, related_name="xp_entries", verbose_name="Associated character")
+    source_type = models.CharField(max_length=20, choices=SOURCE_TYPES, verbose_name="Source type")
+    source_id = models.BigIntegerField(blank=True, null=True, verbose_name="Source id (activity, enemy, adventure...)")
+    idempotency_key = models.CharField(max_length=100, unique=True, verbose_name="Idempotency key (one grant per source)")
+    amount = models.IntegerField(verbose_name="XP amount")
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name="Creation date")
+    flush_id = models.UUIDField(blank=True, null=True, verbose_name="Flush that applied the entry")
+    applied_at = models.DateTimeField(blank=True, null=True, verbose_name="Date applied to the character")
+
+    class Meta:
+        verbose_name = "XP ledger entry"
+        verbose_name_plural = "XP ledger entries"
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['character', '-created_at']),
+            models.Index(fields=['flush_id']),
+            # Only the pending entries are scanned by the aggregator
+            models.Index(fields=['character'], condition=models.Q(applied_at__isnull=True), name='xp_ledger_pending_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.character_id} +{self.amount} XP ({self.idempotency_key})"
+
+    @staticmethod
+    def make_key(source_type, source_id):
+        return f"{source_type}:{source_id}"
+
+    def save(self, *args, **kwargs):
+        if self.pk:
+            raise ValueError("XP ledger entries cannot be modified.")
+        if not self.idempotency_key:
+            self.idempotency_key = self.make_key(self.source_type, self.source_id)
+        super().save(*args, **kwargs)
+
+
+class ActivityRollup(models.Model):
+    """
+    Totals of the activities of a character over a period, kept up to date on
+    each activity creation, edition and deletion (see tracking.rollups), so the
+    dashboards read one row per period instead of aggregating the activities.
+    """
+    character = models.ForeignKey('users.Character', on_delete=models.CASCADE, related_name="+", verbose_name="Associated character")
+    activity_count = models.IntegerField(default=0, verbose_name="Number of activities")
+    total_minutes = models.IntegerField(default=0, verbose_name="Total duration in minutes")
+    total_calories = models.IntegerField(default=0, verbose_name="Total calories burned")
+    total_xp = models.IntegerField(default=0, verbose_name="Total experience earned")
+    satisfaction_sum = models.IntegerField(default=0, verbose_name="Sum of the satisfaction levels")
+
+    class Meta:
+        abstract = True
+
+    @property
+    def average_satisfaction(self):
+        return round(self.satisfaction_sum / self.activity_count, 2) if self.activity_count else None
+
+
+class DailyActivityRollup(ActivityRollup):
+    day = models.DateField(verbose_name="Day")
+
+    class Meta:
+        verbose_name = "Daily activity rollup"
+        verbose_name_plural = "Daily activity rollups"
+        ordering = ['character', 'day']
+        constraints = [
+            models.UniqueConstraint(fields=['character', 'day'], name='daily_rollup_unique_day'),
+        ]
+
+
+class WeeklyActivityRollup(ActivityRollup):
+    week_start = models.DateField(verbose_name="Monday of the ISO week")
+
+    class Meta:
+        verbose_name = "Weekly activity rollup"
+        verbose_name_plural = "Weekly activity rollups"
+        ordering = ['character', 'week_start']
+        constraints = [
+            models.UniqueConstraint(fields=['character', 'week_start'], name='weekly_rollup_unique_week'),
+        ]
+        indexes = [
+            # Weekly leaderboard: top-N of a week by XP earned
+            models.Index(fields=['week_start', '-total_xp', 'character'], name='weekly_rollup_xp_idx'),
+        ]
+
+    @property
+    def iso_week(self):
+        return self.week_start.isocalendar()[:2]
+
+
+class MonthlyActivityTypeRollup(ActivityRollup):
+    activity_type = models.ForeignKey(ActivityType, on_delete=models.CASCADE, related_name="+", verbose_name="Activity type")
+    month = models.DateField(verbose_name="First day of the month")
+
+    class Meta:
+        verbose_name = "Monthly activity type rollup"
+        verbose_name_plural = "Monthly activity type rollups"
+        ordering = ['character', 'month', 'activity_type']
+        constraints = [
+            models.UniqueConstraint(fields=['character', 'month', 'activity_type'], name='monthly_rollup_unique_type_month'),
+        ]
+
+
+class MonthlyActivityArchive(ActivityRollup):
+    """Totals of the archived activities of a character, per month (see tracking.archive)."""
+    month = models.DateField(verbose_name="First day of the month")
+
+    class Meta:
+        verbose_name = "Monthly activity archive"
+        verbose_name_plural = "Monthly activity archives"
+        ordering = ['character', 'month']
+        constraints = [
+            models.UniqueConstraint(fields=['character', 'month'], name='monthly_archive_unique_month'),
+        ]
+
+
+class CharacterStreak(models.Model):
+    """
+    Consecutive days with at least one activity, in the time zone of the user.
+    Updated in O(1) when an activity is logged (see tracking.streaks), so
+    reading a streak never scans the activities.
+    """
+    character = models.OneToOneField('users.Character', on_delete=models.CASCADE, primary_key=True, related_name="streak", verbose_name="Associated character")
+    current_streak = models.PositiveIntegerField(default=0, verbose_name="Days of the streak ending on the last active day")
+    longest_streak = models.PositiveIntegerField(default=0, verbose_name="Longest streak")
+    last_active_date = models.DateField(blank=True, null=True, verbose_name="Last active day (user's time zone)")
+    updated_at = models.DateTimeField(auto_now=True, verbose_name="Last update")
+
+    class Meta:
+        verbose_name = "Character streak"
+        verbose_name_plural = "Character streaks"
+
+    def __str__(self):
+        return f"{self.character_id}: {self.current_streak} day(s)"
+
+    def current_on(self, today):
+        """Streak shown on `today`: it is broken once a whole day went by without activity."""
+        if self.last_active_date is None or (today - self.last_active_date).days > 1:
+            return 0
+        return self.current_streak
@@ -0,0 +1,156 @@
+"""
+Activity rollups: totals per (character, day), (character, ISO week) and
+(character, activity type, month).
+
+Each change of an activity is a signed delta (+1 when created, -1 when deleted,
+both when edited). The deltas are summed per rollup row, then applied with one
+SELECT and one bulk INSERT/UPDATE per rollup table, for a single activity as
+well as for a whole import chunk. rebuild() recomputes everything with GROUP BY
+queries, by chunks of characters, archived activities included (see
+tracking.archive).
+
+The days, weeks and months are those of the server time zone (TIME_ZONE), the
+same for every user: unlike the streaks (tracking.streaks), which follow the
+user's time zone, an activity logged near midnight may count for another day
+in the rollups than in the streak.
+"""
+from collections import defaultdict
+from datetime import timedelta
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, DateField, Sum, Value
+from django.db.models.functions import Coalesce, TruncDate, TruncMonth, TruncWeek
+from django.utils import timezone
+
+from .models import Activity, ArchivedActivity, DailyActivityRollup, WeeklyActivityRollup, MonthlyActivityTypeRollup
+
+# Activity values needed to compute the deltas
+ACTIVITY_FIELDS = ('character_id', 'activity_type_id', 'created_at', 'duration_minutes', 'calories', 'satisfaction', 'xp_earned')
+TOTALS = ('activity_count', 'total_minutes', 'total_calories', 'total_xp', 'satisfaction_sum')
+
+# Rollup model -> fields of its period key (after character)
+KEY_FIELDS = {
+    DailyActivityRollup: ('day',),
+    WeeklyActivityRollup: ('week_start',),
+    MonthlyActivityTypeRollup: ('month', 'activity_type_id'),
+}
+
+
+def activity_day(created_at):
+    """Day of an activity, in the server time zone (not the user's, see above)."""
+    return timezone.localdate(created_at, timezone.get_default_timezone())
+
+
+def period_keys(values, day):
+    return {
+        DailyActivityRollup: (day,),
+        WeeklyActivityRollup: (day - timedelta(days=day.weekday()),),
+        MonthlyActivityTypeRollup: (day.replace(day=1), values['activity_type_id']),
+    }
+
+
+class ActivityRollupService:
+    @staticmethod
+    def activity_values(activity):
+        return {name: getattr(activity, name) for name in ACTIVITY_FIELDS}
+
+    @staticmethod
+    def apply(changes):
+        """
+        Apply `changes`, an iterable of (activity values, sign) where the values
+        are the ACTIVITY_FIELDS of an activity (see activity_values) and sign is
+        +1 to add the activity to the rollups or -1 to remove it.
+        """
+        deltas = {model: defaultdict(lambda: [0] * len(TOTALS)) for model in KEY_FIELDS}
+        for values, sign in changes:
+            day = activity_day(values['created_at'])
+            delta = (1, values['duration_minutes'], values['calories'] or 0, values['xp_earned'], values['satisfaction'])
+            for model, key in period_keys(values, day).items():
+                totals = deltas[model][(values['character_id'],) + key]
+                for index, value in enumerate(delta):
+                    totals[index] += sign * value
+
+        with transaction.atomic():
+            for model, model_deltas in deltas.items():
+                model_deltas = {key: totals for key, totals in model_deltas.items() if any(totals)}
+                if not model_deltas:
+                    continue
+                try:
+                    with transaction.atomic():
+                        ActivityRollupService.apply_deltas(model, model_deltas)
+                except IntegrityError:
+                    # A concurrent transaction created one of the rows: read them again
+                    ActivityRollupService.apply_deltas(model, model_deltas)
+
+    @staticmethod
+    def apply_deltas(model, deltas, key_fields=None):
+        key_fields = key_fields or KEY_FIELDS[model]
+        periods = [key[1] for key in deltas]
+        rows = model.objects.select_for_update().filter(
+            character_id__in={key[0] for key in deltas},
+            **{f'{key_fields[0]}__range': (min(periods), max(periods))},
+        ).order_by()
+        existing = {(row.character_id,) + tuple(getattr(row, name) for name in key_fields): row for row in rows}
+
+        to_create, to_update, to_delete = [], [], []
+        for key, totals in deltas.items():
+            row = existing.get(key)
+            if row is None:
+                if totals[0] <= 0:
+                    continue  # Removal from a row that is already gone (character being deleted)
+                row = model(character_id=key[0], **dict(zip(key_fields, key[1:])))
+                to_create.append(row)
+            else:
+                totals = [getattr(row, name) + value for name, value in zip(TOTALS, totals)]
+                (to_update if totals[0] > 0 else to_delete).append(row)
+            for name, value in zip(TOTALS, totals):
+                setattr(row, name, value)
+
+        model.objects.bulk_create(to_create)
+        model.objects.bulk_update(to_update, TOTALS)
+        if to_delete:
+            model.objects.filter(pk__in=[row.pk for row in to_delete]).delete()
+
+    @staticmethod
+    def rebuild(character_ids=None, chunk_size=500):
+        """
+        Recompute the rollups from the activities with GROUP BY queries, by chunks
+        of `chunk_size` characters (by default every character with activities or
+        rollups). Return the number of characters rebuilt.
+        """
+        if character_ids is None:
+            character_ids = set(Activity.objects.values_list('character_id', flat=True).distinct())
+            character_ids |= set(DailyActivityRollup.objects.values_list('character_id', flat=True).distinct())
+        character_ids = sorted(character_ids)
+        tz = timezone.get_default_timezone()
+        # Rollup model -> (grouping columns, period expression)
+        periods = {
+            DailyActivityRollup: (['character_id'], {'day': TruncDate('created_at', tzinfo=tz)}),
+            WeeklyActivityRollup: (['character_id'], {'week_start': TruncWeek('created_at', tzinfo=tz, output_field=DateField())}),
+            MonthlyActivityTypeRollup: (['character_id', 'activity_type_id'], {'month': TruncMonth('created_at', tzinfo=tz, output_field=DateField())}),
+        }
+        totals = {
+            'activity_count': Count('id'),
+            'total_minutes': Sum('duration_minutes'),
+            'total_calories': Coalesce(Sum('calories'), Value(0)),
+            'total_xp': Sum('xp_earned'),
+            'satisfaction_sum': Sum('satisfaction'),
+        }
+
+        for start in range(0, len(character_ids), chunk_size):
+            chunk = character_ids[start:start + chunk_size]
+            with transaction.atomic():
+                for model, (columns, period) in periods.items():
+                    model.objects.filter(character_id__in=chunk).delete()
+                    rows = {}
+                    # The live and the archived activities of a period are summed
+                    for source in (Activity, ArchivedActivity):
+                        for row in source.objects.filter(character_id__in=chunk).order_by().values(*columns, **period).annotate(**totals):
+                            key = tuple(row[name] for name in [*columns, *period])
+                            if key in rows:
+                                for name in totals:
+                                    rows[key][name] += row[name]
+                            else:
+                                rows[key] = row
+                    model.objects.bulk_create([model(**row) for row in rows.values()], batch_size=1000)
+        return len(character_ids)
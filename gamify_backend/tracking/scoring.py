@@ -0,0 +1,172 @@
+"""
+XP rule engine: the XP earned by an activity, from the XPRule table.
+
+The active rules are compiled once into an XPRuleSet (categories resolved into
+activity type ids, unused conditions dropped) and cached until a rule or an
+activity type changes (see gamify_backend.localindex). Each matching rule adds
+
+    xp_per_minute * duration + xp_per_calorie * calories + xp_per_satisfaction * satisfaction + bonus_xp
+
+and the sum is multiplied by the multipliers of the matching rules, then by the
+character's multiplier. Missing calories count as 0. Without any active rule,
+the historical scoring applies (5 XP per minute).
+
+score() rates one activity without any query (request path), score_arrays()
+rates whole NumPy batches with one vectorized pass per rule (imports, recomputes).
+Both evaluate the same float operations in the same order, so they agree.
+"""
+import numpy as np
+
+from gamify_backend.localindex import CHECK_INTERVAL, LocalIndex
+
+DEFAULT_XP_PER_MINUTE = 5
+
+
+class CompiledRule:
+    """A rule reduced to its active conditions."""
+    __slots__ = (
+        'type_ids', 'type_ids_array', 'min_duration', 'min_calories', 'min_satisfaction', 'max_satisfaction',
+        'xp_per_minute', 'xp_per_calorie', 'xp_per_satisfaction', 'bonus_xp', 'multiplier',
+    )
+
+    def __init__(self, type_ids=None, min_duration=None, min_calories=None, min_satisfaction=None, max_satisfaction=None,
+                 xp_per_minute=0.0, xp_per_calorie=0.0, xp_per_satisfaction=0.0, bonus_xp=0, multiplier=1.0):
+        # None: any activity type
+        self.type_ids = frozenset(type_ids) if type_ids is not None else None
+        self.type_ids_array = np.fromiter(self.type_ids, dtype=np.int64) if type_ids is not None else None
+        self.min_duration = min_duration
+        self.min_calories = min_calories
+        self.min_satisfaction = min_satisfaction
+        self.max_satisfaction = max_satisfaction
+        self.xp_per_minute = float(xp_per_minute)
+        self.xp_per_calorie = float(xp_per_calorie)
+        self.xp_per_satisfaction = float(xp_per_satisfaction)
+        self.bonus_xp = float(bonus_xp)
+        self.multiplier = float(multiplier)
+
+    @classmethod
+    def from_model(cls, rule, types_by_category):
+        type_ids = None
+        if rule.category:
+            type_ids = set(types_by_category.get(rule.category, ()))
+        if rule.activity_type_id is not None:
+            type_ids = {rule.activity_type_id} if type_ids is None else type_ids & {rule.activity_type_id}
+        return cls(
+            type_ids=type_ids,
+            min_duration=rule.min_duration,
+            min_calories=rule.min_calories,
+            min_satisfaction=rule.min_satisfaction,
+            max_satisfaction=rule.max_satisfaction,
+            xp_per_minute=rule.xp_per_minute,
+            xp_per_calorie=rule.xp_per_calorie,
+            xp_per_satisfaction=rule.xp_per_satisfaction,
+            bonus_xp=rule.bonus_xp,
+            multiplier=rule.multiplier,
+        )
+
+    def matches(self, activity_type_id, duration_minutes, calories, satisfaction):
+        return not (
+            (self.type_ids is not None and activity_type_id not in self.type_ids)
+            or (self.min_duration is not None and duration_minutes < self.min_duration)
+            or (self.min_calories is not None and calories < self.min_calories)
+            or (self.min_satisfaction is not None and satisfaction < self.min_satisfaction)
+            or (self.max_satisfaction is not None and satisfaction > self.max_satisfaction)
+        )
+
+    def xp(self, duration_minutes, calories, satisfaction):
+        return self.xp_per_minute * duration_minutes + self.xp_per_calorie * calories + self.xp_per_satisfaction * satisfaction + self.bonus_xp
+
+    def matches_array(self, activity_type_ids, durations, calories, satisfactions):
+        matched = np.ones(len(durations), dtype=bool)
+        if self.type_ids is not None:
+            matched &= np.isin(activity_type_ids, self.type_ids_array)
+        if self.min_duration is not None:
+            matched &= durations >= self.min_duration
+        if self.min_calories is not None:
+            matched &= calories >= self.min_calories
+        if self.min_satisfaction is not None:
+            matched &= satisfactions >= self.min_satisfaction
+        if self.max_satisfaction is not None:
+            matched &= satisfactions <= self.max_satisfaction
+        return matched
+
+
+class XPRuleSet:
+    def __init__(self, rules):
+        self.rules = list(rules)
+
+    @classmethod
+    def default(cls):
+        return cls([CompiledRule(xp_per_minute=DEFAULT_XP_PER_MINUTE)])
+
+    @classmethod
+    def from_db(cls):
+        """Compile the active rules (one query, two when a rule targets a category)."""
+        from .models import ActivityType, XPRule
+
+        rules = list(XPRule.objects.filter(is_active=True).order_by('priority', 'id'))
+        if not rules:
+            return cls.default()
+        types_by_category = {}
+        categories = {rule.category for rule in rules if rule.category}
+        if categories:
+            for type_id, category in ActivityType.objects.filter(category__in=categories).values_list('pk', 'category'):
+                types_by_category.setdefault(category, set()).add(type_id)
+        return cls(CompiledRule.from_model(rule, types_by_category) for rule in rules)
+
+    def score(self, activity_type_id, duration_minutes, calories, satisfaction, multiplier=1.0):
+        """XP earned by one activity."""
+        calories, satisfaction = calories or 0, satisfaction or 0
+        xp, factor = 0.0, 1.0
+        for rule in self.rules:
+            if rule.matches(activity_type_id, duration_minutes, calories, satisfaction):
+                xp += rule.xp(duration_minutes, calories, satisfaction)
+                factor *= rule.multiplier
+        return max(int(xp * factor * multiplier), 0)
+
+    def score_arrays(self, activity_type_ids, durations, calories, satisfactions, multipliers=1.0):
+        """
+        XP earned by many activities, given as arrays (calories: 0 when unknown).
+        `multipliers` is a scalar or one character multiplier per activity.
+        """
+        activity_type_ids = np.asarray(activity_type_ids, dtype=np.int64)
+        durations = np.asarray(durations, dtype=np.float64)
+        calories = np.asarray(calories, dtype=np.float64)
+        satisfactions = np.asarray(satisfactions, dtype=np.float64)
+        xp = np.zeros(len(durations), dtype=np.float64)
+        factor = np.ones(len(durations), dtype=np.float64)
+        for rule in self.rules:
+            matched = rule.matches_array(activity_type_ids, durations, calories, satisfactions)
+            xp += np.where(matched, rule.xp(durations, calories, satisfactions), 0.0)
+            factor *= np.where(matched, rule.multiplier, 1.0)
+        return np.maximum((xp * factor * multipliers).astype(np.int64), 0)
+
+    def score_activities(self, activities, multipliers=1.0):
+        """score_arrays() over Activity instances."""
+        count = len(activities)
+        return self.score_arrays(
+            np.fromiter((activity.activity_type_id for activity in activities), dtype=np.int64, count=count),
+            np.fromiter((activity.duration_minutes for activity in activities), dtype=np.float64, count=count),
+            np.fromiter((activity.calories or 0 for activity in activities), dtype=np.float64, count=count),
+            np.fromiter((activity.satisfaction or 0 for activity in activities), dtype=np.float64, count=count),
+            multipliers,
+        )
+
+
+class CompiledRules(LocalIndex):
+    def build(self):
+        return XPRuleSet.from_db()
+
+
+# Read on every activity save: no cache read per call, no periodic rebuild
+RULE_SET = CompiledRules('tracking:xp-rules:generation', max_age=None, check_interval=CHECK_INTERVAL)
+
+
+def get_rule_set():
+    """Return the compiled rule set (built once per process, then cached)."""
+    return RULE_SET.index()
+
+
+def reset_rule_set():
+    """Compile the rules again (a rule or an activity type changed), in every process after the commit."""
+    RULE_SET.changed()
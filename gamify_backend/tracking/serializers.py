@@ -1,5 +1,7 @@
+from django.utils import timezone
 from rest_framework import serializers
-from .models import Activity, ActivityType
+from .importers import FILE_TYPES
+from .models import Activity, ActivityType, DailyActivityRollup, WeeklyActivityRollup, MonthlyActivityTypeRollup, MonthlyActivityArchive, CharacterStreak
 
 class ActivityTypeSerializer(serializers.ModelSerializer):
     class Meta:
@@ -14,4 +16,104 @@ class ActivitySerializer(serializers.ModelSerializer):
     class Meta:
         model = Activity
         fields = ['id', 'character', 'activity_type', 'duration_minutes', 'calories', 'satisfaction', 'notes', 'xp_earned', 'created_at']
-        read_only_fields = ['xp_earned', 'created_at']
\ No newline at end of file
+        read_only_fields = ['xp_earned', 'created_at']
+
+
+class ActivityImportSerializer(serializers.Serializer):
+    file = serializers.FileField()
+    # Guessed from the file extension when not given
+    file_type = serializers.ChoiceField(choices=FILE_TYPES, required=False)
+    # The activity types are a catalog shared by every user: only the staff adds to it
+    create_missing_types = serializers.BooleanField(default=False)
+
+    def validate_create_missing_types(self, value):
+        request = self.context.get('request')
+        if value and not (request and request.user.is_staff):
+            raise serializers.ValidationError("Only staff members can create activity types.")
+        return value
+
+
+MAX_SYNC_BATCH = 500
+
+
+class ActivitySyncItemSerializer(serializers.Serializer):
+    """One activity queued by the desktop client, identified by its own client_id."""
+    client_id = serializers.CharField(max_length=64)
+    activity_type = serializers.IntegerField()
+    duration_minutes = serializers.IntegerField(min_value=1)
+    calories = serializers.IntegerField(min_value=1, required=False, allow_null=True)
+    satisfaction = serializers.IntegerField(min_value=1, max_value=10)
+    notes = serializers.CharField(max_length=500, required=False, allow_null=True, allow_blank=True)
+    created_at = serializers.DateTimeField(required=False)
+
+    def validate_activity_type(self, value):
+        # Known ids loaded once per batch by the view
+        if value not in self.context['activity_type_ids']:
+            raise serializers.ValidationError("Unknown activity type.")
+        return value
+
+
+class ActivitySyncSerializer(serializers.Serializer):
+    # The items are validated one by one: an invalid item does not reject the batch
+    activities = serializers.ListField(child=serializers.DictField(), allow_empty=False, max_length=MAX_SYNC_BATCH)
+
+
+ROLLUP_FIELDS = ['activity_count', 'total_minutes', 'total_calories', 'total_xp', 'average_satisfaction']
+
+
+class DailyActivityRollupSerializer(serializers.ModelSerializer):
+    average_satisfaction = serializers.FloatField(read_only=True)
+
+    class Meta:
+        model = DailyActivityRollup
+        fields = ['day'] + ROLLUP_FIELDS
+
+
+class WeeklyActivityRollupSerializer(serializers.ModelSerializer):
+    average_satisfaction = serializers.FloatField(read_only=True)
+    iso_year = serializers.SerializerMethodField()
+    iso_week = serializers.SerializerMethodField()
+
+    class Meta:
+        model = WeeklyActivityRollup
+        fields = ['week_start', 'iso_year', 'iso_week'] + ROLLUP_FIELDS
+
+    def get_iso_year(self, obj):
+        return obj.iso_week[0]
+
+    def get_iso_week(self, obj):
+        return obj.iso_week[1]
+
+
+class MonthlyActivityTypeRollupSerializer(serializers.ModelSerializer):
+    average_satisfaction = serializers.FloatField(read_only=True)
+    activity_type_name = serializers.CharField(source='activity_type.name', read_only=True)
+
+    class Meta:
+        model = MonthlyActivityTypeRollup
+        fields = ['month', 'activity_type', 'activity_type_name'] + ROLLUP_FIELDS
+
+
+class MonthlyActivityArchiveSerializer(serializers.ModelSerializer):
+    average_satisfaction = serializers.FloatField(read_only=True)
+
+    class Meta:
+        model = MonthlyActivityArchive
+        fields = ['month'] + ROLLUP_FIELDS
+
+
+class CharacterStreakSerializer(serializers.ModelSerializer):
+    """Streak as seen today in the user's time zone (the character and its user are preloaded)."""
+    current_streak = serializers.SerializerMethodField()
+    today = serializers.SerializerMethodField()
+    time_zone = serializers.CharField(source='character.user.time_zone', read_only=True)
+
+    class Meta:
+        model = CharacterStreak
+        fields = ['character', 'current_streak', 'longest_streak', 'last_active_date', 'today', 'time_zone']
+
+    def get_today(self, obj):
+        return timezone.localdate(timezone=obj.character.user.zone)
+
+    def get_current_streak(self, obj):
+        return obj.current_on(self.get_today(obj))
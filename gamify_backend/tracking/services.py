@@ -0,0 +1,194 @@
+import uuid
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import F, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from users.levels import get_level_curve
+from users.models import Character
+from users.services import CharacterService
+from .models import Activity, ArchivedActivity, XPLedgerEntry
+from .leaderboards import LeaderboardService
+from .rollups import ActivityRollupService
+from .scoring import get_rule_set
+from .streaks import StreakService
+
+
+class ScheduledFlush:
+    """The on_commit flush of a transaction."""
+
+    def __init__(self, character_ids):
+        self.character_ids = set(character_ids)
+        self.done = False
+
+    def __call__(self):
+        self.done = True
+        XPLedgerService.flush(self.character_ids)
+
+
+class XPLedgerService:
+    @staticmethod
+    def record(character_id, amount, source_type, source_id=None, idempotency_key=None):
+        """
+        Append an XP grant to the ledger (a single INSERT). A second grant with the
+        same idempotency key is ignored.
+        """
+        XPLedgerService.record_many([XPLedgerEntry(
+            character_id=character_id,
+            amount=amount,
+            source_type=source_type,
+            source_id=source_id,
+            idempotency_key=idempotency_key or XPLedgerEntry.make_key(source_type, source_id),
+        )])
+        XPLedgerService.schedule_flush([character_id])
+
+    @staticmethod
+    def record_many(entries, batch_size=1000):
+        """Append many entries at once, skipping the ones already recorded."""
+        for entry in entries:
+            if not entry.idempotency_key:
+                entry.idempotency_key = XPLedgerEntry.make_key(entry.source_type, entry.source_id)
+        XPLedgerEntry.objects.bulk_create(entries, batch_size=batch_size, ignore_conflicts=True)
+
+    @staticmethod
+    def schedule_flush(character_ids):
+        """
+        Fold the pending entries once the current transaction is committed (if enabled).
+        A transaction registers a single flush, for every character it recorded XP for.
+        """
+        if not getattr(settings, 'XP_LEDGER_FLUSH_ON_COMMIT', True):
+            return
+        connection = transaction.get_connection()
+        scheduled = getattr(connection, 'xp_ledger_flush', None)
+        # Not if it ran, nor if a rollback dropped it
+        if (
+            scheduled is not None and not scheduled.done and connection.in_atomic_block
+            and any(callback is scheduled for _, callback, _ in connection.run_on_commit)
+        ):
+            scheduled.character_ids.update(character_ids)
+            return
+        scheduled = connection.xp_ledger_flush = ScheduledFlush(character_ids)
+        transaction.on_commit(scheduled)
+
+    @staticmethod
+    def flush(character_ids=None):
+        """
+        Fold the pending ledger entries into Character.current_xp, total_xp and level:
+        one UPDATE to claim the entries, then one UPDATE per character (a negative
+        total, from adjustments or reversals, is taken back down to 0 XP).
+        Concurrent flushes claim different entries, so nothing is applied twice.
+        Return the number of characters updated.
+        """
+        flush_id = uuid.uuid4()
+        pending = XPLedgerEntry.objects.filter(applied_at__isnull=True)
+        if character_ids is not None:
+            pending = pending.filter(character_id__in=character_ids)
+
+        with transaction.atomic():
+            if not pending.update(flush_id=flush_id, applied_at=timezone.now()):
+                return 0
+            totals = (
+                XPLedgerEntry.objects.filter(flush_id=flush_id)
+                .values_list('character_id')
+                .annotate(total=Sum('amount'))
+                .order_by()
+            )
+            for character_id, total in totals:
+                if total < 0:
+                    CharacterService.remove_xp(character_id, -total)
+                else:
+                    CharacterService.grant_xp(character_id, total)
+            LeaderboardService.scores_changed(character_id for character_id, _ in totals)
+        return len(totals)
+
+    @staticmethod
+    def rebuild(queryset=None):
+        """
+        Recompute total_xp, level and current_xp from the whole ledger with
+        set-based UPDATEs (no per-character loop). The XP earned before the ledger
+        existed is in the 'opening' entries (migration tracking 0013); XP set by
+        hand on a character, outside the ledger, is not rebuilt.
+        Return the number of characters updated.
+        """
+        if queryset is None:
+            queryset = Character.objects.all()
+        ledger_total = (
+            XPLedgerEntry.objects.filter(character=OuterRef('pk'))
+            .values('character')
+            .annotate(total=Sum('amount'))
+            .values('total')
+        )
+        curve = get_level_curve()
+        with transaction.atomic():
+            XPLedgerEntry.objects.filter(applied_at__isnull=True, character__in=queryset).update(applied_at=timezone.now())
+            queryset.update(total_xp=Coalesce(Subquery(ledger_total), Value(0)))
+            LeaderboardService.invalidate_all()
+            return queryset.update(
+                level=curve.level_expression(F('total_xp')),
+                current_xp=curve.remainder_expression(F('total_xp')),
+                updated_at=timezone.now(),
+            )
+
+
+class ActivityService:
+    @staticmethod
+    def create_many(character, activities, batch_size=1000):
+        """
+        Insert many activities of `character` at once: xp_earned is scored for
+        the whole batch with the XP rule set, the rows are bulk inserted (no per-row save nor signal)
+        and their ledger entries are appended. The XP reaches the character at
+        the next flush, call XPLedgerService.schedule_flush() once when done.
+        The rollups and the streak are updated once for the whole batch.
+        The multiplier is the one of the character's current level.
+        Return the created activities.
+        """
+        if not activities:
+            return []
+        xp_earned = get_rule_set().score_activities(activities, multipliers=character.xp_multiplier)
+        for activity, xp in zip(activities, xp_earned.tolist()):
+            activity.character_id = character.pk
+            activity.xp_earned = xp
+            activity.xp_multiplier = character.xp_multiplier
+
+        with transaction.atomic():
+            created = Activity.objects.bulk_create(activities, batch_size=batch_size)
+            XPLedgerService.record_many([
+                XPLedgerEntry(character_id=character.pk, amount=activity.xp_earned, source_type='activity', source_id=activity.pk)
+                for activity in created
+            ], batch_size=batch_size)
+            ActivityRollupService.apply((ActivityRollupService.activity_values(activity), 1) for activity in created)
+            StreakService.record(character.pk, (activity.created_at for activity in created))
+        return created
+
+    @staticmethod
+    def create_missing(character, activities, batch_size=1000):
+        """
+        Offline sync: insert the activities of `character` whose client_id is not
+        stored yet, archived ones included (see create_many), in one SELECT and
+        one bulk INSERT.
+        Return (created activities, {client_id: id} of those already stored).
+        """
+        client_ids = [activity.client_id for activity in activities]
+        for attempt in range(2):
+            try:
+                with transaction.atomic():
+                    # A single statement: an activity archived meanwhile is seen in one of the tables
+                    existing = dict(
+                        Activity.objects.filter(character_id=character.pk, client_id__in=client_ids).order_by().values_list('client_id', 'pk')
+                        .union(
+                            ArchivedActivity.objects.filter(character_id=character.pk, client_id__in=client_ids).order_by().values_list('client_id', 'pk'),
+                            all=True,
+                        )
+                    )
+                    created = ActivityService.create_many(
+                        character,
+                        [activity for activity in activities if activity.client_id not in existing],
+                        batch_size=batch_size,
+                    )
+                    return created, existing
+            except IntegrityError:
+                if attempt:
+                    raise
+                # A concurrent sync stored some of them meanwhile: read them again
@@ -1,13 +1,77 @@
-from django.db.models.signals import post_save
+from django.db.models.signals import post_delete, post_save, pre_save
 from django.dispatch import receiver
-from .models import Activity
+from users.models import Character, User
+from .leaderboards import LeaderboardService
+from .models import Activity, ActivityType, XPRule
+from .rollups import ACTIVITY_FIELDS, ActivityRollupService
+from .scoring import reset_rule_set
+from .services import XPLedgerService
+from .streaks import StreakService
 
 @receiver(post_save, sender=Activity)
 def update_character_xp(sender, instance, created, **kwargs):
     """
     Met à jour l'XP du personnage après l'enregistrement d'une activité.
+    The grant is only appended to the XP ledger here, and folded into the
+    character after the commit.
     """
     if created:  # Seulement pour les nouvelles activités
-        character = instance.character
-        character.current_xp += instance.xp_earned
-        character.save()
\ No newline at end of file
+        XPLedgerService.record(instance.character_id, instance.xp_earned, 'activity', instance.pk)
+
+@receiver(pre_save, sender=Activity)
+def remember_previous_activity(sender, instance, raw=False, **kwargs):
+    """Keep the stored values of an edited activity, to move it between rollups."""
+    instance._rollup_previous = None
+    if instance.pk and not instance._state.adding and not raw:
+        instance._rollup_previous = Activity.objects.filter(pk=instance.pk).values(*ACTIVITY_FIELDS).first()
+
+@receiver(post_save, sender=Activity)
+def update_rollups_on_save(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    current = ActivityRollupService.activity_values(instance)
+    previous = getattr(instance, '_rollup_previous', None)
+    if created or previous is None:
+        ActivityRollupService.apply([(current, 1)])
+    elif previous != current:
+        ActivityRollupService.apply([(previous, -1), (current, 1)])
+
+@receiver(post_delete, sender=Activity)
+def update_rollups_on_delete(sender, instance, **kwargs):
+    ActivityRollupService.apply([(ActivityRollupService.activity_values(instance), -1)])
+
+@receiver(post_save, sender=Activity)
+def update_streak_on_save(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    previous = getattr(instance, '_rollup_previous', None)
+    if created or previous is None:
+        StreakService.record(instance.character_id, [instance.created_at])
+    elif (previous['character_id'], previous['created_at']) != (instance.character_id, instance.created_at):
+        StreakService.recompute({previous['character_id'], instance.character_id})
+
+@receiver(post_delete, sender=Activity)
+def update_streak_on_delete(sender, instance, **kwargs):
+    StreakService.schedule_recompute([instance.character_id])
+
+@receiver(post_save, sender=User)
+def update_streaks_on_time_zone_change(sender, instance, created, raw=False, **kwargs):
+    """The day boundaries moved: recompute the streaks of the user's characters."""
+    previous = getattr(instance, '_loaded_time_zone', None)
+    instance._loaded_time_zone = instance.time_zone
+    if created or raw or previous is None or previous == instance.time_zone:
+        return
+    StreakService.schedule_recompute(instance.characters.values_list('pk', flat=True))
+
+
+@receiver(post_delete, sender=Character)
+def drop_leaderboards_on_character_delete(sender, instance, **kwargs):
+    """The cached top-N may list the deleted character."""
+    LeaderboardService.invalidate_all()
+
+
+@receiver([post_save, post_delete], sender=XPRule)
+@receiver([post_save, post_delete], sender=ActivityType)
+def reset_rule_set_on_change(sender, **kwargs):
+    """Signal : the XP rules must be compiled again (a rule or a category changed)."""
+    reset_rule_set()
@@ -0,0 +1,132 @@
+"""
+Daily streaks: consecutive days with at least one activity, the days being
+those of the user's time zone.
+
+Logging an activity on the last active day or later is an O(1) update of the
+CharacterStreak row (no read of the activity history). The rare changes that
+can split or join past streaks (an activity dated before the last active day,
+an edited date, a deletion, a new time zone) recompute the streaks of the
+character from its activity days (archived ones included), and so does the
+backfill of an import.
+"""
+from collections import defaultdict
+from datetime import timedelta
+from functools import lru_cache
+from itertools import chain
+from zoneinfo import ZoneInfo
+
+from django.db import connection, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from users.models import Character
+from .models import Activity, ArchivedActivity, CharacterStreak
+
+STREAK_FIELDS = ['current_streak', 'longest_streak', 'last_active_date', 'updated_at']
+
+
+@lru_cache(maxsize=None)
+def get_zone(name):
+    return ZoneInfo(name)
+
+
+def local_day(moment, time_zone):
+    return timezone.localdate(moment, get_zone(time_zone))
+
+
+class StreakService:
+    @staticmethod
+    def extend(streak, day):
+        """Fold an active `day`, not before streak.last_active_date, into `streak`."""
+        last = streak.last_active_date
+        if last == day:
+            return
+        if last is not None and day - last == timedelta(days=1):
+            streak.current_streak += 1
+        else:
+            streak.current_streak = 1
+        streak.last_active_date = day
+        streak.longest_streak = max(streak.longest_streak, streak.current_streak)
+
+    @staticmethod
+    def locked_streak(character_id):
+        """Streak row of the character (created if missing), locked, with the user's time zone."""
+        streaks = (
+            CharacterStreak.objects.filter(character_id=character_id)
+            .annotate(time_zone=F('character__user__time_zone'))
+        )
+        if connection.features.has_select_for_update_of:
+            streaks = streaks.select_for_update(of=('self',))
+        else:
+            streaks = streaks.select_for_update()
+        streak = streaks.first()
+        if streak is None:
+            CharacterStreak.objects.bulk_create([CharacterStreak(character_id=character_id)], ignore_conflicts=True)
+            streak = streaks.first()
+        return streak
+
+    @staticmethod
+    def record(character_id, moments):
+        """Count activities logged at `moments` (datetimes) in the streak of the character."""
+        moments = list(moments)
+        if not moments:
+            return
+        with transaction.atomic():
+            streak = StreakService.locked_streak(character_id)
+            days = sorted({local_day(moment, streak.time_zone) for moment in moments})
+            if streak.last_active_date is not None and days[0] < streak.last_active_date:
+                # Backdated activity: it may fill a gap between two past streaks
+                StreakService.recompute([character_id])
+                return
+            if days == [streak.last_active_date]:
+                return
+            for day in days:
+                StreakService.extend(streak, day)
+            streak.save(update_fields=STREAK_FIELDS)
+
+    @staticmethod
+    def schedule_recompute(character_ids):
+        """Recompute once the current transaction is committed (after a deletion, the character may be gone)."""
+        character_ids = list(character_ids)
+        if character_ids:
+            transaction.on_commit(lambda: StreakService.recompute(character_ids))
+
+    @staticmethod
+    def recompute(character_ids=None, chunk_size=500):
+        """
+        Recompute the streaks from the activity dates, by chunks of `chunk_size`
+        characters (every character by default): one scan of the activities and
+        one bulk upsert per chunk. Return the number of characters recomputed.
+        """
+        if character_ids is None:
+            character_ids = Character.objects.values_list('pk', flat=True)
+        character_ids = sorted(set(character_ids))
+        recomputed = 0
+        for start in range(0, len(character_ids), chunk_size):
+            chunk = character_ids[start:start + chunk_size]
+            with transaction.atomic():
+                list(CharacterStreak.objects.select_for_update().filter(character_id__in=chunk).values_list('pk'))
+                zones = dict(Character.objects.filter(pk__in=chunk).values_list('pk', 'user__time_zone'))
+                days = defaultdict(set)
+                moments = chain.from_iterable(
+                    source.objects.filter(character_id__in=zones).order_by()
+                    .values_list('character_id', 'created_at').iterator(chunk_size=5000)
+                    for source in (Activity, ArchivedActivity)
+                )
+                for character_id, created_at in moments:
+                    days[character_id].add(local_day(created_at, zones[character_id]))
+
+                streaks = []
+                for character_id in zones:
+                    streak = CharacterStreak(character_id=character_id)
+                    for day in sorted(days[character_id]):
+                        StreakService.extend(streak, day)
+                    streaks.append(streak)
+                CharacterStreak.objects.bulk_create(
+                    streaks,
+                    update_conflicts=True,
+                    unique_fields=['character'],
+                    update_fields=STREAK_FIELDS,
+                )
+            recomputed += len(streaks)
+        return recomputed
@@ -0,0 +1,30 @@
+from users.models import User, Character, Race, CharacterClass
+from tracking.models import Activity, ActivityType
+
+
+class CharacterFixtureMixin:
+    """A user with one character, and the "Running" activity type."""
+
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create_user(username="testuser", email="test@example.com", password="testpassword")
+        self.race = Race.objects.create(name="Human", description="Humans are versatile.")
+        self.character_class = CharacterClass.objects.create(
+            name="Warrior",
+            description="Warriors are strong and brave.",
+            primary_attribute="Strength"
+        )
+        self.character = Character.objects.create(user=self.user, name="TestChar", race=self.race, character_class=self.character_class)
+        self.running = ActivityType.objects.create(name="Running", category="Sport")
+
+    def log_activity(self, when=None, duration_minutes=20, activity_type=None, **extra):
+        """Log one activity of the character with save(), as the API does: ledger, rollups and streak included."""
+        if when is not None:
+            extra['created_at'] = when
+        return Activity.objects.create(
+            character=extra.pop('character', self.character),
+            activity_type=activity_type or self.running,
+            duration_minutes=duration_minutes,
+            satisfaction=extra.pop('satisfaction', 6),
+            **extra
+        )
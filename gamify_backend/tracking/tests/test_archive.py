@@ -0,0 +1,86 @@
+import io
+from datetime import timedelta
+
+from django.core.management import call_command
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APITestCase
+from users.models import User
+from tracking.archive import ActivityArchiver, archive_cutoff, monthly_history
+from tracking.exporters import activity_rows
+from tracking.models import Activity, ArchivedActivity, DailyActivityRollup, MonthlyActivityArchive, XPLedgerEntry
+from tracking.rollups import ActivityRollupService
+from tracking.streaks import StreakService
+from tracking.tests.test_rollups import rollup_rows
+from .fixtures import CharacterFixtureMixin
+
+
+def history_rows(character_id):
+    return [(row.month, row.activity_count, row.total_minutes, row.total_xp) for row in monthly_history(character_id)]
+
+
+class ActivityArchiveTest(CharacterFixtureMixin, APITestCase):
+    def setUp(self):
+        super().setUp()
+        now = timezone.now()
+        # 10 activities between 400 and 700 days ago, 5 in the last days
+        for days in list(range(400, 700, 30)) + [1, 2, 3, 4, 5]:
+            Activity.objects.create(
+                character=self.character,
+                activity_type=self.running,
+                duration_minutes=days % 50 + 1,
+                satisfaction=5,
+                created_at=now - timedelta(days=days),
+            )
+
+    def test_old_activities_are_moved(self):
+        history = history_rows(self.character.pk)
+        exported = list(activity_rows(self.character.pk))
+        daily = rollup_rows(DailyActivityRollup)
+        ledger = XPLedgerEntry.objects.count()
+
+        result = ActivityArchiver(days=365).run()
+        self.assertEqual(result.archived, 10)
+        self.assertEqual(Activity.objects.count(), 5)
+        self.assertFalse(Activity.objects.filter(created_at__lt=archive_cutoff(365)).exists())
+        self.assertEqual(ArchivedActivity.objects.count(), 10)
+        self.assertEqual(sum(MonthlyActivityArchive.objects.values_list('activity_count', flat=True)), 10)
+
+        # The reads see the same history, the rollups and the ledger are untouched
+        self.assertEqual(history_rows(self.character.pk), history)
+        self.assertEqual(list(activity_rows(self.character.pk)), exported)
+        self.assertEqual(rollup_rows(DailyActivityRollup), daily)
+        self.assertEqual(XPLedgerEntry.objects.count(), ledger)
+
+        # Nothing left to archive
+        self.assertEqual(ActivityArchiver(days=365).run().archived, 0)
+
+    def test_rebuilds_include_archived_activities(self):
+        ActivityRollupService.rebuild()
+        StreakService.recompute()
+        daily = rollup_rows(DailyActivityRollup)
+        longest = self.character.streak.longest_streak
+
+        ActivityArchiver(days=365, chunk_size=3).run()
+        ActivityRollupService.rebuild()
+        StreakService.recompute()
+        self.assertEqual(rollup_rows(DailyActivityRollup), daily)
+        self.character.streak.refresh_from_db()
+        self.assertEqual(self.character.streak.longest_streak, longest)
+
+    def test_command_and_history_view(self):
+        out = io.StringIO()
+        call_command('archive_activities', '--days', '365', stdout=out)
+        self.assertIn("10 activities created before", out.getvalue())
+
+        self.client.force_authenticate(user=self.user)
+        url = reverse('stats-history', kwargs={'character_pk': self.character.pk})
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(sum(row['activity_count'] for row in response.data), 15)
+        self.assertEqual(response.data, sorted(response.data, key=lambda row: row['month']))
+        self.assertEqual(response.data[0]['average_satisfaction'], 5.0)
+
+        stranger = User.objects.create_user(username="stranger", email="stranger@example.com", password="testpassword")
+        self.client.force_authenticate(user=stranger)
+        self.assertEqual(self.client.get(url).status_code, 404)
@@ -0,0 +1,126 @@
+import io
+import json
+import os
+import tempfile
+from datetime import datetime, timezone as dt_timezone
+
+from django.core.management import call_command
+from django.db.models import F
+from django.test import TestCase, override_settings
+from users.models import Character
+from tracking.backfill import XPBackfill
+from tracking.models import Activity, ActivityType, DailyActivityRollup, XPLedgerEntry, XPRule
+from tracking.scoring import reset_rule_set
+from tracking.services import ActivityService, XPLedgerService
+from .fixtures import CharacterFixtureMixin
+
+
+class XPBackfillTest(CharacterFixtureMixin, TestCase):
+    def setUp(self):
+        self.addCleanup(reset_rule_set)
+        super().setUp()
+        self.reading = ActivityType.objects.create(name="Reading", category="Leisure")
+        # 20 activities of 10 minutes (50 XP each, 1000 XP: level 5 with the linear curve)
+        ActivityService.create_many(self.character, [
+            Activity(
+                activity_type=self.running if index % 2 else self.reading,
+                duration_minutes=10,
+                satisfaction=5,
+                created_at=datetime(2025, 3, 1 + index, 8, 0, tzinfo=dt_timezone.utc),
+            )
+            for index in range(20)
+        ])
+        XPLedgerService.flush()
+        self.character.refresh_from_db()
+
+    def recompute(self, *args):
+        out = io.StringIO()
+        call_command('recompute_xp', *args, stdout=out)
+        return out.getvalue()
+
+    def test_unchanged_rules_change_nothing(self):
+        """Test that a run with the same rules writes no activity nor ledger entry."""
+        self.assertEqual(self.character.level, 5)  # The activities keep the multiplier of level 1
+        output = self.recompute()
+        self.assertIn("0 of 20 activities updated", output)
+        self.assertIn("rows/s", output)
+        self.assertFalse(XPLedgerEntry.objects.filter(source_type='adjustment').exists())
+
+    def test_rule_change_is_applied(self):
+        XPRule.objects.create(name="Base", xp_per_minute=5)
+        XPRule.objects.create(name="Sport", category="Sport", bonus_xp=10)
+        output = self.recompute('--chunk-size', '7')
+        self.assertIn("10 of 20 activities updated (+100 XP)", output)
+        self.assertEqual(set(Activity.objects.filter(activity_type=self.running).values_list('xp_earned', flat=True)), {60})
+        self.assertEqual(set(Activity.objects.filter(activity_type=self.reading).values_list('xp_earned', flat=True)), {50})
+        self.assertEqual(XPLedgerEntry.objects.filter(source_type='adjustment').count(), 10)
+
+        self.character.refresh_from_db()
+        self.assertEqual((self.character.total_xp, self.character.level), (1100, 5))
+        self.assertEqual(sum(DailyActivityRollup.objects.values_list('total_xp', flat=True)), 1100)
+
+        # Running it again changes nothing
+        self.assertIn("0 of 20 activities updated", self.recompute())
+
+    def test_xp_outside_the_ledger_is_kept(self):
+        """Test that the differences, negative ones included, are added to the XP earned before the ledger."""
+        Character.objects.filter(pk=self.character.pk).update(total_xp=F('total_xp') + 500)
+        XPRule.objects.create(name="Base", xp_per_minute=4)
+        self.assertIn("20 of 20 activities updated (-200 XP)", self.recompute('--chunk-size', '7'))
+        self.character.refresh_from_db()
+        self.assertEqual((self.character.total_xp, self.character.level, self.character.current_xp), (1300, 5, 300))
+        self.assertFalse(XPLedgerEntry.objects.filter(applied_at__isnull=True).exists())
+
+    def test_lowered_xp_is_floored_at_zero(self):
+        """Test that a backfill taking back more XP than the character has leaves it at 0 XP."""
+        Character.objects.filter(pk=self.character.pk).update(total_xp=100)
+        XPRule.objects.create(name="Base", xp_per_minute=4)
+        self.assertIn("20 of 20 activities updated (-200 XP)", self.recompute())
+        self.character.refresh_from_db()
+        self.assertEqual((self.character.total_xp, self.character.level, self.character.current_xp), (0, 1, 0))
+
+    def test_dry_run_writes_nothing(self):
+        XPRule.objects.create(name="Base", xp_per_minute=10)
+        output = self.recompute('--dry-run')
+        self.assertIn("20 of 20 activities would change (+1000 XP), 1 character(s) would change", output)
+        self.assertIn("-> 100 XP (+50)", output)
+        self.assertIn(f"Character {self.character.pk}: level 5 -> 6, 1000 -> 2000 XP", output)
+        self.assertEqual(set(Activity.objects.values_list('xp_earned', flat=True)), {50})
+        self.assertFalse(XPLedgerEntry.objects.filter(source_type='adjustment').exists())
+
+    def test_activities_without_multiplier(self):
+        """Test that activities logged before the multiplier was kept get the current one, once."""
+        Activity.objects.filter(duration_minutes=10).update(xp_multiplier=None)
+        self.assertIn("20 of 20 activities updated (+400 XP)", self.recompute())  # Level 5: x1.4
+        self.assertEqual(set(Activity.objects.values_list('xp_earned', 'xp_multiplier')), {(70, Character(level=5).xp_multiplier)})
+        self.assertIn("0 of 20 activities updated", self.recompute())
+
+    @override_settings(LEVEL_CURVE={'name': 'linear', 'step': 50})
+    def test_curve_change_rebuilds_levels(self):
+        self.recompute()
+        self.character.refresh_from_db()
+        self.assertEqual((self.character.total_xp, self.character.level, self.character.current_xp), (1000, 6, 250))
+
+    def test_resume_from_checkpoint(self):
+        """Test that an interrupted run resumes after its last committed chunk."""
+        XPRule.objects.create(name="Base", xp_per_minute=6)
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'recompute.json')
+
+            def interrupt(result):
+                if result.scanned >= 10:
+                    raise KeyboardInterrupt
+
+            with self.assertRaises(KeyboardInterrupt):
+                XPBackfill(chunk_size=5, checkpoint_path=path).run(progress=interrupt)
+            with open(path) as stream:
+                self.assertEqual(json.load(stream)['scanned'], 10)
+            self.assertEqual(Activity.objects.filter(xp_earned=60).count(), 10)
+
+            result = XPBackfill(chunk_size=5, checkpoint_path=path).run()
+            self.assertTrue(result.resumed)
+            self.assertEqual((result.scanned, result.changed, result.xp_delta), (20, 20, 200))
+            self.assertFalse(os.path.exists(path))
+        self.assertEqual(XPLedgerEntry.objects.filter(source_type='adjustment').count(), 20)
+        self.character.refresh_from_db()
+        self.assertEqual(self.character.total_xp, 1200)
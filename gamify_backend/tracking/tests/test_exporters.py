@@ -0,0 +1,104 @@
+import csv
+import io
+import json
+import tracemalloc
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework.test import APITestCase
+from users.models import User, Character
+from tracking.exporters import COLUMNS, export_activities
+from tracking.importers import ActivityImporter
+from tracking.models import Activity
+from tracking.services import ActivityService
+from .fixtures import CharacterFixtureMixin
+
+
+class ExportTestMixin(CharacterFixtureMixin):
+    def add_activities(self, count, character=None):
+        start = datetime(2025, 1, 1, 7, 0, tzinfo=dt_timezone.utc)
+        ActivityService.create_many(character or self.character, [
+            Activity(
+                activity_type=self.running,
+                duration_minutes=10 + index % 50,
+                calories=None if index % 2 else 150,
+                satisfaction=1 + index % 10,
+                notes="Parc, \"boucle\" nord" if index == 0 else None,
+                created_at=start + timedelta(hours=index),
+            )
+            for index in range(count)
+        ])
+
+
+class ActivityExportTest(ExportTestMixin, TestCase):
+    def test_csv_export(self):
+        self.add_activities(3)
+        rows = list(csv.DictReader(io.StringIO(''.join(export_activities(self.character.pk, 'csv')))))
+        self.assertEqual(len(rows), 3)
+        self.assertEqual(list(rows[0]), COLUMNS)
+        self.assertEqual((rows[0]['activity_type'], rows[0]['notes'], rows[0]['calories']), ("Running", "Parc, \"boucle\" nord", "150"))
+        self.assertEqual(rows[1]['created_at'], "2025-01-01T08:00:00+00:00")
+
+    def test_ndjson_export_is_chunked(self):
+        self.add_activities(5)
+        chunks = list(export_activities(self.character.pk, 'ndjson', chunk_size=2))
+        self.assertEqual(len(chunks), 3)
+        lines = [json.loads(line) for line in ''.join(chunks).splitlines()]
+        self.assertEqual([line['duration_minutes'] for line in lines], [10, 11, 12, 13, 14])
+        self.assertIsNone(lines[1]['calories'])
+
+    def test_export_can_be_reimported(self):
+        self.add_activities(4)
+        other = Character.objects.create(user=self.user, name="Twin", race=self.race, character_class=self.character_class)
+        for file_type in ('csv', 'ndjson'):
+            data = ''.join(export_activities(self.character.pk, file_type)).encode('utf-8')
+            result = ActivityImporter(other).run(io.BytesIO(data), file_type)
+            self.assertEqual((result.created, result.skipped), (4, 0))
+        self.assertEqual(
+            sorted(other.activities.values_list('duration_minutes', 'created_at'))[::2],
+            sorted(self.character.activities.values_list('duration_minutes', 'created_at')),
+        )
+
+    def test_memory_does_not_grow_with_history(self):
+        """Test that the peak memory of an export depends on the chunk size, not on the row count."""
+        def peak(character):
+            tracemalloc.start()
+            for _ in export_activities(character.pk, 'ndjson', chunk_size=100):
+                pass
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            return peak
+
+        small = Character.objects.create(user=self.user, name="Small", race=self.race, character_class=self.character_class)
+        self.add_activities(200, small)
+        self.add_activities(4000)
+        self.assertLess(peak(self.character), 2 * peak(small))
+
+
+class ActivityExportViewTest(ExportTestMixin, APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.client.force_authenticate(user=self.user)
+        self.add_activities(3)
+
+    def test_streaming_download(self):
+        url = reverse('activity-export', kwargs={'character_pk': self.character.pk, 'file_type': 'csv'})
+        response = self.client.get(url, HTTP_ACCEPT='text/csv')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        self.assertEqual(response['Content-Type'], 'text/csv; charset=utf-8')
+        self.assertIn(f'filename="{self.character.slug}-activities.csv"', response['Content-Disposition'])
+        self.assertEqual(b''.join(response.streaming_content).decode('utf-8').count('\n'), 4)
+
+    def test_ndjson_download(self):
+        url = reverse('activity-export', kwargs={'character_pk': self.character.pk, 'file_type': 'ndjson'})
+        response = self.client.get(url)
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        self.assertEqual(len(b''.join(response.streaming_content).splitlines()), 3)
+
+    def test_other_user_character(self):
+        stranger = User.objects.create_user(username="stranger", email="stranger@example.com", password="testpassword")
+        self.client.force_authenticate(user=stranger)
+        url = reverse('activity-export', kwargs={'character_pk': self.character.pk, 'file_type': 'csv'})
+        self.assertEqual(self.client.get(url).status_code, 404)
@@ -0,0 +1,82 @@
+from datetime import timedelta
+
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APITestCase
+from users.models import User, Character
+from tracking.archive import ActivityArchiver
+from tracking.models import Activity
+from tracking.services import ActivityService
+from .fixtures import CharacterFixtureMixin
+
+
+class ActivityNoteSearchTest(CharacterFixtureMixin, APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.other_user = User.objects.create_user(username="otheruser", email="other@example.com", password="testpassword")
+        self.other_character = Character.objects.create(user=self.other_user, name="OtherChar", race=self.race, character_class=self.character_class)
+        self.url = reverse('activity-search')
+        self.client.force_authenticate(user=self.user)
+
+    def log(self, character, notes, **kwargs):
+        return Activity.objects.create(character=character, activity_type=self.running, duration_minutes=30, satisfaction=4, notes=notes, **kwargs)
+
+    def search(self, query, **params):
+        response = self.client.get(self.url, {'q': query, **params})
+        self.assertEqual(response.status_code, 200)
+        return response.data['results']
+
+    def test_ranked_results_with_snippets(self):
+        park = self.log(self.character, "Morning run in the park, the park was empty")
+        self.log(self.character, "Intervals on the track")
+        once = self.log(self.character, "Walk in the park <with> friends")
+        results = self.search("park")
+        self.assertEqual([result['id'] for result in results], [park.pk, once.pk])
+        self.assertIn("<mark>park</mark>", results[0]['snippet'])
+        self.assertIn("&lt;with&gt;", results[1]['snippet'])
+        self.assertGreater(results[0]['rank'], results[1]['rank'])
+        self.assertEqual(results[0]['character_id'], self.character.pk)
+
+    def test_prefixes_and_every_word(self):
+        activity = self.log(self.character, "Évening running with Sam")
+        self.log(self.character, "Evening swim")
+        self.assertEqual([result['id'] for result in self.search("evening runn")], [activity.pk])
+        # No FTS5 syntax from the query
+        self.assertEqual([result['id'] for result in self.search('running" (sam*')], [activity.pk])
+
+    def test_index_follows_writes(self):
+        activity = self.log(self.character, "Hill sprints")
+        ActivityService.create_many(self.character, [
+            Activity(activity_type=self.running, duration_minutes=20, satisfaction=3, notes="Hill repeats")
+        ])
+        self.assertEqual(len(self.search("hill")), 2)
+
+        Activity.objects.filter(pk=activity.pk).update(notes="Flat sprints")
+        self.assertEqual(len(self.search("hill")), 1)
+        self.assertEqual([result['id'] for result in self.search("flat")], [activity.pk])
+
+        activity.delete()
+        self.assertEqual(self.search("flat"), [])
+
+    def test_only_own_notes(self):
+        self.log(self.other_character, "Secret park route")
+        self.assertEqual(self.search("park"), [])
+
+        mine = self.log(self.character, "Park route")
+        other = Character.objects.create(user=self.user, name="SecondChar", race=self.race, character_class=self.character_class)
+        self.log(other, "Park loop")
+        self.assertEqual(len(self.search("park")), 2)
+        self.assertEqual([result['id'] for result in self.search("park", character=self.character.pk)], [mine.pk])
+
+    def test_archived_activities_leave_the_index(self):
+        self.log(self.character, "Old marathon", created_at=timezone.now() - timedelta(days=800))
+        self.assertEqual(len(self.search("marathon")), 1)
+        ActivityArchiver(days=365).run()
+        self.assertEqual(self.search("marathon"), [])
+
+    def test_invalid_queries(self):
+        self.assertEqual(self.client.get(self.url).status_code, 400)
+        self.assertEqual(self.client.get(self.url, {'q': "park", 'limit': 500}).status_code, 400)
+        self.assertEqual(self.search("!!!"), [])
+        self.client.force_authenticate(user=None)
+        self.assertEqual(self.client.get(self.url, {'q': "park"}).status_code, 401)
@@ -0,0 +1,191 @@
+import io
+import json
+import tempfile
+from datetime import datetime, timezone as dt_timezone
+from unittest import mock
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APITestCase
+from users.models import User, Character, Race, CharacterClass
+from tracking.importers import ActivityImporter, ActivityImportError, RowError, parse_json
+from tracking.models import Activity, ActivityType, XPLedgerEntry
+from .fixtures import CharacterFixtureMixin
+
+GPX = b"""<?xml version="1.0" encoding="UTF-8"?>
+<gpx version="1.1" xmlns="http://www.topografix.com/GPX/1/1">
+  <metadata><name>Export</name><time>2025-01-01T00:00:00Z</time></metadata>
+  <trk>
+    <name>Morning run</name>
+    <type>Running</type>
+    <trkseg>
+      <trkpt lat="48.85" lon="2.35"><time>2025-03-01T07:00:00Z</time></trkpt>
+      <trkpt lat="48.86" lon="2.36"><time>2025-03-01T07:20:00Z</time></trkpt>
+      <trkpt lat="48.87" lon="2.37"><time>2025-03-01T07:45:00Z</time></trkpt>
+    </trkseg>
+  </trk>
+  <trk>
+    <type>Cycling</type>
+    <trkseg>
+      <trkpt lat="48.85" lon="2.35"><time>2025-03-02T18:00:00Z</time></trkpt>
+      <trkpt lat="48.95" lon="2.45"><time>2025-03-02T19:30:00Z</time></trkpt>
+    </trkseg>
+  </trk>
+</gpx>
+"""
+
+
+class ActivityImporterTest(CharacterFixtureMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        ActivityType.objects.create(name="Cycling", category="Sport")
+
+    def run_import(self, content, file_type, **options):
+        with self.captureOnCommitCallbacks(execute=True):
+            return ActivityImporter(self.character, **options).run(io.BytesIO(content), file_type)
+
+    def test_csv_import(self):
+        """Test a CSV export: aliases, original dates, bad rows reported and skipped."""
+        content = (
+            "Date,Type,Duration,Calories,Notes\n"
+            "2025-03-01T07:00:00Z,running,20,250,Park\n"
+            "2025-03-02,Cycling,1:00:00,,\n"
+            "2025-03-03,Swimming,30,,\n"
+            "2025-03-04,Running,,,\n"
+        ).encode()
+        result = self.run_import(content, 'csv')
+        self.assertEqual((result.created, result.skipped), (2, 2))
+        self.assertEqual(result.errors, [(3, "Unknown activity type: Swimming"), (4, "Missing duration.")])
+
+        run = Activity.objects.get(duration_minutes=20)
+        self.assertEqual((run.calories, run.notes, run.xp_earned), (250, "Park", 100))
+        self.assertEqual(run.created_at, datetime(2025, 3, 1, 7, 0, tzinfo=dt_timezone.utc))
+        self.assertEqual(Activity.objects.get(duration_minutes=60).xp_earned, 300)
+
+    def test_xp_applied_once_per_import(self):
+        """Test that the XP reaches the character with one ledger entry per activity and a single flush."""
+        content = "type,duration\n" + "Running,10\n" * 250
+        with CaptureQueriesContext(connection) as queries:
+            result = self.run_import(content.encode(), 'csv', chunk_size=100)
+        self.assertEqual(result.created, 250)
+        self.assertEqual(XPLedgerEntry.objects.filter(source_type='activity').count(), 250)
+        self.assertFalse(XPLedgerEntry.objects.filter(applied_at__isnull=True).exists())
+        character_updates = [q for q in queries if q['sql'].startswith('UPDATE "users_character"')]
+        self.assertEqual(len(character_updates), 1)
+        self.character.refresh_from_db()
+        self.assertEqual(self.character.total_xp, 250 * 50)
+
+    def test_json_import_across_read_chunks(self):
+        """Test that objects split between two reads of the stream are decoded."""
+        rows = [{"activity_type": "Running", "duration_minutes": 10 + i, "notes": "x" * 20} for i in range(30)]
+        values = list(parse_json(io.BytesIO(json.dumps(rows).encode()), read_size=16))
+        self.assertEqual(values, rows)
+        result = self.run_import(json.dumps(rows).encode(), 'json')
+        self.assertEqual(result.created, 30)
+
+    def test_broken_json(self):
+        with self.assertRaises(ActivityImportError):
+            self.run_import(b'[{"type": "Running", "duration": 10}, {"type": ', 'json')
+        self.assertFalse(Activity.objects.exists())
+
+    def test_json_separators(self):
+        """Test that the activities must be separated by exactly one comma."""
+        for content in (
+            b'[{"type": "Running", "duration": 10}{"type": "Running", "duration": 20}]',
+            b'[{"type": "Running", "duration": 10},,,{"type": "Running", "duration": 20}]',
+            b'[{"type": "Running", "duration": 10},]',
+        ):
+            with self.subTest(content=content), self.assertRaises(ActivityImportError):
+                self.run_import(content, 'json')
+        self.assertFalse(Activity.objects.exists())
+
+    def test_oversized_json_object(self):
+        """Test that an object over the size limit is a row error, read past without being buffered."""
+        rows = [
+            {"type": "Running", "duration": 10},
+            {"type": "Running", "duration": 20, "notes": "x" * 500, "laps": [{"split": "]"}]},
+            {"type": "Running", "duration": 30},
+        ]
+        with mock.patch('tracking.importers.MAX_OBJECT_SIZE', 100), mock.patch('tracking.importers.READ_SIZE', 16):
+            result = self.run_import(json.dumps(rows).encode(), 'json')
+        self.assertEqual((result.created, result.skipped), (2, 1))
+        self.assertEqual(result.errors, [(2, "Activity longer than 100 characters.")])
+
+        values = list(parse_json(io.BytesIO(json.dumps(rows).encode()), read_size=16, max_object_size=100))
+        self.assertEqual((values[0], values[2]), (rows[0], rows[2]))
+        self.assertIsInstance(values[1], RowError)
+
+    def test_ndjson_import(self):
+        content = b'{"type": "Running", "duration_seconds": 1800}\n\n{"type": "Yoga", "duration": 45}\n'
+        result = self.run_import(content, 'ndjson', create_missing_types=True)
+        self.assertEqual(result.created, 2)
+        self.assertEqual(ActivityType.objects.get(name="Yoga").category, "Imported")
+
+    def test_gpx_import(self):
+        """Test that each track becomes an activity lasting from its first to its last point."""
+        result = self.run_import(GPX, 'gpx')
+        self.assertEqual(result.created, 2)
+        run = Activity.objects.get(activity_type__name="Running")
+        self.assertEqual((run.duration_minutes, run.notes), (45, "Morning run"))
+        self.assertEqual(Activity.objects.get(activity_type__name="Cycling").duration_minutes, 90)
+
+    def test_command(self):
+        with tempfile.NamedTemporaryFile(suffix='.csv') as export:
+            export.write(b"type,duration\nRunning,30\n")
+            export.flush()
+            with self.captureOnCommitCallbacks(execute=True):
+                call_command('import_activities', self.character.pk, export.name, stdout=io.StringIO())
+        self.assertEqual(Activity.objects.get().duration_minutes, 30)
+
+
+class ActivityImportViewTest(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="testuser", email="test@example.com", password="testpassword")
+        race = Race.objects.create(name="Human", description="Humans are versatile.")
+        character_class = CharacterClass.objects.create(name="Warrior", description="Strong.", primary_attribute="Strength")
+        self.character = Character.objects.create(user=self.user, name="TestChar", race=race, character_class=character_class)
+        ActivityType.objects.create(name="Running", category="Sport")
+        self.client.force_authenticate(user=self.user)
+
+    def test_upload(self):
+        upload = SimpleUploadedFile("export.gpx", GPX, content_type="application/gpx+xml")
+        url = reverse('activity-import', kwargs={'character_pk': self.character.pk})
+        response = self.client.post(url, {'file': upload}, format='multipart')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual((response.data['created'], response.data['skipped']), (1, 1))
+        self.assertEqual(response.data['errors'], [{'row': 2, 'message': "Unknown activity type: Cycling"}])
+
+    def test_other_user_character(self):
+        stranger = User.objects.create_user(username="stranger", email="stranger@example.com", password="testpassword")
+        self.client.force_authenticate(user=stranger)
+        upload = SimpleUploadedFile("export.csv", b"type,duration\nRunning,30\n")
+        url = reverse('activity-import', kwargs={'character_pk': self.character.pk})
+        self.assertEqual(self.client.post(url, {'file': upload}, format='multipart').status_code, 404)
+
+    def test_unknown_file_type(self):
+        upload = SimpleUploadedFile("export.txt", b"Running 30")
+        url = reverse('activity-import', kwargs={'character_pk': self.character.pk})
+        response = self.client.post(url, {'file': upload}, format='multipart')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('file_type', response.data)
+
+    def test_create_missing_types_is_for_staff(self):
+        """Test that a regular user cannot add activity types to the shared catalog."""
+        url = reverse('activity-import', kwargs={'character_pk': self.character.pk})
+        upload = SimpleUploadedFile("export.gpx", GPX, content_type="application/gpx+xml")
+        response = self.client.post(url, {'file': upload, 'create_missing_types': True}, format='multipart')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('create_missing_types', response.data)
+        self.assertFalse(ActivityType.objects.filter(name="Cycling").exists())
+
+        User.objects.filter(pk=self.user.pk).update(is_staff=True)
+        self.user.refresh_from_db()
+        self.client.force_authenticate(user=self.user)
+        upload = SimpleUploadedFile("export.gpx", GPX, content_type="application/gpx+xml")
+        response = self.client.post(url, {'file': upload, 'create_missing_types': True}, format='multipart')
+        self.assertEqual(response.status_code, 201)
+        self.assertTrue(ActivityType.objects.filter(name="Cycling").exists())
@@ -0,0 +1,135 @@
+from datetime import timedelta
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APITestCase
+from users.models import User, Character, Race, CharacterClass
+from tracking import leaderboards
+from tracking.leaderboards import get_leaderboard
+from tracking.models import Activity, ActivityType
+from tracking.services import XPLedgerService
+
+
+class LeaderboardTestMixin:
+    def setUp(self):
+        cache.clear()
+        self.human = Race.objects.create(name="Human", description="Humans are versatile.")
+        self.elf = Race.objects.create(name="Elf", description="Elves are graceful.")
+        self.warrior = CharacterClass.objects.create(name="Warrior", description="Strong.", primary_attribute="Strength")
+        self.mage = CharacterClass.objects.create(name="Mage", description="Wise.", primary_attribute="Intelligence")
+        self.characters = {}
+        for index, (name, race, character_class, total_xp) in enumerate([
+            ("Aragorn", self.human, self.warrior, 900),
+            ("Legolas", self.elf, self.warrior, 1500),
+            ("Gandalf", self.human, self.mage, 1500),
+            ("Elrond", self.elf, self.mage, 300),
+            ("Boromir", self.human, self.warrior, 0),
+        ]):
+            user = User.objects.create_user(username=f"player{index}", email=f"player{index}@example.com", password="testpassword")
+            character = Character.objects.create(user=user, name=name, race=race, character_class=character_class)
+            Character.objects.filter(pk=character.pk).update(total_xp=total_xp)
+            self.characters[name] = character
+
+
+class LeaderboardTest(LeaderboardTestMixin, TestCase):
+    def test_top_with_ties(self):
+        """Test that ties share a rank and are ordered by character id."""
+        entries = get_leaderboard('global').top()
+        self.assertEqual(
+            [(entry['rank'], entry['name'], entry['score']) for entry in entries],
+            [(1, "Legolas", 1500), (1, "Gandalf", 1500), (3, "Aragorn", 900), (4, "Elrond", 300), (5, "Boromir", 0)],
+        )
+        self.assertEqual(entries[0]['username'], "player1")
+
+    def test_class_and_race_boards(self):
+        self.assertEqual([entry['name'] for entry in get_leaderboard('class', self.mage.pk).top()], ["Gandalf", "Elrond"])
+        self.assertEqual([entry['name'] for entry in get_leaderboard('race', self.human.pk).top(2)], ["Gandalf", "Aragorn"])
+
+    def test_top_is_cached(self):
+        board = get_leaderboard('global')
+        board.top()
+        with self.assertNumQueries(0):
+            self.assertEqual(len(board.top(3)), 3)
+
+    def test_rank_matches_count(self):
+        board = get_leaderboard('global')
+        for character in self.characters.values():
+            score = Character.objects.get(pk=character.pk).total_xp
+            expected = Character.objects.filter(total_xp__gt=score).count() + 1
+            self.assertEqual(board.rank(character.pk)['rank'], expected)
+        with self.assertNumQueries(2):  # The score and the count above it, the total is cached
+            self.assertEqual(board.rank(self.characters["Aragorn"].pk), {
+                'character_id': self.characters["Aragorn"].pk, 'rank': 3, 'score': 900, 'total': 5,
+            })
+
+    def test_rank_follows_the_fresh_score(self):
+        board = get_leaderboard('global')
+        self.assertEqual(board.rank(self.characters["Elrond"].pk)['rank'], 4)
+        Character.objects.filter(pk=self.characters["Elrond"].pk).update(total_xp=1000)
+        self.assertEqual(board.rank(self.characters["Elrond"].pk), {
+            'character_id': self.characters["Elrond"].pk, 'rank': 3, 'score': 1000, 'total': 5,
+        })
+
+    @mock.patch.object(leaderboards, 'TOP_SIZE', 3)
+    def test_flush_invalidates_only_reachable_tops(self):
+        """Test that a grant below the cached cut-off keeps the cached top-N."""
+        board = get_leaderboard('global')
+        board.top()
+        version = cache.get(f'{board.cache_prefix()}:version')
+
+        XPLedgerService.record(self.characters["Boromir"].pk, 100, 'bonus', 1)
+        XPLedgerService.flush()
+        self.assertEqual(cache.get(f'{board.cache_prefix()}:version'), version)
+
+        XPLedgerService.record(self.characters["Boromir"].pk, 5000, 'bonus', 2)
+        XPLedgerService.flush()
+        self.assertEqual(board.top()[0]['name'], "Boromir")
+
+    def test_deletion_drops_cached_boards(self):
+        board = get_leaderboard('global')
+        board.top()
+        self.characters["Legolas"].delete()
+        self.assertNotIn("Legolas", [entry['name'] for entry in board.top()])
+
+    def test_stampede_serves_previous_top(self):
+        """Test that while the lock is held, the previous top-N is served without querying."""
+        board = get_leaderboard('global')
+        board.top()
+        board.invalidate()
+        cache.add(f'{board.cache_prefix()}:lock', 1)
+        with self.assertNumQueries(0):
+            self.assertEqual(len(board.top()), 5)
+
+    def test_weekly_board(self):
+        running = ActivityType.objects.create(name="Running", category="Sport")
+        now = timezone.now()
+        for name, minutes, when in [("Elrond", 60, now), ("Aragorn", 20, now), ("Gandalf", 90, now - timedelta(days=14))]:
+            Activity.objects.create(character=self.characters[name], activity_type=running, duration_minutes=minutes, satisfaction=5, created_at=when)
+        board = get_leaderboard('weekly')
+        self.assertEqual([(entry['name'], entry['score']) for entry in board.top()], [("Elrond", 300), ("Aragorn", 100)])
+        self.assertEqual(board.rank(self.characters["Aragorn"].pk)['rank'], 2)
+        self.assertIsNone(board.rank(self.characters["Gandalf"].pk))
+
+
+class LeaderboardViewTest(LeaderboardTestMixin, APITestCase):
+    def test_global_leaderboard_with_own_rank(self):
+        owner = self.characters["Aragorn"].user
+        self.client.force_authenticate(user=owner)
+        response = self.client.get(reverse('leaderboard-global'), {'limit': 2, 'character': self.characters["Aragorn"].pk})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([entry['name'] for entry in response.data['entries']], ["Legolas", "Gandalf"])
+        self.assertEqual((response.data['me']['rank'], response.data['me']['total']), (3, 5))
+
+    def test_other_user_character(self):
+        self.client.force_authenticate(user=self.characters["Aragorn"].user)
+        response = self.client.get(reverse('leaderboard-class', kwargs={'key': self.warrior.pk}), {'character': self.characters["Legolas"].pk})
+        self.assertEqual(response.status_code, 404)
+
+    def test_weekly_leaderboard_week(self):
+        self.client.force_authenticate(user=self.characters["Aragorn"].user)
+        response = self.client.get(reverse('leaderboard-weekly'), {'week': '2025-03-05'})
+        self.assertEqual((response.status_code, str(response.data['key']), response.data['entries']), (200, '2025-03-03', []))
+        self.assertIsNone(response.data['me'])
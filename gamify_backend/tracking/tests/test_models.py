@@ -1,4 +1,6 @@
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
 from users.models import User, Character, Race, CharacterClass
 from tracking.models import Activity, ActivityType
 
@@ -32,12 +34,29 @@ class ActivityModelTest(TestCase):
             duration_minutes=60,  # 60 * 5 = 300 XP
             satisfaction=5,
         )
-        activity.save()
+        with self.captureOnCommitCallbacks(execute=True):  # XP is folded after the commit
+            activity.save()
         self.character.refresh_from_db()
         self.assertEqual(self.character.current_xp, 0)  # current XP after leveling up
         self.assertEqual(self.character.total_xp, 300)  # total XP earned
         self.assertEqual(self.character.level, 3)  # Leveled up (-100 from 1 to 2, -200 for 2 to 3, total -300 XP, hence why current_xp is 0)
 
+    def test_save_reads_the_character_level_only(self):
+        """Test that the multiplier comes from the loaded character, or from its level alone."""
+        Character.objects.filter(pk=self.character.pk).update(level=3)
+        character = Character.objects.get(pk=self.character.pk)
+        with CaptureQueriesContext(connection) as queries:
+            activity = Activity.objects.create(character=character, activity_type=self.activity_type, duration_minutes=10, satisfaction=5)
+        self.assertFalse([query for query in queries if 'FROM "users_character"' in query['sql']])
+        self.assertEqual(activity.xp_multiplier, character.xp_multiplier)
+
+        with CaptureQueriesContext(connection) as queries:
+            activity = Activity.objects.create(character_id=character.pk, activity_type=self.activity_type, duration_minutes=10, satisfaction=5)
+        reads = [query['sql'] for query in queries if 'FROM "users_character"' in query['sql']]
+        self.assertEqual(len(reads), 1)
+        self.assertTrue(reads[0].startswith('SELECT "users_character"."level" FROM'))
+        self.assertEqual(activity.xp_multiplier, character.xp_multiplier)
+
     def test_activity_requires_satisfaction(self):
         """Test that the 'satisfaction' field is mandatory."""
         with self.assertRaises(Exception):  # Error if the satisfaction field is None
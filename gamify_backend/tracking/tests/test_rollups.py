@@ -0,0 +1,144 @@
+import math
+from datetime import date, datetime, timezone as dt_timezone
+
+from django.db import connection
+from django.db.models import AutoField
+from django.urls import reverse
+from django.test import TestCase
+from rest_framework.test import APITestCase
+from users.models import User
+from tracking.models import Activity, ActivityType, DailyActivityRollup, WeeklyActivityRollup, MonthlyActivityTypeRollup, XPLedgerEntry
+from tracking.rollups import ActivityRollupService
+from tracking.scoring import get_rule_set
+from tracking.services import ActivityService
+from .fixtures import CharacterFixtureMixin
+
+
+def rollup_rows(model):
+    return sorted(model.objects.values_list(
+        'character_id', *(['activity_type_id'] if model is MonthlyActivityTypeRollup else []),
+        {DailyActivityRollup: 'day', WeeklyActivityRollup: 'week_start', MonthlyActivityTypeRollup: 'month'}[model],
+        'activity_count', 'total_minutes', 'total_calories', 'total_xp', 'satisfaction_sum',
+    ))
+
+
+def insert_batches(model, rows, batch_size=1000):
+    """INSERTs of a bulk_create() of `rows` new rows: the backend limits the parameters of a query."""
+    fields = [field for field in model._meta.concrete_fields if not isinstance(field, AutoField)]
+    return math.ceil(rows / min(batch_size, max(connection.ops.bulk_batch_size(fields, [None] * rows), 1)))
+
+
+class RollupTestMixin(CharacterFixtureMixin):
+    def setUp(self):
+        super().setUp()
+        self.yoga = ActivityType.objects.create(name="Yoga", category="Sport")
+
+
+class ActivityRollupTest(RollupTestMixin, TestCase):
+    def test_rollups_follow_creation(self):
+        """Test that an activity is counted in its day, ISO week and month rows."""
+        self.log_activity(datetime(2025, 3, 5, 8, 0, tzinfo=dt_timezone.utc), calories=200, satisfaction=8)  # Wednesday
+        self.log_activity(datetime(2025, 3, 5, 18, 0, tzinfo=dt_timezone.utc), duration_minutes=10, satisfaction=4)
+
+        day = DailyActivityRollup.objects.get()
+        self.assertEqual((day.day, day.activity_count, day.total_minutes, day.total_calories, day.total_xp), (date(2025, 3, 5), 2, 30, 200, 150))
+        self.assertEqual(day.average_satisfaction, 6)
+        week = WeeklyActivityRollup.objects.get()
+        self.assertEqual((week.week_start, week.iso_week), (date(2025, 3, 3), (2025, 10)))
+        month = MonthlyActivityTypeRollup.objects.get()
+        self.assertEqual((month.month, month.activity_type_id, month.activity_count), (date(2025, 3, 1), self.running.pk, 2))
+
+    def test_rollups_follow_edition(self):
+        """Test that an edited activity moves between rows."""
+        activity = self.log_activity(datetime(2025, 3, 5, 8, 0, tzinfo=dt_timezone.utc))
+        activity.created_at = datetime(2025, 4, 1, 8, 0, tzinfo=dt_timezone.utc)
+        activity.activity_type = self.yoga
+        activity.duration_minutes = 45
+        activity.save()
+
+        self.assertEqual(list(DailyActivityRollup.objects.values_list('day', 'total_minutes')), [(date(2025, 4, 1), 45)])
+        self.assertEqual(list(MonthlyActivityTypeRollup.objects.values_list('month', 'activity_type_id')), [(date(2025, 4, 1), self.yoga.pk)])
+
+    def test_rollups_follow_deletion(self):
+        first = self.log_activity(datetime(2025, 3, 5, 8, 0, tzinfo=dt_timezone.utc))
+        self.log_activity(datetime(2025, 3, 6, 8, 0, tzinfo=dt_timezone.utc))
+        first.delete()
+        self.assertEqual(list(DailyActivityRollup.objects.values_list('day', flat=True)), [date(2025, 3, 6)])
+        self.assertEqual(WeeklyActivityRollup.objects.get().activity_count, 1)
+
+    def test_character_deletion(self):
+        self.log_activity(datetime(2025, 3, 5, 8, 0, tzinfo=dt_timezone.utc))
+        self.character.delete()
+        self.assertFalse(DailyActivityRollup.objects.exists())
+
+    def test_bulk_insert_matches_rebuild(self):
+        """Test that the rollups of a bulk import are those recomputed from scratch."""
+        activities = [
+            Activity(
+                activity_type=self.running if i % 3 else self.yoga,
+                duration_minutes=10 + i,
+                calories=None if i % 2 else 100,
+                satisfaction=1 + i % 10,
+                created_at=datetime(2025, 1 + i % 4, 1 + i % 28, 12, 0, tzinfo=dt_timezone.utc),
+            )
+            for i in range(120)
+        ]
+        get_rule_set()  # Compiled once, outside of the measured inserts
+        # The bulk inserts of the activities and of their ledger entries, then 3 x (select + insert),
+        # the streak, and their savepoints: the same whatever the number of days covered
+        inserts = insert_batches(Activity, len(activities)) + insert_batches(XPLedgerEntry, len(activities))
+        with self.assertNumQueries(inserts + 22):
+            ActivityService.create_many(self.character, activities)
+        incremental = {model: rollup_rows(model) for model in (DailyActivityRollup, WeeklyActivityRollup, MonthlyActivityTypeRollup)}
+
+        ActivityRollupService.rebuild()
+        for model, rows in incremental.items():
+            self.assertEqual(rollup_rows(model), rows)
+        self.assertEqual(sum(row[2] for row in incremental[DailyActivityRollup]), 120)
+
+
+class ActivityStatsViewTest(RollupTestMixin, APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.client.force_authenticate(user=self.user)
+        for day in (1, 2, 9):
+            self.log_activity(datetime(2025, 3, day, 8, 0, tzinfo=dt_timezone.utc))
+
+    def test_daily_stats(self):
+        url = reverse('stats-daily', kwargs={'character_pk': self.character.pk})
+        with self.assertNumQueries(2):
+            response = self.client.get(url, {'from': '2025-03-01', 'to': '2025-03-05'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([row['day'] for row in response.data], ['2025-03-01', '2025-03-02'])
+        self.assertEqual(response.data[0]['total_minutes'], 20)
+        self.assertEqual(response.data[0]['average_satisfaction'], 6.0)
+
+    def test_weekly_and_monthly_stats(self):
+        url = reverse('stats-weekly', kwargs={'character_pk': self.character.pk})
+        response = self.client.get(url, {'from': '2025-02-01', 'to': '2025-03-31'})
+        self.assertEqual([(row['iso_week'], row['activity_count']) for row in response.data], [(9, 2), (10, 1)])
+
+        url = reverse('stats-monthly', kwargs={'character_pk': self.character.pk})
+        response = self.client.get(url, {'from': '2025-01-01', 'to': '2025-12-31'})
+        self.assertEqual([(row['activity_type_name'], row['activity_count']) for row in response.data], [("Running", 3)])
+
+    def test_from_inside_a_period(self):
+        """Test that the week and the month containing ?from= are included."""
+        url = reverse('stats-weekly', kwargs={'character_pk': self.character.pk})
+        response = self.client.get(url, {'from': '2025-02-26', 'to': '2025-03-31'})  # A Wednesday of week 9
+        self.assertEqual([row['iso_week'] for row in response.data], [9, 10])
+
+        url = reverse('stats-monthly', kwargs={'character_pk': self.character.pk})
+        response = self.client.get(url, {'from': '2025-03-15', 'to': '2025-12-31'})
+        self.assertEqual([row['activity_count'] for row in response.data], [3])
+
+    def test_invalid_period(self):
+        url = reverse('stats-daily', kwargs={'character_pk': self.character.pk})
+        self.assertEqual(self.client.get(url, {'from': 'yesterday'}).status_code, 400)
+        self.assertEqual(self.client.get(url, {'from': '2020-01-01', 'to': '2025-01-01'}).status_code, 400)
+
+    def test_other_user_character(self):
+        stranger = User.objects.create_user(username="stranger", email="stranger@example.com", password="testpassword")
+        self.client.force_authenticate(user=stranger)
+        url = reverse('stats-daily', kwargs={'character_pk': self.character.pk})
+        self.assertEqual(self.client.get(url).status_code, 404)
@@ -0,0 +1,119 @@
+import numpy as np
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase
+from gamify_backend.localindex import CHECK_INTERVAL
+from tracking.models import Activity, ActivityType, XPRule
+from tracking.scoring import RULE_SET, CompiledRule, XPRuleSet, get_rule_set, reset_rule_set
+from tracking.services import ActivityService
+from .fixtures import CharacterFixtureMixin
+
+
+class XPRuleSetTest(SimpleTestCase):
+    def test_default_rule_set_matches_historical_formula(self):
+        """Test that without rules an activity earns duration * 5 * multiplier."""
+        rule_set = XPRuleSet.default()
+        for duration in (1, 7, 20, 60, 333):
+            for multiplier in (1.0, 1.1, 1.2000000000000002, 1.7, 2.3):
+                self.assertEqual(rule_set.score(1, duration, None, 5, multiplier), int(duration * 5 * multiplier))
+
+    def test_conditions_and_effects(self):
+        rule_set = XPRuleSet([
+            CompiledRule(xp_per_minute=5),
+            CompiledRule(type_ids={1}, min_duration=30, bonus_xp=50),
+            CompiledRule(min_calories=300, xp_per_calorie=0.5),
+            CompiledRule(min_satisfaction=8, multiplier=1.5),
+        ])
+        self.assertEqual(rule_set.score(2, 30, None, 5), 150)
+        self.assertEqual(rule_set.score(1, 30, None, 5), 200)
+        self.assertEqual(rule_set.score(1, 30, 400, 5), 400)
+        self.assertEqual(rule_set.score(1, 30, 400, 9, multiplier=2.0), 1200)
+
+    def test_score_never_negative(self):
+        rule_set = XPRuleSet([CompiledRule(xp_per_minute=1, bonus_xp=-100)])
+        self.assertEqual(rule_set.score(1, 20, None, 5), 0)
+        self.assertEqual(rule_set.score_arrays([1], [20], [0], [5]).tolist(), [0])
+
+    def test_arrays_match_scalar_scoring(self):
+        rule_set = XPRuleSet([
+            CompiledRule(xp_per_minute=4.3, xp_per_satisfaction=1.7),
+            CompiledRule(type_ids={2, 3}, xp_per_calorie=0.13, multiplier=1.25),
+            CompiledRule(min_duration=45, max_satisfaction=4, bonus_xp=33),
+            CompiledRule(type_ids=set(), bonus_xp=1000),  # A category without any type
+        ])
+        rng = np.random.default_rng(7)
+        count = 5000
+        type_ids = rng.integers(1, 5, count)
+        durations = rng.integers(1, 240, count)
+        calories = rng.integers(0, 900, count)
+        satisfactions = rng.integers(1, 11, count)
+        multipliers = 1.0 + (rng.integers(1, 30, count) - 1) * 0.1
+        expected = [
+            rule_set.score(*values)
+            for values in zip(type_ids.tolist(), durations.tolist(), calories.tolist(), satisfactions.tolist(), multipliers.tolist())
+        ]
+        self.assertEqual(rule_set.score_arrays(type_ids, durations, calories, satisfactions, multipliers).tolist(), expected)
+
+
+class XPRuleIntegrationTest(CharacterFixtureMixin, TestCase):
+    def setUp(self):
+        self.addCleanup(reset_rule_set)
+        super().setUp()
+        self.reading = ActivityType.objects.create(name="Reading", category="Leisure")
+
+    def activity(self, activity_type, duration_minutes=20, **extra):
+        return Activity(character=self.character, activity_type=activity_type, duration_minutes=duration_minutes, satisfaction=extra.pop('satisfaction', 6), **extra)
+
+    def test_rules_from_db(self):
+        XPRule.objects.create(name="Base", xp_per_minute=2)
+        XPRule.objects.create(name="Sport", category="Sport", xp_per_minute=3, priority=1)
+        XPRule.objects.create(name="Happy", min_satisfaction=9, multiplier=2)
+        self.assertEqual(self.activity(self.running).calculate_xp(), 100)
+        self.assertEqual(self.activity(self.reading).calculate_xp(), 40)
+        self.assertEqual(self.activity(self.reading, satisfaction=10).calculate_xp(), 80)
+
+    def test_rule_set_is_cached_until_a_change(self):
+        XPRule.objects.create(name="Base", xp_per_minute=1)
+        get_rule_set()
+        with self.assertNumQueries(0):
+            self.assertEqual(get_rule_set().score(self.running.pk, 20, None, 6), 20)
+
+        XPRule.objects.create(name="Inactive", xp_per_minute=100, is_active=False)
+        XPRule.objects.filter(name="Base").update(xp_per_minute=1)  # No signal, nothing changes
+        rule = XPRule.objects.create(name="Sport", category="Sport", bonus_xp=5)
+        self.assertEqual(get_rule_set().score(self.running.pk, 20, None, 6), 25)
+
+        # A new type of the category is picked up
+        swimming = ActivityType.objects.create(name="Swimming", category="Sport")
+        self.assertEqual(get_rule_set().score(swimming.pk, 20, None, 6), 25)
+        rule.delete()
+        self.assertEqual(get_rule_set().score(swimming.pk, 20, None, 6), 20)
+
+    def test_other_processes_compile_after_the_commit(self):
+        """Test that a rule saved elsewhere is picked up through the generation, once committed."""
+        XPRule.objects.create(name="Base", xp_per_minute=1)
+        get_rule_set()
+        generation = cache.get(RULE_SET.generation_key, 0)
+        with self.captureOnCommitCallbacks() as callbacks:
+            XPRule.objects.create(name="Sport", category="Sport", bonus_xp=5)
+        self.assertEqual(cache.get(RULE_SET.generation_key, 0), generation)
+
+        stale = RULE_SET._index = XPRuleSet.default()  # As compiled by another process before the save
+        self.assertIs(get_rule_set(), stale)
+        for callback in callbacks:
+            callback()
+        self.assertEqual(cache.get(RULE_SET.generation_key), generation + 1)
+        self.assertIs(get_rule_set(), stale)  # The generation is read every CHECK_INTERVAL
+        RULE_SET._checked_at -= CHECK_INTERVAL + 1
+        self.assertEqual(get_rule_set().score(self.running.pk, 20, None, 6), 25)
+
+    def test_bulk_creation_uses_rules(self):
+        """Test that a batch is scored like activities saved one by one."""
+        XPRule.objects.create(name="Base", xp_per_minute=3, xp_per_satisfaction=2)
+        XPRule.objects.create(name="Burn", min_calories=200, xp_per_calorie=0.25, activity_type=self.running)
+        activities = [
+            self.activity(self.running if index % 2 else self.reading, 10 + index, calories=100 * (index % 4) or None, satisfaction=1 + index % 10)
+            for index in range(40)
+        ]
+        expected = [activity.calculate_xp() for activity in activities]
+        created = ActivityService.create_many(self.character, activities)
+        self.assertEqual([activity.xp_earned for activity in created], expected)
@@ -0,0 +1,89 @@
+from django.test import SimpleTestCase
+from django.urls import reverse
+from rest_framework.test import APITestCase
+from gamify_backend.localindex import MAX_AGE
+from gamify_backend.search import EXACT, FUZZY, NAME_PREFIX, NAME_WORD, OTHER_WORD, SearchIndex, get_catalog, normalize
+from users.models import User
+from tracking.models import ActivityType
+
+
+def names(results):
+    return [row['name'] for row in results]
+
+
+class SearchIndexTest(SimpleTestCase):
+    def setUp(self):
+        self.index = SearchIndex([
+            {'id': 1, 'name': "Running", 'category': "Sport"},
+            {'id': 2, 'name': "Trail running", 'category': "Sport"},
+            {'id': 3, 'name': "Run", 'category': "Sport"},
+            {'id': 4, 'name': "Reading", 'category': "Loisirs"},
+            {'id': 5, 'name': "Écriture", 'category': "Créatif"},
+            {'id': 6, 'name': "Yoga", 'category': "Sport"},
+        ], fields=['name', 'category'])
+
+    def test_normalize(self):
+        self.assertEqual(normalize("  Épée  de-Fer! "), "epee de fer")
+
+    def test_ranking(self):
+        results = self.index.search("run")
+        self.assertEqual(names(results), ["Run", "Running", "Trail running"])
+        self.assertEqual([row['rank'] for row in results], [EXACT, NAME_PREFIX, NAME_WORD])
+
+    def test_other_fields_and_several_words(self):
+        self.assertEqual(names(self.index.search("sport yo")), ["Yoga"])
+        self.assertEqual(self.index.search("sport yo")[0]['rank'], OTHER_WORD)
+        self.assertEqual(names(self.index.search("trail run")), ["Trail running"])
+
+    def test_accents_and_typos(self):
+        self.assertEqual(names(self.index.search("ecri")), ["Écriture"])
+        results = self.index.search("runing")
+        self.assertEqual(results[0]['name'], "Running")
+        self.assertEqual(results[0]['rank'], FUZZY)
+
+    def test_limit_and_empty_query(self):
+        self.assertEqual(len(self.index.search("r", limit=2)), 2)
+        self.assertEqual(self.index.search("  "), [])
+
+
+class ActivityTypeAutocompleteTest(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="testuser", email="test@example.com", password="testpassword")
+        self.client.force_authenticate(user=self.user)
+        ActivityType.objects.create(name="Running", category="Sport")
+        ActivityType.objects.create(name="Reading", category="Loisirs")
+        self.url = reverse('autocomplete', kwargs={'catalog': 'activity-types'})
+
+    def test_autocomplete(self):
+        response = self.client.get(self.url, {'q': "rea"})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(names(response.data['results']), ["Reading"])
+        self.assertEqual(set(response.data['results'][0]), {'id', 'name', 'category', 'icon', 'rank'})
+
+    def test_no_query_per_lookup(self):
+        get_catalog('activity-types').search("run")
+        with self.assertNumQueries(0):
+            for text in ("r", "ru", "run", "runn"):
+                get_catalog('activity-types').search(text)
+
+    def test_index_follows_changes(self):
+        self.assertEqual(names(get_catalog('activity-types').search("swim")), [])
+        swimming = ActivityType.objects.create(name="Swimming", category="Sport")
+        self.assertEqual(names(get_catalog('activity-types').search("swim")), ["Swimming"])
+        swimming.delete()
+        self.assertEqual(names(get_catalog('activity-types').search("swim")), [])
+
+    def test_index_expires_without_a_shared_cache(self):
+        """Test that a change made by another process (no signal here) is seen after MAX_AGE."""
+        catalog = get_catalog('activity-types')
+        catalog.search("swim")
+        ActivityType.objects.bulk_create([ActivityType(name="Swimming", category="Sport")])
+        self.assertEqual(names(catalog.search("swim")), [])
+        catalog._built_at -= MAX_AGE + 1
+        self.assertEqual(names(catalog.search("swim")), ["Swimming"])
+
+    def test_invalid_requests(self):
+        self.assertEqual(self.client.get(reverse('autocomplete', kwargs={'catalog': 'unknown'}), {'q': "a"}).status_code, 404)
+        self.assertEqual(self.client.get(self.url, {'q': "a", 'limit': 500}).status_code, 400)
+        self.client.force_authenticate(user=None)
+        self.assertEqual(self.client.get(self.url, {'q': "a"}).status_code, 401)
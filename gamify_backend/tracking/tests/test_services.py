@@ -0,0 +1,124 @@
+from importlib import import_module
+
+from django.apps import apps
+from django.db import connection, transaction
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from users.models import Character
+from tracking.models import XPLedgerEntry
+from tracking.services import XPLedgerService
+from users.levels import get_level_curve
+from .fixtures import CharacterFixtureMixin
+
+
+class XPLedgerServiceTest(CharacterFixtureMixin, TestCase):
+    def log_activity(self, duration_minutes=20):
+        return super().log_activity(duration_minutes=duration_minutes, satisfaction=5)
+
+    def test_activity_is_recorded_once_in_ledger(self):
+        """Test that an activity grants its XP once (no more double counting)."""
+        with self.captureOnCommitCallbacks(execute=True):
+            activity = self.log_activity(duration_minutes=20)  # 100 XP
+        entry = XPLedgerEntry.objects.get()
+        self.assertEqual((entry.source_type, entry.source_id, entry.amount), ('activity', activity.pk, 100))
+        self.assertIsNotNone(entry.applied_at)
+        self.character.refresh_from_db()
+        self.assertEqual((self.character.level, self.character.current_xp, self.character.total_xp), (2, 0, 100))
+
+    def test_one_flush_per_transaction(self):
+        """Test that the activities of a transaction are folded by one flush, with one grant UPDATE."""
+        with self.captureOnCommitCallbacks() as callbacks:
+            with transaction.atomic():
+                for _ in range(10):
+                    self.log_activity(duration_minutes=10)  # 10 x 50 XP
+        self.assertEqual(len(callbacks), 1)
+        with CaptureQueriesContext(connection) as queries:
+            callbacks[0]()
+        self.assertEqual(len([query for query in queries if query['sql'].startswith('UPDATE "users_character"')]), 1)
+        self.character.refresh_from_db()
+        self.assertEqual(self.character.total_xp, 500)
+
+        # The next transaction registers its own
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            self.log_activity(duration_minutes=10)
+        self.assertEqual(len(callbacks), 1)
+        self.character.refresh_from_db()
+        self.assertEqual(self.character.total_xp, 550)
+
+    def test_idempotency_key(self):
+        """Test that the same source can only grant XP once."""
+        XPLedgerService.record(self.character.pk, 50, 'reward', 7)
+        XPLedgerService.record(self.character.pk, 50, 'reward', 7)
+        self.assertEqual(XPLedgerEntry.objects.count(), 1)
+
+    @override_settings(XP_LEDGER_FLUSH_ON_COMMIT=False)
+    def test_batched_flush(self):
+        """Test that pending entries are folded with one UPDATE per character."""
+        with self.captureOnCommitCallbacks() as callbacks:
+            for _ in range(10):
+                self.log_activity(duration_minutes=10)  # 10 x 50 XP
+        self.assertEqual(callbacks, [])
+        self.character.refresh_from_db()
+        self.assertEqual(self.character.total_xp, 0)
+
+        # Claim the entries, sum them, update the character
+        with self.assertNumQueries(6):  # savepoint + claim + sum + update + leaderboard scores + release
+            self.assertEqual(XPLedgerService.flush(), 1)
+        self.character.refresh_from_db()
+        self.assertEqual((self.character.level, self.character.current_xp, self.character.total_xp), (3, 200, 500))
+
+        # Nothing left to apply
+        self.assertEqual(XPLedgerService.flush(), 0)
+
+    @override_settings(XP_LEDGER_FLUSH_ON_COMMIT=False)
+    def test_net_negative_flush(self):
+        """Test that entries summing below 0 take XP back (floored at 0) and lower the level."""
+        XPLedgerService.record(self.character.pk, 650, 'fight', 1)
+        XPLedgerService.flush()
+        XPLedgerService.record(self.character.pk, -400, 'adjustment', 1)
+        XPLedgerService.record(self.character.pk, 50, 'reward', 1)
+        self.assertEqual(XPLedgerService.flush(), 1)
+        self.character.refresh_from_db()
+        self.assertEqual((self.character.level, self.character.current_xp, self.character.total_xp), (3, 0, 300))
+
+        XPLedgerService.record(self.character.pk, -1000, 'adjustment', 2)
+        XPLedgerService.flush()
+        self.character.refresh_from_db()
+        self.assertEqual((self.character.level, self.character.current_xp, self.character.total_xp), (1, 0, 0))
+        self.assertFalse(XPLedgerEntry.objects.filter(applied_at__isnull=True).exists())
+
+    def test_entries_cannot_be_modified(self):
+        XPLedgerService.record(self.character.pk, 50, 'reward', 1)
+        entry = XPLedgerEntry.objects.get()
+        entry.amount = 5000
+        with self.assertRaises(ValueError):
+            entry.save()
+
+    @override_settings(XP_LEDGER_FLUSH_ON_COMMIT=False)
+    def test_rebuild_from_ledger(self):
+        """Test that the character totals can be rebuilt from the ledger."""
+        XPLedgerService.record(self.character.pk, 250, 'fight', 1)
+        XPLedgerService.record(self.character.pk, 100, 'adventure', 1)
+        Character.objects.filter(pk=self.character.pk).update(level=9, current_xp=3, total_xp=12)
+
+        XPLedgerService.rebuild()
+        self.character.refresh_from_db()
+        self.assertEqual((self.character.level, self.character.current_xp, self.character.total_xp), (3, 50, 350))
+        self.assertFalse(XPLedgerEntry.objects.filter(applied_at__isnull=True).exists())
+
+    @override_settings(XP_LEDGER_FLUSH_ON_COMMIT=False)
+    def test_rebuild_keeps_xp_earned_before_the_ledger(self):
+        """Test that the opening balances of the migration survive a rebuild."""
+        level, current_xp = get_level_curve().split(5000)
+        Character.objects.filter(pk=self.character.pk).update(level=level, current_xp=current_xp, total_xp=5000)
+        XPLedgerService.record(self.character.pk, 300, 'fight', 1)
+        XPLedgerService.flush()
+        XPLedgerService.record(self.character.pk, 200, 'fight', 2)  # Pending
+
+        import_module('tracking.migrations.0013_xp_opening_balances').record_opening_balances(apps, None)
+        self.assertEqual(XPLedgerEntry.objects.get(source_type='opening').amount, 5000)
+
+        XPLedgerService.rebuild()
+        self.character.refresh_from_db()
+        self.assertEqual(self.character.total_xp, 5500)
+        self.assertEqual((self.character.level, self.character.current_xp), get_level_curve().split(5500))
@@ -0,0 +1,124 @@
+from datetime import date, datetime, timedelta, timezone as dt_timezone
+
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APITestCase
+from users.models import User
+from tracking.models import Activity, CharacterStreak
+from tracking.services import ActivityService
+from tracking.streaks import StreakService
+from .fixtures import CharacterFixtureMixin
+
+
+def utc(year, month, day, hour=12):
+    return datetime(year, month, day, hour, 0, tzinfo=dt_timezone.utc)
+
+
+class StreakTestMixin(CharacterFixtureMixin):
+    def streak(self):
+        return CharacterStreak.objects.get(character=self.character)
+
+
+class StreakServiceTest(StreakTestMixin, TestCase):
+    def test_consecutive_days(self):
+        """Test that a streak grows by one per active day and restarts after a gap."""
+        for day in (1, 2, 2, 3, 5, 6):
+            self.log_activity(utc(2025, 3, day))
+        streak = self.streak()
+        self.assertEqual((streak.current_streak, streak.longest_streak, streak.last_active_date), (2, 3, date(2025, 3, 6)))
+        self.assertEqual(streak.current_on(date(2025, 3, 7)), 2)
+        self.assertEqual(streak.current_on(date(2025, 3, 8)), 0)
+
+    def test_logging_does_not_read_activities(self):
+        """Test that extending a streak only reads the streak row, not the activity history."""
+        self.log_activity(utc(2025, 3, 1))
+        with CaptureQueriesContext(connection) as queries:
+            self.log_activity(utc(2025, 3, 2))
+        selects = [query['sql'] for query in queries if query['sql'].startswith('SELECT')]
+        self.assertFalse([sql for sql in selects if 'FROM "tracking_activity"' in sql])
+        self.assertEqual(sum('FROM "tracking_characterstreak"' in sql for sql in selects), 1)
+        self.assertEqual(self.streak().current_streak, 2)
+
+    def test_day_boundaries_follow_time_zone(self):
+        """Test that 23:30 and 00:30 UTC are the same day in Los Angeles."""
+        self.user.time_zone = 'America/Los_Angeles'
+        self.user.save()
+        self.log_activity(utc(2025, 3, 1, hour=23))
+        self.log_activity(utc(2025, 3, 2, hour=0))
+        streak = self.streak()
+        self.assertEqual((streak.current_streak, streak.last_active_date), (1, date(2025, 3, 1)))
+
+    def test_time_zone_change_recomputes(self):
+        self.log_activity(utc(2025, 3, 1, hour=23))
+        self.log_activity(utc(2025, 3, 2, hour=1))
+        self.assertEqual(self.streak().current_streak, 2)
+        user = User.objects.get(pk=self.user.pk)
+        user.time_zone = 'America/New_York'
+        with self.captureOnCommitCallbacks(execute=True):
+            user.save()
+        self.assertEqual((self.streak().current_streak, self.streak().last_active_date), (1, date(2025, 3, 1)))
+
+    def test_invalid_time_zone(self):
+        self.user.time_zone = 'Mars/Olympus_Mons'
+        with self.assertRaises(Exception):
+            self.user.save()
+
+    def test_backdated_activity_joins_streaks(self):
+        """Test that an activity filling a past gap joins the two streaks."""
+        for day in (1, 2, 4, 5):
+            self.log_activity(utc(2025, 3, day))
+        self.assertEqual(self.streak().longest_streak, 2)
+        self.log_activity(utc(2025, 3, 3))
+        streak = self.streak()
+        self.assertEqual((streak.current_streak, streak.longest_streak, streak.last_active_date), (5, 5, date(2025, 3, 5)))
+
+    def test_deletion_breaks_streak(self):
+        activities = [self.log_activity(utc(2025, 3, day)) for day in (1, 2, 3)]
+        with self.captureOnCommitCallbacks(execute=True):
+            activities[1].delete()
+        streak = self.streak()
+        self.assertEqual((streak.current_streak, streak.longest_streak), (1, 1))
+
+    def test_bulk_import_matches_recompute(self):
+        activities = [
+            Activity(activity_type=self.running, duration_minutes=10, satisfaction=5, created_at=utc(2025, 1, 1) + timedelta(days=offset))
+            for offset in (9, 0, 1, 2, 5, 6, 7, 8, 2, 20)
+        ]
+        ActivityService.create_many(self.character, activities)
+        streak = self.streak()
+        imported = (streak.current_streak, streak.longest_streak, streak.last_active_date)
+        self.assertEqual(imported, (1, 5, date(2025, 1, 21)))
+
+        CharacterStreak.objects.all().delete()
+        self.assertEqual(StreakService.recompute(), 1)
+        streak = self.streak()
+        self.assertEqual((streak.current_streak, streak.longest_streak, streak.last_active_date), imported)
+
+
+class CharacterStreakViewTest(StreakTestMixin, APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.client.force_authenticate(user=self.user)
+        self.url = reverse('character-streak', kwargs={'character_pk': self.character.pk})
+
+    def test_streak_without_activity(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual((response.data['current_streak'], response.data['longest_streak']), (0, 0))
+
+    def test_streak_read_in_one_query(self):
+        now = timezone.now()
+        self.log_activity(now - timedelta(days=1))
+        self.log_activity(now)
+        with self.assertNumQueries(1):
+            response = self.client.get(self.url)
+        self.assertEqual(response.data['current_streak'], 2)
+        self.assertEqual(response.data['time_zone'], 'UTC')
+
+    def test_other_user_character(self):
+        stranger = User.objects.create_user(username="stranger", email="stranger@example.com", password="testpassword")
+        self.client.force_authenticate(user=stranger)
+        self.assertEqual(self.client.get(self.url).status_code, 404)
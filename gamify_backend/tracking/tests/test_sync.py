@@ -0,0 +1,104 @@
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APITestCase
+from users.models import User, Character
+from tracking.archive import ActivityArchiver
+from tracking.models import Activity, XPLedgerEntry
+from .fixtures import CharacterFixtureMixin
+
+
+class ActivitySyncViewTest(CharacterFixtureMixin, APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.client.force_authenticate(user=self.user)
+        self.url = reverse('activity-sync', kwargs={'character_pk': self.character.pk})
+
+    def item(self, client_id, duration_minutes=20, **extra):
+        return {
+            'client_id': client_id,
+            'activity_type': self.running.pk,
+            'duration_minutes': duration_minutes,
+            'satisfaction': 7,
+            'created_at': '2025-03-01T08:00:00Z',
+            **extra,
+        }
+
+    def sync(self, items):
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            response = self.client.post(self.url, {'activities': items}, format='json')
+        self.flushes = len(callbacks)
+        return response
+
+    def test_batch_is_created_and_rewarded_once(self):
+        """Test that a batch inserts every activity and folds its XP in a single flush."""
+        response = self.sync([self.item(f"offline-{index}") for index in range(30)])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual((response.data['created'], response.data['duplicates'], response.data['invalid']), (30, 0, 0))
+        self.assertEqual(self.flushes, 1)
+        self.character.refresh_from_db()
+        self.assertEqual(self.character.total_xp, 30 * 100)
+        self.assertEqual(Activity.objects.get(client_id="offline-3").pk, response.data['results'][3]['id'])
+
+    def test_retry_does_not_duplicate(self):
+        """Test that a retried batch reports duplicates and grants no XP again."""
+        first = self.sync([self.item("a"), self.item("b")])
+        retry = self.sync([self.item("a"), self.item("b"), self.item("c")])
+        self.assertEqual([result['status'] for result in retry.data['results']], ['duplicate', 'duplicate', 'created'])
+        self.assertEqual(retry.data['results'][0]['id'], first.data['results'][0]['id'])
+        self.assertEqual(Activity.objects.count(), 3)
+        self.assertEqual(XPLedgerEntry.objects.count(), 3)
+        self.character.refresh_from_db()
+        self.assertEqual(self.character.total_xp, sum(XPLedgerEntry.objects.values_list('amount', flat=True)))
+
+        self.sync([self.item("a")])
+        self.assertEqual(self.flushes, 0)
+
+    def test_replay_after_archival(self):
+        """Test that an activity moved to the archive is still a duplicate, rewarded once."""
+        first = self.sync([self.item("a")])
+        ActivityArchiver(days=1).run()
+        retry = self.sync([self.item("a"), self.item("b")])
+        self.assertEqual([result['status'] for result in retry.data['results']], ['duplicate', 'created'])
+        self.assertEqual(retry.data['results'][0]['id'], first.data['results'][0]['id'])
+        self.assertEqual(XPLedgerEntry.objects.count(), 2)
+
+    def test_repeated_and_invalid_items(self):
+        response = self.sync([
+            self.item("a"),
+            self.item("a"),
+            self.item("b", satisfaction=11),
+            self.item("c", activity_type=999),
+            {'duration_minutes': 5},
+        ])
+        statuses = [result['status'] for result in response.data['results']]
+        self.assertEqual(statuses, ['created', 'duplicate', 'invalid', 'invalid', 'invalid'])
+        self.assertEqual(response.data['results'][0]['id'], response.data['results'][1]['id'])
+        self.assertIn('satisfaction', response.data['results'][2]['errors'])
+        self.assertIn('activity_type', response.data['results'][3]['errors'])
+        self.assertEqual(Activity.objects.count(), 1)
+
+    def test_same_client_id_on_two_characters(self):
+        other = Character.objects.create(user=self.user, name="Twin", race=self.race, character_class=self.character_class)
+        self.sync([self.item("a")])
+        response = self.client.post(reverse('activity-sync', kwargs={'character_pk': other.pk}), {'activities': [self.item("a")]}, format='json')
+        self.assertEqual(response.data['created'], 1)
+
+    def test_query_count_does_not_depend_on_batch_size(self):
+        self.sync([self.item("warm-up")])
+        with CaptureQueriesContext(connection) as small:
+            self.client.post(self.url, {'activities': [self.item(f"s{index}") for index in range(2)]}, format='json')
+        with CaptureQueriesContext(connection) as large:
+            self.client.post(self.url, {'activities': [self.item(f"l{index}") for index in range(200)]}, format='json')
+        # No query per item; SQLite only splits the bulk INSERTs in a few statements (999 parameters max)
+        self.assertLessEqual(len(large), len(small) + 4)
+
+    def test_batch_limits(self):
+        self.assertEqual(self.client.post(self.url, {'activities': []}, format='json').status_code, 400)
+        response = self.client.post(self.url, {'activities': [self.item(str(index)) for index in range(501)]}, format='json')
+        self.assertEqual(response.status_code, 400)
+
+    def test_other_user_character(self):
+        stranger = User.objects.create_user(username="stranger", email="stranger@example.com", password="testpassword")
+        self.client.force_authenticate(user=stranger)
+        self.assertEqual(self.client.post(self.url, {'activities': [self.item("a")]}, format='json').status_code, 404)
@@ -0,0 +1,19 @@
+from django.urls import path, re_path
+from .views import ActivityImportView, ActivityExportView, ActivitySyncView, DailyStatsView, WeeklyStatsView, MonthlyStatsView, ActivityHistoryView, ActivityNoteSearchView, CharacterStreakView, LeaderboardView
+
+urlpatterns = [
+    path('characters/<int:character_pk>/activities/import/', ActivityImportView.as_view(), name='activity-import'),
+    path('characters/<int:character_pk>/activities/sync/', ActivitySyncView.as_view(), name='activity-sync'),
+    # The format is part of the path: ?format= is DRF's renderer override
+    re_path(r'^characters/(?P<character_pk>[0-9]+)/activities/export\.(?P<file_type>csv|ndjson)$', ActivityExportView.as_view(), name='activity-export'),
+    path('activities/search/', ActivityNoteSearchView.as_view(), name='activity-search'),
+    path('characters/<int:character_pk>/stats/daily/', DailyStatsView.as_view(), name='stats-daily'),
+    path('characters/<int:character_pk>/stats/weekly/', WeeklyStatsView.as_view(), name='stats-weekly'),
+    path('characters/<int:character_pk>/stats/monthly/', MonthlyStatsView.as_view(), name='stats-monthly'),
+    path('characters/<int:character_pk>/stats/history/', ActivityHistoryView.as_view(), name='stats-history'),
+    path('characters/<int:character_pk>/streak/', CharacterStreakView.as_view(), name='character-streak'),
+    path('leaderboards/global/', LeaderboardView.as_view(), {'scope': 'global'}, name='leaderboard-global'),
+    path('leaderboards/classes/<int:key>/', LeaderboardView.as_view(), {'scope': 'class'}, name='leaderboard-class'),
+    path('leaderboards/races/<int:key>/', LeaderboardView.as_view(), {'scope': 'race'}, name='leaderboard-race'),
+    path('leaderboards/weekly/', LeaderboardView.as_view(), {'scope': 'weekly'}, name='leaderboard-weekly'),
+]
@@ -1,3 +1,298 @@
-from django.shortcuts import render
+from datetime import timedelta
 
-# Create your views here.
+from django.db import transaction
+from django.http import Http404, StreamingHttpResponse
+from django.shortcuts import get_object_or_404
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+from rest_framework import generics, permissions, status
+from rest_framework.exceptions import ValidationError
+from rest_framework.parsers import MultiPartParser
+from rest_framework.response import Response
+from gamify_backend.views import FullTextSearchView
+from users.authentication import get_active_character_id
+from users.models import Character
+from .archive import monthly_history
+from .leaderboards import TOP_SIZE, get_leaderboard
+from .exporters import EXPORT_TYPES, export_activities
+from .services import ActivityService, XPLedgerService
+from .importers import ActivityImporter, ActivityImportError, guess_file_type
+from .models import Activity, ActivityType, DailyActivityRollup, WeeklyActivityRollup, MonthlyActivityTypeRollup, CharacterStreak
+from .serializers import (
+    ActivityImportSerializer,
+    ActivitySyncItemSerializer,
+    ActivitySyncSerializer,
+    CharacterStreakSerializer,
+    DailyActivityRollupSerializer,
+    WeeklyActivityRollupSerializer,
+    MonthlyActivityTypeRollupSerializer,
+    MonthlyActivityArchiveSerializer,
+)
+
+def get_query_date(request, name, default):
+    value = request.query_params.get(name)
+    if value is None:
+        return default
+    day = parse_date(value)
+    if day is None:
+        raise ValidationError({name: "Expected a date (YYYY-MM-DD)."})
+    return day
+
+
+class ActivityImportView(generics.GenericAPIView):
+    """Upload an export of a fitness app (CSV, JSON, NDJSON or GPX) to backfill activities."""
+    serializer_class = ActivityImportSerializer
+    permission_classes = [permissions.IsAuthenticated]
+    parser_classes = [MultiPartParser]
+
+    def post(self, request, character_pk):
+        # Only the characters of the authenticated user
+        character = get_object_or_404(Character, pk=character_pk, user_id=request.user.pk)
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        upload = serializer.validated_data['file']
+        file_type = serializer.validated_data.get('file_type') or guess_file_type(upload.name)
+        if file_type is None:
+            raise ValidationError({'file_type': "Cannot guess the file type from the file name, please give it."})
+
+        importer = ActivityImporter(character, create_missing_types=serializer.validated_data['create_missing_types'])
+        try:
+            result = importer.run(upload, file_type)
+        except ActivityImportError as error:
+            raise ValidationError({'file': str(error)})
+        return Response({
+            'created': result.created,
+            'skipped': result.skipped,
+            'errors': [{'row': row, 'message': message} for row, message in result.errors],
+        }, status=status.HTTP_201_CREATED)
+
+
+class ActivityExportView(generics.GenericAPIView):
+    """
+    Download the whole activity history of a character as CSV or NDJSON. The
+    file is streamed while the rows are read (see tracking.exporters).
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    def perform_content_negotiation(self, request, force=False):
+        # The file is not rendered by DRF: "Accept: text/csv" must not be a 406
+        return super().perform_content_negotiation(request, force=True)
+
+    def get(self, request, character_pk, file_type):
+        character = get_object_or_404(Character.objects.only('pk', 'slug'), pk=character_pk, user_id=request.user.pk)
+        response = StreamingHttpResponse(export_activities(character.pk, file_type), content_type=EXPORT_TYPES[file_type])
+        response['Content-Disposition'] = f'attachment; filename="{character.slug}-activities.{file_type}"'
+        response['Cache-Control'] = 'private, no-store'
+        return response
+
+
+class ActivitySyncView(generics.GenericAPIView):
+    """
+    Offline sync of the desktop client: many activities at once, each with a
+    client_id. Retrying a batch is safe: the activities already stored are
+    reported as duplicates and neither stored nor rewarded again. The XP of the
+    new ones reaches the character with a single flush.
+    Returns one result per item, in order: created, duplicate or invalid.
+    """
+    serializer_class = ActivitySyncSerializer
+    permission_classes = [permissions.IsAuthenticated]
+
+    def post(self, request, character_pk):
+        character = get_object_or_404(Character, pk=character_pk, user_id=request.user.pk)
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        context = {'activity_type_ids': set(ActivityType.objects.values_list('pk', flat=True))}
+        results, pending = [], {}
+        for item in serializer.validated_data['activities']:
+            item_serializer = ActivitySyncItemSerializer(data=item, context=context)
+            if not item_serializer.is_valid():
+                results.append({'client_id': item.get('client_id'), 'status': 'invalid', 'errors': item_serializer.errors})
+                continue
+            data = item_serializer.validated_data
+            results.append({'client_id': data['client_id']})
+            if data['client_id'] not in pending:  # Repeated in the batch: stored once
+                pending[data['client_id']] = Activity(
+                    activity_type_id=data['activity_type'],
+                    duration_minutes=data['duration_minutes'],
+                    calories=data.get('calories'),
+                    satisfaction=data['satisfaction'],
+                    notes=data.get('notes') or None,
+                    created_at=data.get('created_at') or timezone.now(),
+                    client_id=data['client_id'],
+                )
+
+        with transaction.atomic():
+            created, stored = ActivityService.create_missing(character, list(pending.values()))
+            if created:
+                XPLedgerService.schedule_flush([character.pk])
+
+        created_ids = {activity.client_id: activity.pk for activity in created}
+        for result in results:
+            if 'status' in result:
+                continue
+            if result['client_id'] in created_ids:
+                result.update(status='created', id=created_ids.pop(result['client_id']))
+            else:
+                result.update(status='duplicate', id=stored.get(result['client_id']) or pending[result['client_id']].pk)
+        statuses = [result['status'] for result in results]
+        return Response({
+            'created': statuses.count('created'),
+            'duplicates': statuses.count('duplicate'),
+            'invalid': statuses.count('invalid'),
+            'results': results,
+        })
+
+
+class ActivityStatsView(generics.ListAPIView):
+    """
+    Activity totals of a character read from the rollup tables, one row per
+    period between ?from= and ?to= (ISO dates, the last `default_days` days by
+    default): the cost depends on the periods shown, not on the activities logged.
+    The periods are those of the server time zone (see tracking.rollups), and
+    the period containing ?from= is included.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+    pagination_class = None  # Bounded by max_days
+    model = None
+    period_field = None
+    default_days = 30
+    max_days = 366
+
+    def get_date(self, name, default):
+        return get_query_date(self.request, name, default)
+
+    def period_start(self, day):
+        """First day of the period containing `day`."""
+        return day
+
+    def get_queryset(self):
+        if not Character.objects.filter(pk=self.kwargs['character_pk'], user_id=self.request.user.pk).exists():
+            raise Http404
+        end = self.get_date('to', timezone.localdate())
+        start = self.get_date('from', end - timedelta(days=self.default_days - 1))
+        if start > end or (end - start).days >= self.max_days:
+            raise ValidationError({'from': f"The period must be between 1 and {self.max_days} days."})
+        return self.model.objects.filter(
+            character_id=self.kwargs['character_pk'],
+            **{f'{self.period_field}__range': (self.period_start(start), end)},
+        )
+
+
+class DailyStatsView(ActivityStatsView):
+    model = DailyActivityRollup
+    period_field = 'day'
+    serializer_class = DailyActivityRollupSerializer
+
+
+class WeeklyStatsView(ActivityStatsView):
+    model = WeeklyActivityRollup
+    period_field = 'week_start'
+    serializer_class = WeeklyActivityRollupSerializer
+    default_days = 12 * 7
+
+    def period_start(self, day):
+        return day - timedelta(days=day.weekday())
+
+
+class MonthlyStatsView(ActivityStatsView):
+    model = MonthlyActivityTypeRollup
+    period_field = 'month'
+    serializer_class = MonthlyActivityTypeRollupSerializer
+    default_days = 365
+    max_days = 3 * 366
+
+    def period_start(self, day):
+        return day.replace(day=1)
+
+    def get_queryset(self):
+        return super().get_queryset().select_related('activity_type')
+
+
+class ActivityHistoryView(generics.ListAPIView):
+    """
+    Whole history of a character, one row per month: the archived months come
+    from their summary rows, the recent ones from the live activities.
+    """
+    serializer_class = MonthlyActivityArchiveSerializer
+    permission_classes = [permissions.IsAuthenticated]
+    pagination_class = None  # One row per month
+
+    def get_queryset(self):
+        if not Character.objects.filter(pk=self.kwargs['character_pk'], user_id=self.request.user.pk).exists():
+            raise Http404
+        return monthly_history(self.kwargs['character_pk'])
+
+
+class ActivityNoteSearchView(FullTextSearchView):
+    """
+    Search in the notes of the user's activities, ?character= to search one of
+    their characters only. The archived activities are not searched.
+    """
+    fulltext_index = 'activity-notes'
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get_queryset(self):
+        queryset = Activity.objects.filter(character__user_id=self.request.user.pk)
+        character_pk = self.request.query_params.get('character')
+        if character_pk is not None:
+            if not character_pk.isdigit():
+                raise ValidationError({'character': "Expected a character id."})
+            queryset = queryset.filter(character_id=character_pk)
+        return queryset
+
+
+class CharacterStreakView(generics.RetrieveAPIView):
+    """Streak of a character: one query on the character, its user and its streak row."""
+    serializer_class = CharacterStreakSerializer
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get_object(self):
+        character = (
+            Character.objects.select_related('user', 'streak')
+            .filter(pk=self.kwargs['character_pk'], user_id=self.request.user.pk)
+            .first()
+        )
+        if character is None:
+            raise Http404
+        try:
+            return character.streak
+        except CharacterStreak.DoesNotExist:
+            return CharacterStreak(character=character)  # No activity yet
+
+
+class LeaderboardView(generics.GenericAPIView):
+    """
+    Top-N of a leaderboard (cached, see tracking.leaderboards) and the rank of
+    ?character= (one of the user's characters, the active one by default).
+    """
+    permission_classes = [permissions.IsAuthenticated]
+    pagination_class = None
+
+    def get_board_key(self):
+        if self.kwargs['scope'] != 'weekly':
+            return self.kwargs.get('key')
+        day = get_query_date(self.request, 'week', timezone.localdate())
+        return day - timedelta(days=day.weekday())
+
+    def get_limit(self):
+        try:
+            return max(1, min(int(self.request.query_params.get('limit', TOP_SIZE)), TOP_SIZE))
+        except ValueError:
+            raise ValidationError({'limit': "Expected a number."})
+
+    def get(self, request, scope, key=None):
+        board = get_leaderboard(scope, self.get_board_key())
+        character_id = request.query_params.get('character')
+        if character_id is not None:
+            if not character_id.isdigit() or not Character.objects.filter(pk=character_id, user_id=request.user.pk).exists():
+                raise Http404
+            character_id = int(character_id)
+        else:
+            character_id = get_active_character_id(request)
+        return Response({
+            'scope': scope,
+            'key': board.key,
+            'entries': board.top(self.get_limit()),
+            'me': board.rank(character_id) if character_id else None,
+        })
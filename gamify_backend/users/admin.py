@@ -2,7 +2,7 @@ from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin
 from django.urls import reverse
 from django.utils.html import format_html
-from .models import User, Race, CharacterClass, Character
+from .models import User, Race, CharacterClass, Character, LevelThreshold
 
 class CustomUserAdmin(admin.ModelAdmin):
     list_display = ('username', 'email', 'date_joined', 'is_active', 'is_staff', 'character_count', 'characters_link', 'slug')
@@ -43,3 +43,9 @@ admin.site.register(User, CustomUserAdmin)
 admin.site.register(Race)
 admin.site.register(CharacterClass)
 
+
+@admin.register(LevelThreshold)
+class LevelThresholdAdmin(admin.ModelAdmin):
+    list_display = ('level', 'xp_required')
+    ordering = ('level',)
+
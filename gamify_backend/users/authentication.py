@@ -0,0 +1,49 @@
+"""
+JWT authentication for the API.
+
+The access token carries the user id, is_staff and the active character id,
+so most endpoints authenticate without any query (no session read, no user
+fetch): request.user is a GamifyTokenUser built from the claims. Views that
+need the full User row (/users/me/) use JWTAuthentication instead.
+
+    POST /auth/token/          {username, password} -> {access, refresh}
+    POST /auth/token/refresh/  {refresh} -> {access, refresh} (rotated, the old one is blacklisted)
+    POST /auth/logout/         {refresh} -> blacklists the refresh token
+"""
+from rest_framework_simplejwt.authentication import JWTStatelessUserAuthentication
+from rest_framework_simplejwt.models import TokenUser
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
+
+ACTIVE_CHARACTER_CLAIM = 'active_character_id'
+
+
+class GamifyTokenUser(TokenUser):
+    """Stateless user: same id type as User.pk, and the active character from the token."""
+
+    @property
+    def id(self):
+        return int(super().id)
+
+    @property
+    def active_character_id(self):
+        return self.token.get(ACTIVE_CHARACTER_CLAIM)
+
+
+class StatelessJWTAuthentication(JWTStatelessUserAuthentication):
+    """Default authentication: the user comes from the token claims, not from the database."""
+
+
+class GamifyTokenObtainPairSerializer(TokenObtainPairSerializer):
+    @classmethod
+    def get_token(cls, user):
+        token = super().get_token(user)
+        token['is_staff'] = user.is_staff
+        token[ACTIVE_CHARACTER_CLAIM] = user.active_character_id
+        return token
+
+
+def get_active_character_id(request):
+    """Active character of the authenticated user, read from the token when there is one."""
+    if request.auth is not None and hasattr(request.auth, 'get'):
+        return request.auth.get(ACTIVE_CHARACTER_CLAIM)
+    return getattr(request.user, 'active_character_id', None)
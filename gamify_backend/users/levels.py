@@ -0,0 +1,255 @@
+"""
+Level curves: conversion between cumulated XP and character levels.
+
+A curve tells how much XP is needed to reach each level (counted from level 1
+with 0 XP). Every place that levels a character up (Character.save(),
+CharacterService and the batch jobs) goes through the active curve, chosen with
+the LEVEL_CURVE setting:
+
+    LEVEL_CURVE = 'linear'                          # level L costs L * 100 XP
+    LEVEL_CURVE = {'name': 'quadratic', 'base': 50} # level L costs L² * 50 XP
+    LEVEL_CURVE = 'table'                           # thresholds from the LevelThreshold table
+
+The curve is built once per process, and built again when the setting changes
+or, after the commit of a LevelThreshold change, when the other processes see
+its new generation, read at most every LOCAL_INDEX_CHECK_INTERVAL seconds (see
+gamify_backend.localindex; the generation needs a shared cache).
+"""
+from bisect import bisect_right
+from math import isqrt
+
+import numpy as np
+from django.conf import settings
+from django.db.models import Case, F, FloatField, IntegerField, Value, When
+from django.db.models.functions import Cast, Floor, Sqrt
+from django.db.models.lookups import Exact, GreaterThanOrEqual
+
+from gamify_backend.localindex import CHECK_INTERVAL, LocalIndex
+
+
+class LevelCurve:
+    """
+    Base curve, driven by a table of thresholds: thresholds[i] is the cumulated XP
+    needed to reach level i + 1 (so thresholds[0] is always 0).
+    Lookups are O(log n) with bisect, and O(log n) per row with NumPy.
+    """
+    name = None
+
+    def __init__(self, thresholds):
+        if not thresholds or thresholds[0] != 0:
+            raise ValueError("The first threshold (level 1) must be 0 XP.")
+        if any(later <= earlier for earlier, later in zip(thresholds, thresholds[1:])):
+            raise ValueError("Level thresholds must be strictly increasing.")
+        self.thresholds = list(thresholds)
+        self._thresholds_array = np.asarray(self.thresholds, dtype=np.int64)
+
+    @property
+    def max_level(self):
+        return len(self.thresholds)
+
+    def xp_to_reach(self, level):
+        """Cumulated XP needed to reach `level`."""
+        return self.thresholds[min(level, self.max_level) - 1]
+
+    def xp_for_next_level(self, level):
+        """XP needed to go from `level` to `level + 1` (0 at the max level)."""
+        if level >= self.max_level:
+            return 0
+        return self.xp_to_reach(level + 1) - self.xp_to_reach(level)
+
+    def level_for_xp(self, cumulated_xp):
+        """Level reached with `cumulated_xp` XP."""
+        return bisect_right(self.thresholds, cumulated_xp)
+
+    def split(self, cumulated_xp):
+        """Return (level, XP inside that level) for `cumulated_xp` XP."""
+        level = self.level_for_xp(cumulated_xp)
+        return level, cumulated_xp - self.xp_to_reach(level)
+
+    def normalize(self, level, current_xp):
+        """Apply the level-ups (or downs) owed by a (level, current_xp) pair."""
+        return self.split(self.xp_to_reach(level) + current_xp)
+
+    # NumPy variants, for recomputing many characters at once
+
+    def levels_for_xp_array(self, cumulated_xp):
+        return np.searchsorted(self._thresholds_array, np.asarray(cumulated_xp, dtype=np.int64), side='right')
+
+    def xp_to_reach_array(self, levels):
+        levels = np.minimum(np.asarray(levels, dtype=np.int64), self.max_level)
+        return self._thresholds_array[levels - 1]
+
+    def split_array(self, cumulated_xp):
+        cumulated_xp = np.asarray(cumulated_xp, dtype=np.int64)
+        levels = self.levels_for_xp_array(cumulated_xp)
+        return levels, cumulated_xp - self.xp_to_reach_array(levels)
+
+    # Database expressions, so that level-ups can be applied in an UPDATE
+
+    def level_expression(self, cumulated_xp):
+        """Level reached with `cumulated_xp` XP (an expression)."""
+        return Case(
+            *[When(GreaterThanOrEqual(cumulated_xp, xp), then=Value(lvl))
+              for lvl, xp in reversed(list(enumerate(self.thresholds, start=1)))],
+            default=Value(1),
+            output_field=IntegerField(),
+        )
+
+    def remainder_expression(self, cumulated_xp):
+        """XP left inside the level reached with `cumulated_xp` XP (an expression)."""
+        return Case(
+            *[When(GreaterThanOrEqual(cumulated_xp, xp), then=cumulated_xp - Value(xp))
+              for xp in reversed(self.thresholds)],
+            default=cumulated_xp,
+            output_field=IntegerField(),
+        )
+
+    def grant_expressions(self, xp_amount):
+        """
+        Return (level, current_xp) expressions adding `xp_amount` XP to a character row.
+        One branch per current level, each one only testing the levels that the
+        grant can reach from there, so the statement stays small for usual grants.
+        """
+        level_whens, xp_whens = [], []
+        for level, level_xp in enumerate(self.thresholds, start=1):
+            cumulated = Value(level_xp) + F('current_xp') + xp_amount
+            # current_xp is below the cost of the level, so the grant cannot go past this bound
+            highest = self.level_for_xp((self.thresholds[level] if level < self.max_level else level_xp) + xp_amount)
+            reached = [(lvl, self.thresholds[lvl - 1]) for lvl in range(level + 1, highest + 1)]
+            level_whens.append(When(Exact(F('level'), level), then=Case(
+                *[When(GreaterThanOrEqual(cumulated, xp), then=Value(lvl)) for lvl, xp in reversed(reached)],
+                default=Value(level),
+            )))
+            xp_whens.append(When(Exact(F('level'), level), then=Case(
+                *[When(GreaterThanOrEqual(cumulated, xp), then=cumulated - Value(xp)) for lvl, xp in reversed(reached)],
+                default=F('current_xp') + xp_amount,
+            )))
+        # Past the last level: keep the level, cumulate the XP
+        level = Case(*level_whens, default=F('level'), output_field=IntegerField())
+        current_xp = Case(*xp_whens, default=F('current_xp') + xp_amount, output_field=IntegerField())
+        return level, current_xp
+
+
+class LinearCurve(LevelCurve):
+    """Level L costs L * step XP (the historical rule, with step = 100). Closed form, no level cap."""
+    name = 'linear'
+
+    def __init__(self, step=100):
+        if step <= 0:
+            raise ValueError("The step must be positive.")
+        self.step = step
+
+    @property
+    def max_level(self):
+        return None
+
+    def xp_to_reach(self, level):
+        return self.step * level * (level - 1) // 2
+
+    def xp_for_next_level(self, level):
+        return self.step * level
+
+    def level_for_xp(self, cumulated_xp):
+        # Largest L with step * L * (L - 1) / 2 <= xp, i.e. L * (L - 1) <= 2 * xp // step
+        return (1 + isqrt(1 + 4 * (2 * cumulated_xp // self.step))) // 2
+
+    def levels_for_xp_array(self, cumulated_xp):
+        cumulated_xp = np.asarray(cumulated_xp, dtype=np.int64)
+        levels = np.floor((1 + np.sqrt(1 + 8 * cumulated_xp / self.step)) / 2).astype(np.int64)
+        # Fix the float rounding around exact thresholds
+        levels -= self.xp_to_reach_array(levels) > cumulated_xp
+        levels += self.xp_to_reach_array(levels + 1) <= cumulated_xp
+        return levels
+
+    def xp_to_reach_array(self, levels):
+        levels = np.asarray(levels, dtype=np.int64)
+        return self.step * levels * (levels - 1) // 2
+
+    def xp_to_reach_expression(self, level):
+        return self.step * level * (level - 1) / 2
+
+    def level_expression(self, cumulated_xp):
+        return Cast(
+            Floor((1 + Sqrt(1 + 8 * Cast(cumulated_xp, FloatField()) / self.step)) / 2),
+            IntegerField(),
+        )
+
+    def remainder_expression(self, cumulated_xp):
+        return cumulated_xp - self.xp_to_reach_expression(self.level_expression(cumulated_xp))
+
+    def grant_expressions(self, xp_amount):
+        # Closed form, only evaluated when the grant reaches the next level
+        cumulated = self.xp_to_reach_expression(F('level')) + F('current_xp') + Value(xp_amount)
+        levels_up = GreaterThanOrEqual(F('current_xp') + xp_amount, self.step * F('level'))
+        level = Case(When(levels_up, then=self.level_expression(cumulated)), default=F('level'))
+        current_xp = Case(
+            When(levels_up, then=self.remainder_expression(cumulated)),
+            default=F('current_xp') + xp_amount,
+        )
+        return level, current_xp
+
+
+class QuadraticCurve(LevelCurve):
+    """Level L costs L² * base XP. Thresholds are precomputed up to `max_level`."""
+    name = 'quadratic'
+
+    def __init__(self, base=100, max_level=200):
+        if base <= 0:
+            raise ValueError("The base must be positive.")
+        self.base = base
+        # Sum of base * k² for k < L
+        super().__init__([base * (level - 1) * level * (2 * level - 1) // 6 for level in range(1, max_level + 1)])
+
+
+class TableCurve(LevelCurve):
+    """Thresholds stored in the LevelThreshold table, so designers can tune each level."""
+    name = 'table'
+
+    @classmethod
+    def from_db(cls):
+        from users.models import LevelThreshold
+
+        thresholds = list(LevelThreshold.objects.order_by('level').values_list('xp_required', flat=True))
+        if not thresholds:
+            # Nothing configured yet: keep the historical progression
+            return LinearCurve()
+        return cls(thresholds)
+
+
+CURVES = {
+    'linear': LinearCurve,
+    'quadratic': QuadraticCurve,
+    'table': TableCurve.from_db,
+}
+
+
+class ActiveCurve(LocalIndex):
+    def build(self):
+        config = getattr(settings, 'LEVEL_CURVE', 'linear')
+        if isinstance(config, str):
+            config = {'name': config}
+        options = dict(config)
+        name = options.pop('name')
+        if name not in CURVES:
+            raise ValueError(f"Unknown level curve: {name}")
+        return CURVES[name](**options)
+
+
+# Read on every XP grant and serialized character: no cache read per call, no periodic rebuild
+ACTIVE_CURVE = ActiveCurve('users:level-curve:generation', max_age=None, check_interval=CHECK_INTERVAL)
+
+
+def register_curve(name, factory):
+    """Make a custom curve available to the LEVEL_CURVE setting."""
+    CURVES[name] = factory
+    reset_level_curve()
+
+
+def get_level_curve():
+    """Return the curve selected by the LEVEL_CURVE setting (built once per process, then cached)."""
+    return ACTIVE_CURVE.index()
+
+
+def reset_level_curve():
+    """Build the curve again (the setting or the LevelThreshold table changed), in every process after the commit."""
+    ACTIVE_CURVE.changed()
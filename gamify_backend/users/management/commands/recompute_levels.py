@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from users.levels import get_level_curve
+from users.services import CharacterService
+
+
+class Command(BaseCommand):
+    help = "Recompute every character's level and current XP from its total XP with the active level curve."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=2000, help="Characters loaded per batch.")
+
+    def handle(self, *args, **options):
+        curve = get_level_curve()
+        updated = CharacterService.recompute_levels(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f"{updated} character(s) updated with the '{curve.name}' curve."))
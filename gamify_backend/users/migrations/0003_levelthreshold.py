@@ -0,0 +1,27 @@
+# Generated by Django 5.2.7 on 2026-10-16 20:33
+
+import django.core.validators
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0002_alter_user_groups_alter_user_user_permissions'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LevelThreshold',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('level', models.IntegerField(unique=True, validators=[django.core.validators.MinValueValidator(1)], verbose_name='Level')),
+                ('xp_required', models.IntegerField(validators=[django.core.validators.MinValueValidator(0)], verbose_name='Cumulated XP required to reach the level')),
+            ],
+            options={
+                'verbose_name': 'Level threshold',
+                'verbose_name_plural': 'Level thresholds',
+                'ordering': ['level'],
+            },
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.7 on 2026-10-16 20:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0003_levelthreshold'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='character',
+            index=models.Index(fields=['user', '-created_at', '-id'], name='users_chara_user_id_2c1481_idx'),
+        ),
+    ]
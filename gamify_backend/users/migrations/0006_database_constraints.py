@@ -0,0 +1,51 @@
+# Generated by Django 5.2.7 on 2026-10-16 21:10
+
+from django.db import migrations, models
+
+
+def number_character_slots(apps, schema_editor):
+    Character = apps.get_model('users', 'Character')
+    characters = []
+    slots = {}
+    for character in Character.objects.order_by('created_at', 'pk').only('pk', 'user_id'):
+        slots[character.user_id] = slots.get(character.user_id, 0) + 1
+        character.slot = slots[character.user_id]
+        characters.append(character)
+    Character.objects.bulk_update(characters, ['slot'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0005_user_active_character'),
+    ]
+
+    operations = [
+        migrations.AlterUniqueTogether(
+            name='character',
+            unique_together=set(),
+        ),
+        migrations.AddField(
+            model_name='character',
+            name='slot',
+            field=models.PositiveSmallIntegerField(default=1, editable=False, verbose_name='Character slot'),
+            preserve_default=False,
+        ),
+        migrations.RunPython(number_character_slots, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='character',
+            constraint=models.UniqueConstraint(fields=('user', 'name'), name='character_unique_name_per_user'),
+        ),
+        migrations.AddConstraint(
+            model_name='character',
+            constraint=models.UniqueConstraint(fields=('user', 'slot'), name='character_unique_slot_per_user'),
+        ),
+        migrations.AddConstraint(
+            model_name='character',
+            constraint=models.CheckConstraint(condition=models.Q(('slot__gte', 1), ('slot__lte', 3)), name='character_slot_range'),
+        ),
+        migrations.AddConstraint(
+            model_name='user',
+            constraint=models.UniqueConstraint(fields=('email',), name='user_unique_email'),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.7 on 2026-10-16 21:02
+
+import users.models
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0006_database_constraints'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='time_zone',
+            field=models.CharField(default='UTC', max_length=64, validators=[users.models.validate_time_zone], verbose_name='Time zone'),
+        ),
+    ]
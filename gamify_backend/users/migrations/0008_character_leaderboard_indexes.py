@@ -0,0 +1,25 @@
+# Generated by Django 5.2.7 on 2026-10-16 21:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0007_user_time_zone'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='character',
+            index=models.Index(fields=['-total_xp', 'id'], name='character_total_xp_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='character',
+            index=models.Index(fields=['character_class', '-total_xp', 'id'], name='character_class_xp_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='character',
+            index=models.Index(fields=['race', '-total_xp', 'id'], name='character_race_xp_idx'),
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 5.2.7 on 2026-10-17 09:30
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0008_character_leaderboard_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='characterclass',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, default=django.utils.timezone.now, verbose_name='Last update'),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='race',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, default=django.utils.timezone.now, verbose_name='Last update'),
+            preserve_default=False,
+        ),
+    ]
@@ -1,11 +1,28 @@
-from django.db import models
-from django.utils.text import slugify
+from functools import lru_cache
+from zoneinfo import ZoneInfo, available_timezones
+
+from django.db import IntegrityError, models
 from django.contrib.auth.models import AbstractUser
 from django.core.exceptions import ValidationError
 from django.core.validators import MinValueValidator
 
+from gamify_backend.integrity import save_with_constraint_messages, violated_constraint
+from .levels import get_level_curve
+from .slugs import save_with_unique_slug
+
 # Create your models here.
 
+MAX_CHARACTERS_PER_USER = 3
+
+@lru_cache(maxsize=None)
+def time_zone_names():
+    # available_timezones() scans the tz database on each call
+    return frozenset(available_timezones())
+
+def validate_time_zone(value):
+    if value not in time_zone_names():
+        raise ValidationError(f"Unknown time zone: {value}")
+
 class User(AbstractUser):
     """
     Utilisateur de l'application (extension Django User)
@@ -36,32 +53,65 @@ class User(AbstractUser):
         help_text='Specific permissions for this user.',
     )
     slug = models.SlugField(max_length=100, unique=True, blank=True)
+    # Copied in the access token claims (see users/authentication.py)
+    active_character = models.ForeignKey(
+        'Character',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='+',
+        verbose_name="Active character",
+    )
+    # Day boundaries of the streaks (IANA name, e.g. "Europe/Paris")
+    time_zone = models.CharField(max_length=64, default='UTC', validators=[validate_time_zone], verbose_name="Time zone")
     created_at = models.DateTimeField(auto_now_add=True, verbose_name="Creation date")
     updated_at = models.DateTimeField(auto_now=True, verbose_name="Last update")
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Stored time zone, to detect a change on save (see tracking.signals)
+        instance._loaded_time_zone = instance.__dict__.get('time_zone')
+        return instance
+
+    @property
+    def zone(self):
+        return ZoneInfo(self.time_zone)
+
     def clean(self):
         super().clean()
         if not self.username:
             raise ValidationError("Username is mandatory.")
         if not self.email or not "@" in self.email:
             raise ValidationError("Email is mandatory and must be valid.")
-        if User.objects.filter(email=self.email).exclude(pk=self.pk).exists():
-            raise ValidationError("This email is already in use.")
+        # Unique email and username: checked by the database (see save)
 
     def can_create_character(self):
         """Verify if the user can create another character (max 3)."""
-        return self.characters.count() < 3
+        return self.characters.count() < MAX_CHARACTERS_PER_USER
 
     class Meta:
         verbose_name = "User"
         verbose_name_plural = "Users"
         ordering = ['-created_at']
+        constraints = [
+            models.UniqueConstraint(fields=['email'], name='user_unique_email'),
+        ]
+
+    def constraint_messages(self):
+        return {
+            'username': lambda: {'username': "A user with that username already exists."},
+            'user_unique_email': lambda: "This email is already in use.",
+        }
 
     def save(self, *args, **kwargs):
-        if not self.slug:
-            self.slug = slugify(self.username)
-        self.full_clean()
-        super().save(*args, **kwargs)
+        self.full_clean(exclude=['slug'], validate_unique=False, validate_constraints=False)
+        messages = self.constraint_messages()
+        save = lambda: save_with_constraint_messages(self, lambda: super(User, self).save(*args, **kwargs), messages)
+        if self.slug:
+            save()
+        else:
+            save_with_unique_slug(self, self.username, save)
 
     def __str__(self):
         return self.username
@@ -72,6 +122,7 @@ class Race(models.Model):
     name = models.CharField(max_length=50, unique=True, verbose_name="Race name")
     description = models.TextField(verbose_name="Race lore")
     created_at = models.DateTimeField(auto_now_add=True, verbose_name="Creation date")
+    updated_at = models.DateTimeField(auto_now=True, verbose_name="Last update")
 
     class Meta:
         verbose_name = "Race"
@@ -88,6 +139,7 @@ class CharacterClass(models.Model):
     description = models.TextField(verbose_name="Class description")
     primary_attribute = models.CharField(max_length=50, verbose_name="Primary attribute (Strength, Agility, Intelligence...)")
     created_at = models.DateTimeField(auto_now_add=True, verbose_name="Creation date")
+    updated_at = models.DateTimeField(auto_now=True, verbose_name="Last update")
 
     class Meta:
         verbose_name = "Character Class"
@@ -97,6 +149,20 @@ class CharacterClass(models.Model):
     def __str__(self):
         return self.name
 
+#########
+class LevelThreshold(models.Model):
+    """Cumulated XP required to reach a level, used when LEVEL_CURVE = 'table'."""
+    level = models.IntegerField(unique=True, validators=[MinValueValidator(1)], verbose_name="Level")
+    xp_required = models.IntegerField(validators=[MinValueValidator(0)], verbose_name="Cumulated XP required to reach the level")
+
+    class Meta:
+        verbose_name = "Level threshold"
+        verbose_name_plural = "Level thresholds"
+        ordering = ['level']
+
+    def __str__(self):
+        return f"Niv.{self.level} : {self.xp_required} XP"
+
 #########
 class Character(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE, verbose_name="User related to character", related_name='characters')
@@ -113,11 +179,23 @@ class Character(models.Model):
     created_at = models.DateTimeField(auto_now_add=True, verbose_name="Creation date")
     updated_at = models.DateTimeField(auto_now=True, verbose_name="Last update")
     is_active = models.BooleanField(default=True, verbose_name="Character currently selected")
-
+    # One slot per character: the database limits a user to MAX_CHARACTERS_PER_USER characters
+    slot = models.PositiveSmallIntegerField(editable=False, verbose_name="Character slot")
 
     class Meta:
-        unique_together = [['user', 'name']]
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['user', '-created_at', '-id']),
+            # Leaderboards (tracking.leaderboards): top-N by total XP, globally, per class and per race
+            models.Index(fields=['-total_xp', 'id'], name='character_total_xp_idx'),
+            models.Index(fields=['character_class', '-total_xp', 'id'], name='character_class_xp_idx'),
+            models.Index(fields=['race', '-total_xp', 'id'], name='character_race_xp_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'name'], name='character_unique_name_per_user'),
+            models.UniqueConstraint(fields=['user', 'slot'], name='character_unique_slot_per_user'),
+            models.CheckConstraint(condition=models.Q(slot__gte=1, slot__lte=MAX_CHARACTERS_PER_USER), name='character_slot_range'),
+        ]
         verbose_name = "Character"
         verbose_name_plural = "Characters"
 
@@ -130,20 +208,23 @@ class Character(models.Model):
                 'name': 'Character name is mandatory.'
             })
         
-        # verify unicity per user
-        existing = Character.objects.filter(
-            user=self.user,
-            name=self.name
-        ).exclude(pk=self.pk).exists()
-        
-        if existing:
-            raise ValidationError({
-                'name': f'You already have a character named "{self.name}"'
-            })
-        
-        existing_characters = Character.objects.filter(user=self.user).count()
-        if not self.pk and existing_characters >= 3:
-            raise ValidationError("A user cannot have more than 3 characters.")
+        # Unique name per user and max 3 characters: checked by the database (see save)
+
+    def constraint_messages(self):
+        too_many = lambda: f"A user cannot have more than {MAX_CHARACTERS_PER_USER} characters."
+        return {
+            'character_unique_name_per_user': lambda: {'name': f'You already have a character named "{self.name}"'},
+            'character_unique_slot_per_user': too_many,
+            'character_slot_range': too_many,
+        }
+
+    def allocate_slot(self):
+        """First free slot of the user (one query)."""
+        taken = set(Character.objects.filter(user_id=self.user_id).values_list('slot', flat=True))
+        free = [slot for slot in range(1, MAX_CHARACTERS_PER_USER + 1) if slot not in taken]
+        if not free:
+            raise ValidationError(self.constraint_messages()['character_slot_range']())
+        return free[0]
 
     def __str__(self):
         return f"{self.name} (Niv.{self.level})"
@@ -151,7 +232,7 @@ class Character(models.Model):
     @property
     def xp_for_next_level(self):
         """XP required for next level"""
-        return self.level * 100
+        return get_level_curve().xp_for_next_level(self.level)
 
     @property
     def xp_multiplier(self):
@@ -163,36 +244,43 @@ class Character(models.Model):
         self.save()
     
     def save(self, *args, **kwargs):
-        self.full_clean()
+        self.full_clean(exclude=['slug', 'slot'], validate_unique=False, validate_constraints=False)
+        allocated = self.slot is None
+        if allocated:
+            self.slot = self.allocate_slot()
 
-        if self.pk:
-            old_char = Character.objects.get(pk=self.pk)
-            self.total_xp = old_char.total_xp + (self.current_xp - old_char.current_xp)
+        old_char = Character.objects.filter(pk=self.pk).values('total_xp', 'current_xp', 'name').first() if self.pk else None
+        if old_char:
+            self.total_xp = old_char['total_xp'] + (self.current_xp - old_char['current_xp'])
         else:
             self.total_xp = self.current_xp
 
-        
-        while self.current_xp >= self.xp_for_next_level:
-            self.current_xp -= self.xp_for_next_level
-            self.level += 1
-
-        if self.pk:  # Si c'est une mise à jour
-            old_char = Character.objects.get(pk=self.pk)
-            if old_char.name != self.name:  # Si le nom a changé
-                self.slug = self._generate_unique_slug()
+        self.level, self.current_xp = get_level_curve().normalize(self.level, self.current_xp)
+
+        if old_char:  # Si c'est une mise à jour
+            new_slug = old_char['name'] != self.name  # Si le nom a changé
         else:  # Nouvelle création
-            if not self.slug:
-                self.slug = self._generate_unique_slug()
+            new_slug = not self.slug
 
-        super().save(*args, **kwargs)
+        messages = self.constraint_messages()
+        save_row = lambda: save_with_constraint_messages(self, lambda: super(Character, self).save(*args, **kwargs), messages)
 
-    def _generate_unique_slug(self):
-        """Make a unique slug based on the character's name."""
-        base_slug = slugify(self.name)
-        slug = base_slug
-        counter = 1
-        while Character.objects.filter(slug=slug).exclude(pk=self.pk).exists():
-            slug = f"{base_slug}-{counter}"
-            counter += 1
-        return slug
+        def save():
+            if not allocated:
+                return save_row()
+            try:
+                return save_with_constraint_messages(
+                    self, lambda: super(Character, self).save(*args, **kwargs),
+                    {name: message for name, message in messages.items() if name != 'character_unique_slot_per_user'},
+                )
+            except IntegrityError as error:
+                if violated_constraint(Character, error) != 'character_unique_slot_per_user':
+                    raise
+            # A concurrent create took the slot first: another one may still be free
+            self.slot = self.allocate_slot()
+            return save_row()
 
+        if new_slug:
+            save_with_unique_slug(self, self.name, save)
+        else:
+            save()
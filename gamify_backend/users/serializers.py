@@ -3,6 +3,7 @@ from .models import User, Race, CharacterClass, Character
 from django.contrib.auth import get_user_model
 from django.contrib.auth.password_validation import validate_password
 from django.core.exceptions import ValidationError
+from gamify_backend.serializers import ExpandableFieldsMixin
 
 class UserSerializer(serializers.ModelSerializer):
     password = serializers.CharField(write_only=True, required=True, validators=[validate_password])
@@ -11,7 +12,7 @@ class UserSerializer(serializers.ModelSerializer):
     class Meta:
         model = User
         fields = [
-            'id', 'username', 'email', 'password', 'first_name', 'last_name', 'is_staff', 'is_active', 'date_joined', 'created_at', 'updated_at'
+            'id', 'username', 'email', 'password', 'first_name', 'last_name', 'is_staff', 'is_active', 'date_joined', 'time_zone', 'created_at', 'updated_at'
         ]
         extra_kwargs = {
             'password': {'write_only': True},
@@ -62,7 +63,7 @@ class CharacterClassSerializer(serializers.ModelSerializer):
         fields = ['id', 'name', 'description', 'primary_attribute', 'created_at']
 
 
-class CharacterSerializer(serializers.ModelSerializer):
+class CharacterSerializer(ExpandableFieldsMixin, serializers.ModelSerializer):
     user = UserSerializer(read_only=True)
     slug = serializers.SlugField(read_only=True)
     race = RaceSerializer(read_only=True)
@@ -70,4 +71,18 @@ class CharacterSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Character
-        fields = ['id', 'user', 'name', 'slug', 'race', 'character_class', 'level', 'hp', 'mp', 'skill_points', 'current_xp', 'total_xp', 'created_at', 'updated_at', 'is_active']
\ No newline at end of file
+        fields = ['id', 'user', 'name', 'slug', 'race', 'character_class', 'level', 'hp', 'mp', 'skill_points', 'current_xp', 'total_xp', 'created_at', 'updated_at', 'is_active']
+        # Nested by default, rendered as ids when left out of ?expand=
+        expandable_fields = ['user', 'race', 'character_class']
+        select_related_fields = ['user', 'race', 'character_class']
+
+class ActiveCharacterSerializer(serializers.Serializer):
+    character = serializers.PrimaryKeyRelatedField(queryset=Character.objects.all(), allow_null=True)
+    # Refresh token to revoke: the new pair carries the new active character
+    refresh = serializers.CharField(write_only=True, required=False)
+
+    def validate_character(self, value):
+        """Validate that the character belongs to the authenticated user."""
+        if value is not None and value.user_id != self.context['request'].user.pk:
+            raise serializers.ValidationError("This character doesn't belong to you.")
+        return value
@@ -1,16 +1,92 @@
+import numpy as np
 from django.db.models.signals import post_save
 from django.db import transaction
+from django.db.models import F, Value
+from django.db.models.functions import Greatest
+from django.utils import timezone
+from users.levels import get_level_curve
 from users.models import Character
 
 class CharacterService:
     @staticmethod
     def update_character_level(character, xp_amount):
         """Logique métier : ajouter XP et gérer level-up."""
-        character.current_xp += int(xp_amount * character.xp_multiplier)
-        
-        while character.current_xp >= character.xp_for_next_level:
-            character.current_xp -= character.xp_for_next_level
-            character.level += 1
-        
-        character.save()
-        return character
\ No newline at end of file
+        CharacterService.grant_xp(character.pk, int(xp_amount * character.xp_multiplier))
+        character.refresh_from_db(fields=['level', 'current_xp', 'total_xp', 'updated_at'])
+        return character
+
+    @staticmethod
+    def grant_xp(character_id, xp_amount):
+        """
+        Add XP to a character with a single conditional UPDATE (no read beforehand).
+        XP, total XP and level-ups are computed by the database from the row's own
+        values, so concurrent grants on the same character never lose XP.
+        Return the number of updated rows (0 if the character does not exist).
+        """
+        xp_amount = int(xp_amount)
+        if xp_amount < 0:
+            raise ValueError("XP amount must be positive.")
+        if xp_amount == 0:
+            return 0
+
+        level, current_xp = get_level_curve().grant_expressions(xp_amount)
+        return Character.objects.filter(pk=character_id).update(
+            level=level,
+            current_xp=current_xp,
+            total_xp=F('total_xp') + xp_amount,
+            updated_at=timezone.now(),
+        )
+
+    @staticmethod
+    def remove_xp(character_id, xp_amount):
+        """
+        Take XP back from a character (a reversed or lowered grant) with a single
+        UPDATE: total_xp is floored at 0, level and current_xp are computed again
+        from it with the active level curve.
+        Return the number of updated rows (0 if the character does not exist).
+        """
+        xp_amount = int(xp_amount)
+        if xp_amount < 0:
+            raise ValueError("XP amount must be positive.")
+        if xp_amount == 0:
+            return 0
+
+        curve = get_level_curve()
+        total_xp = Greatest(F('total_xp') - xp_amount, Value(0))
+        return Character.objects.filter(pk=character_id).update(
+            level=curve.level_expression(total_xp),
+            current_xp=curve.remainder_expression(total_xp),
+            total_xp=total_xp,
+            updated_at=timezone.now(),
+        )
+
+    @staticmethod
+    def recompute_levels(queryset=None, batch_size=2000):
+        """
+        Batch job: recompute level and current_xp of many characters from their
+        total_xp with the active level curve (after a curve change for instance).
+        Only the characters whose values change are written.
+        Return the number of updated characters.
+        """
+        curve = get_level_curve()
+        if queryset is None:
+            queryset = Character.objects.all()
+        rows = queryset.order_by('pk').values_list('pk', 'level', 'current_xp', 'total_xp')
+
+        updated, last_pk = 0, 0
+        now = timezone.now()  # Changed characters get a new ETag
+        with transaction.atomic():
+            while True:
+                chunk = np.array(list(rows.filter(pk__gt=last_pk)[:batch_size]), dtype=np.int64).reshape(-1, 4)
+                if not len(chunk):
+                    break
+                last_pk = int(chunk[-1, 0])
+                levels, current_xp = curve.split_array(chunk[:, 3])
+                changed = (levels != chunk[:, 1]) | (current_xp != chunk[:, 2])
+                characters = [
+                    Character(pk=int(pk), level=int(level), current_xp=int(xp), updated_at=now)
+                    for pk, level, xp in zip(chunk[changed, 0], levels[changed], current_xp[changed])
+                ]
+                Character.objects.bulk_update(characters, ['level', 'current_xp', 'updated_at'])
+                updated += len(characters)
+        return updated
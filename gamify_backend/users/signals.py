@@ -1,6 +1,8 @@
-from django.db.models.signals import post_save
+from django.core.signals import setting_changed
+from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
-from .models import Character
+from .levels import reset_level_curve
+from .models import Character, LevelThreshold
 from .services import CharacterService
 
 @receiver(post_save, sender=Character)
@@ -8,4 +10,15 @@ def handle_character_save(sender, instance, created, **kwargs):
     """Signal : quand un Character est sauvegardé."""
     
     if created:
-        print(f"Nouveau personnage créé : {instance.name}")
\ No newline at end of file
+        print(f"Nouveau personnage créé : {instance.name}")
+
+@receiver([post_save, post_delete], sender=LevelThreshold)
+def reset_curve_on_threshold_change(sender, **kwargs):
+    """Signal : the table curve must be rebuilt when a threshold changes."""
+    reset_level_curve()
+
+
+@receiver(setting_changed)
+def reset_curve_on_setting_change(setting, **kwargs):
+    if setting == 'LEVEL_CURVE':
+        reset_level_curve()
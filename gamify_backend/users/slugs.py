@@ -0,0 +1,53 @@
+"""
+Unique slug allocation shared by User, Character and Adventure.
+
+The next free suffix is found with a single prefix query ("aragorn", "aragorn-1",
+"aragorn-2"... are fetched at once) instead of one query per candidate, and the
+save is retried with a fresh slug if a concurrent save took it in the meantime.
+"""
+import re
+
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+from django.utils.text import slugify
+
+from gamify_backend.integrity import violated_constraint
+
+SLUG_ATTEMPTS = 5
+
+
+def allocate_unique_slug(instance, value, field='slug'):
+    """Return a slug based on `value` that no other row of the model uses."""
+    model = type(instance)
+    max_length = model._meta.get_field(field).max_length
+    base_slug = slugify(value) or model._meta.model_name
+    # Keep room for a "-<number>" suffix
+    base_slug = base_slug[:max_length - 8].strip('-') or model._meta.model_name
+
+    taken = (
+        model._default_manager
+        .filter(Q(**{field: base_slug}) | Q(**{f'{field}__startswith': f'{base_slug}-'}))
+        .exclude(pk=instance.pk)
+        .values_list(field, flat=True)
+    )
+    suffix = re.compile(rf'^{re.escape(base_slug)}(?:-(\d+))?$')
+    numbers = [int(match.group(1) or 0) for match in map(suffix.match, taken) if match]
+    if not numbers:
+        return base_slug
+    return f"{base_slug}-{max(numbers) + 1}"
+
+
+def save_with_unique_slug(instance, value, save, field='slug'):
+    """
+    Allocate a unique slug for `instance` and call `save()`. If a concurrent
+    save took the same slug (IntegrityError on the unique slug column, see
+    gamify_backend.integrity), a new slug is allocated and the save is retried.
+    """
+    for attempt in range(SLUG_ATTEMPTS):
+        setattr(instance, field, allocate_unique_slug(instance, value, field))
+        try:
+            with transaction.atomic():
+                return save()
+        except IntegrityError as error:
+            if violated_constraint(type(instance), error) != field or attempt == SLUG_ATTEMPTS - 1:
+                raise
@@ -0,0 +1,91 @@
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APITestCase
+from rest_framework_simplejwt.tokens import AccessToken
+from users.models import User, Character, Race, CharacterClass
+
+
+class JWTAuthenticationTest(APITestCase):
+    def setUp(self):
+        self.race = Race.objects.create(name="Human", description="The most polyvalent race")
+        self.character_class = CharacterClass.objects.create(name="Warrior", description="Strong.", primary_attribute="Strength")
+        self.user = User.objects.create_user(username='player', email='player@example.com', password='testpass123')
+        self.character = Character.objects.create(user=self.user, name="Hero", race=self.race, character_class=self.character_class)
+        self.user.active_character = self.character
+        self.user.save()
+
+    def obtain_tokens(self, username='player', password='testpass123'):
+        response = self.client.post(reverse('token-obtain'), {'username': username, 'password': password})
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def test_token_claims(self):
+        """Test that the access token carries the user id, the staff flag and the active character."""
+        access = AccessToken(self.obtain_tokens()['access'])
+        self.assertEqual(access['user_id'], str(self.user.pk))
+        self.assertEqual(access['active_character_id'], self.character.pk)
+        self.assertFalse(access['is_staff'])
+
+    def test_no_session_or_user_lookup(self):
+        """Test that a character list with a token reads neither the session nor the user."""
+        access = self.obtain_tokens()['access']
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {access}')
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('character-list'), {'expand': ''})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['results'][0]['id'], self.character.pk)
+        tables = ' '.join(query['sql'] for query in queries)
+        self.assertNotIn('django_session', tables)
+        self.assertNotIn('"users_user"', tables)
+
+    def test_user_me_with_token(self):
+        access = self.obtain_tokens()['access']
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {access}')
+        response = self.client.get(reverse('user-detail'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['username'], 'player')
+
+    def test_refresh_rotation(self):
+        """Test that a refresh token can only be used once."""
+        tokens = self.obtain_tokens()
+        response = self.client.post(reverse('token-refresh'), {'refresh': tokens['refresh']})
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('refresh', response.data)
+        response = self.client.post(reverse('token-refresh'), {'refresh': tokens['refresh']})
+        self.assertEqual(response.status_code, 401)
+
+    def test_logout(self):
+        tokens = self.obtain_tokens()
+        response = self.client.post(reverse('token-logout'), {'refresh': tokens['refresh']})
+        self.assertEqual(response.status_code, 200)
+        response = self.client.post(reverse('token-refresh'), {'refresh': tokens['refresh']})
+        self.assertEqual(response.status_code, 401)
+
+    def test_switch_active_character(self):
+        """Test that switching character returns tokens with the new claim and revokes the old refresh."""
+        other = Character.objects.create(user=self.user, name="Mage", race=self.race, character_class=self.character_class)
+        tokens = self.obtain_tokens()
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {tokens['access']}")
+        response = self.client.put(reverse('active-character'), {'character': other.pk, 'refresh': tokens['refresh']})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(AccessToken(response.data['access'])['active_character_id'], other.pk)
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.active_character, other)
+        response = self.client.post(reverse('token-refresh'), {'refresh': tokens['refresh']})
+        self.assertEqual(response.status_code, 401)
+
+    def test_cannot_activate_someone_else_character(self):
+        stranger = User.objects.create_user(username='stranger', email='stranger@example.com', password='testpass123')
+        character = Character.objects.create(user=stranger, name="Thief", race=self.race, character_class=self.character_class)
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {self.obtain_tokens()['access']}")
+        response = self.client.put(reverse('active-character'), {'character': character.pk})
+        self.assertEqual(response.status_code, 400)
+
+    def test_deactivated_user_tokens_are_revoked(self):
+        tokens = self.obtain_tokens()
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {tokens['access']}")
+        self.assertEqual(self.client.delete(reverse('user-delete')).status_code, 204)
+        self.client.credentials()
+        response = self.client.post(reverse('token-refresh'), {'refresh': tokens['refresh']})
+        self.assertEqual(response.status_code, 401)
@@ -0,0 +1,145 @@
+from unittest import mock
+
+import numpy as np
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase, override_settings
+from gamify_backend.localindex import CHECK_INTERVAL
+from users.levels import ACTIVE_CURVE, LinearCurve, QuadraticCurve, LevelCurve, get_level_curve
+from users.models import User, Character, Race, CharacterClass, LevelThreshold
+from users.services import CharacterService
+
+
+def loop_split(cumulated_xp, xp_for_next_level):
+    """Reference implementation: the historical level-up loop."""
+    level = 1
+    while cumulated_xp >= xp_for_next_level(level):
+        cumulated_xp -= xp_for_next_level(level)
+        level += 1
+    return level, cumulated_xp
+
+
+class LevelCurveTest(SimpleTestCase):
+    def test_linear_curve_matches_level_up_loop(self):
+        """Test the closed form against the historical while-loop."""
+        curve = LinearCurve()
+        for xp in list(range(0, 5000, 7)) + [99, 100, 299, 300, 10 ** 6]:
+            self.assertEqual(curve.split(xp), loop_split(xp, lambda level: level * 100))
+
+    def test_quadratic_curve_matches_level_up_loop(self):
+        curve = QuadraticCurve(base=10)
+        for xp in range(0, 20000, 13):
+            self.assertEqual(curve.split(xp), loop_split(xp, lambda level: level * level * 10))
+
+    def test_table_curve(self):
+        curve = LevelCurve([0, 100, 250, 500])
+        self.assertEqual(curve.split(0), (1, 0))
+        self.assertEqual(curve.split(249), (2, 149))
+        self.assertEqual(curve.split(250), (3, 0))
+        self.assertEqual(curve.split(2000), (4, 1500))  # Max level reached
+        self.assertEqual(curve.xp_for_next_level(2), 150)
+
+    def test_invalid_thresholds(self):
+        with self.assertRaises(ValueError):
+            LevelCurve([10, 100])
+        with self.assertRaises(ValueError):
+            LevelCurve([0, 100, 100])
+
+    def test_numpy_variants_match_scalar_versions(self):
+        xp = np.arange(0, 200000, 37)
+        for curve in (LinearCurve(), LinearCurve(step=75), QuadraticCurve(base=20), LevelCurve([0, 100, 250, 500])):
+            levels, remainders = curve.split_array(xp)
+            expected = [curve.split(int(value)) for value in xp]
+            self.assertEqual(list(zip(levels.tolist(), remainders.tolist())), expected)
+
+    def test_normalize(self):
+        """Test that a (level, current_xp) pair gets its level-ups applied."""
+        self.assertEqual(LinearCurve().normalize(2, 550), (4, 50))
+
+
+class LevelCurveIntegrationTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="testuser", email="test@example.com", password="testpassword")
+        self.race = Race.objects.create(name="Human", description="Humans are versatile.")
+        self.character_class = CharacterClass.objects.create(
+            name="Warrior",
+            description="Warriors are strong and brave.",
+            primary_attribute="Strength"
+        )
+
+    def create_character(self, name, **kwargs):
+        return Character.objects.create(
+            user=self.user,
+            name=name,
+            race=self.race,
+            character_class=self.character_class,
+            **kwargs
+        )
+
+    @override_settings(LEVEL_CURVE={'name': 'quadratic', 'base': 10})
+    def test_grant_xp_uses_active_curve(self):
+        """Test that the UPDATE expressions follow the configured curve (10 + 40 + 90 = 140 XP for level 4)."""
+        character = self.create_character("Quadratic")
+        CharacterService.grant_xp(character.pk, 150)
+        character.refresh_from_db()
+        self.assertEqual((character.level, character.current_xp), (4, 10))
+
+    @override_settings(LEVEL_CURVE='table')
+    def test_table_curve_from_db(self):
+        LevelThreshold.objects.bulk_create([
+            LevelThreshold(level=1, xp_required=0),
+            LevelThreshold(level=2, xp_required=50),
+            LevelThreshold(level=3, xp_required=500),
+        ])
+        character = self.create_character("Table")
+        CharacterService.grant_xp(character.pk, 120)
+        character.refresh_from_db()
+        self.assertEqual((character.level, character.current_xp), (2, 70))
+
+        # Changing a threshold invalidates the cached curve
+        LevelThreshold.objects.filter(level=3).delete()
+        LevelThreshold.objects.create(level=3, xp_required=100)
+        self.assertEqual(get_level_curve().split(120), (3, 20))
+
+    @override_settings(LEVEL_CURVE='table')
+    def test_other_processes_rebuild_the_table_after_the_commit(self):
+        LevelThreshold.objects.bulk_create([
+            LevelThreshold(level=1, xp_required=0),
+            LevelThreshold(level=2, xp_required=50),
+        ])
+        get_level_curve()
+        generation = cache.get(ACTIVE_CURVE.generation_key, 0)
+        with self.captureOnCommitCallbacks() as callbacks:
+            LevelThreshold.objects.create(level=3, xp_required=100)
+        self.assertEqual(cache.get(ACTIVE_CURVE.generation_key, 0), generation)
+
+        stale = ACTIVE_CURVE._index = LinearCurve()  # As built by another process before the save
+        self.assertIs(get_level_curve(), stale)
+        for callback in callbacks:
+            callback()
+        self.assertEqual(cache.get(ACTIVE_CURVE.generation_key), generation + 1)
+        self.assertIs(get_level_curve(), stale)  # The generation is read every CHECK_INTERVAL
+        ACTIVE_CURVE._checked_at -= CHECK_INTERVAL + 1
+        self.assertEqual(get_level_curve().split(120), (3, 20))
+
+    def test_no_cache_read_per_lookup(self):
+        get_level_curve()
+        with mock.patch('gamify_backend.localindex.cache') as shared_cache, self.assertNumQueries(0):
+            for _ in range(100):
+                get_level_curve()
+        shared_cache.get.assert_not_called()
+
+    def test_model_save_uses_curve(self):
+        character = self.create_character("Saved", current_xp=650)
+        self.assertEqual((character.level, character.current_xp), (4, 50))
+        self.assertEqual(character.xp_for_next_level, 400)
+
+    def test_recompute_levels(self):
+        """Test the batch recompute from total_xp."""
+        first = self.create_character("First")
+        second = self.create_character("Second")
+        Character.objects.filter(pk=first.pk).update(total_xp=650)
+        Character.objects.filter(pk=second.pk).update(total_xp=50, current_xp=50)
+
+        self.assertEqual(CharacterService.recompute_levels(batch_size=1), 1)
+        first.refresh_from_db()
+        self.assertEqual((first.level, first.current_xp), (4, 50))
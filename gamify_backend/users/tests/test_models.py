@@ -1,4 +1,9 @@
+from unittest import mock
+
+from django.core.exceptions import ValidationError
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
 from users.models import User, Character, Race, CharacterClass
 from tracking.models import Activity, ActivityType
 
@@ -38,7 +43,8 @@ class CharacterXPTestCase(TestCase):
             duration_minutes=120,
             satisfaction=5,
         )
-        activity.save()  # Save activity (which add the xp to the character)
+        with self.captureOnCommitCallbacks(execute=True):  # XP is folded after the commit
+            activity.save()  # Save activity (which add the xp to the character)
 
         self.character.refresh_from_db()
 
@@ -54,4 +60,67 @@ class CharacterXPTestCase(TestCase):
 
         # Check of the slug updated well
         self.character.refresh_from_db()
-        self.assertEqual(self.character.slug, "newname")
\ No newline at end of file
+        self.assertEqual(self.character.slug, "newname")
+
+
+class DatabaseConstraintsTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="testuser", email="test@example.com", password="testpassword")
+        self.race = Race.objects.create(name="Human", description="Humans are versatile.")
+        self.character_class = CharacterClass.objects.create(
+            name="Warrior",
+            description="Warriors are strong and brave.",
+            primary_attribute="Strength"
+        )
+
+    def create_character(self, name):
+        return Character.objects.create(user=self.user, name=name, race=self.race, character_class=self.character_class)
+
+    def test_duplicate_character_name(self):
+        """Test that the unique name violation gives the same message as before."""
+        self.create_character("Conan")
+        with self.assertRaises(ValidationError) as context:
+            self.create_character("Conan")
+        self.assertEqual(context.exception.message_dict['name'], ['You already have a character named "Conan"'])
+
+    def test_max_three_characters(self):
+        """Test that the 3 characters limit is enforced with slots, and that a deleted character frees its slot."""
+        characters = [self.create_character(f"Hero {i}") for i in range(3)]
+        self.assertEqual([character.slot for character in characters], [1, 2, 3])
+        with self.assertRaisesMessage(ValidationError, "A user cannot have more than 3 characters."):
+            self.create_character("Hero 4")
+
+        characters[1].delete()
+        self.assertEqual(self.create_character("Hero 4").slot, 2)
+
+    def test_slot_taken_concurrently(self):
+        """Test that two saves with the same slot cannot both pass."""
+        self.create_character("Hero 1")
+        character = Character(user=self.user, name="Hero 2", race=self.race, character_class=self.character_class, slot=1)
+        with self.assertRaisesMessage(ValidationError, "A user cannot have more than 3 characters."):
+            character.save()
+
+    def test_allocated_slot_taken_concurrently(self):
+        """Test that a create losing its slot to a concurrent one takes the next free slot."""
+        self.create_character("Hero 1")
+        # The slot read before the concurrent create committed
+        with mock.patch.object(Character, 'allocate_slot', side_effect=[1, 2]):
+            character = self.create_character("Hero 2")
+        self.assertEqual(character.slot, 2)
+
+    def test_character_update_does_not_check_uniqueness_with_queries(self):
+        character = self.create_character("Conan")
+        character.hp = 10
+        with CaptureQueriesContext(connection) as queries:
+            character.save()
+        reads = [query['sql'] for query in queries if query['sql'].startswith('SELECT') and 'FROM "users_character"' in query['sql']]
+        self.assertEqual(len(reads), 1)  # Only the previous XP values
+
+    def test_duplicate_email(self):
+        with self.assertRaisesMessage(ValidationError, "This email is already in use."):
+            User.objects.create_user(username="other", email="test@example.com", password="testpassword")
+
+    def test_duplicate_username(self):
+        with self.assertRaises(ValidationError) as context:
+            User.objects.create_user(username="testuser", email="other@example.com", password="testpassword")
+        self.assertIn('username', context.exception.message_dict)
@@ -0,0 +1,102 @@
+import threading
+
+from django.db import connection
+from django.test import TestCase, TransactionTestCase
+from users.models import User, Character, Race, CharacterClass
+from users.services import CharacterService
+
+
+class GrantXPTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="testuser", email="test@example.com", password="testpassword")
+        self.race = Race.objects.create(name="Human", description="Humans are versatile.")
+        self.character_class = CharacterClass.objects.create(
+            name="Warrior",
+            description="Warriors are strong and brave.",
+            primary_attribute="Strength"
+        )
+        self.character = Character.objects.create(
+            user=self.user,
+            name="TestChar",
+            race=self.race,
+            character_class=self.character_class,
+        )
+
+    def test_grant_xp_without_level_up(self):
+        """Test a grant that stays below the next level."""
+        CharacterService.grant_xp(self.character.pk, 60)
+        self.character.refresh_from_db()
+        self.assertEqual(self.character.level, 1)
+        self.assertEqual(self.character.current_xp, 60)
+        self.assertEqual(self.character.total_xp, 60)
+
+    def test_grant_xp_with_several_level_ups(self):
+        """Test a big grant (100 + 200 + 300 = 600 XP to reach level 4, 50 XP remaining)."""
+        CharacterService.grant_xp(self.character.pk, 650)
+        self.character.refresh_from_db()
+        self.assertEqual(self.character.level, 4)
+        self.assertEqual(self.character.current_xp, 50)
+        self.assertEqual(self.character.total_xp, 650)
+
+    def test_grant_xp_matches_successive_grants(self):
+        """Test that one big grant and many small grants give the same character."""
+        for _ in range(13):
+            CharacterService.grant_xp(self.character.pk, 50)
+        self.character.refresh_from_db()
+        self.assertEqual((self.character.level, self.character.current_xp, self.character.total_xp), (4, 50, 650))
+
+    def test_grant_xp_is_a_single_query(self):
+        """Test that a grant does not read the character before updating it."""
+        with self.assertNumQueries(1):
+            CharacterService.grant_xp(self.character.pk, 1000)
+
+    def test_grant_xp_rejects_negative_amount(self):
+        with self.assertRaises(ValueError):
+            CharacterService.grant_xp(self.character.pk, -10)
+
+
+class GrantXPConcurrencyTest(TransactionTestCase):
+    def setUp(self):
+        user = User.objects.create_user(username="testuser", email="test@example.com", password="testpassword")
+        race = Race.objects.create(name="Human", description="Humans are versatile.")
+        character_class = CharacterClass.objects.create(
+            name="Warrior",
+            description="Warriors are strong and brave.",
+            primary_attribute="Strength"
+        )
+        self.character = Character.objects.create(
+            user=user,
+            name="TestChar",
+            race=race,
+            character_class=character_class,
+        )
+
+    def test_no_lost_updates_with_parallel_writers(self):
+        """Test that parallel grants on the same character are all applied."""
+        writers, grants_per_writer, xp_amount = 8, 25, 30
+        barrier = threading.Barrier(writers)
+        errors = []
+
+        def writer():
+            try:
+                barrier.wait()
+                for _ in range(grants_per_writer):
+                    CharacterService.grant_xp(self.character.pk, xp_amount)
+            except Exception as exc:  # pragma: no cover - reported below
+                errors.append(exc)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=writer) for _ in range(writers)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        self.character.refresh_from_db()
+        total = writers * grants_per_writer * xp_amount  # 6000 XP
+        self.assertEqual(self.character.total_xp, total)
+        # 6000 XP = 100 + 200 + ... + 1000 (5500 XP) to reach level 11, 500 XP remaining
+        self.assertEqual(self.character.level, 11)
+        self.assertEqual(self.character.current_xp, 500)
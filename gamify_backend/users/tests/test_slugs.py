@@ -0,0 +1,68 @@
+from unittest import mock
+
+from django.db import IntegrityError
+from django.test import TestCase
+from adventures.models import Adventure
+from users import slugs
+from users.models import User, Character, Race, CharacterClass
+
+
+class SlugAllocationTest(TestCase):
+    def setUp(self):
+        self.race = Race.objects.create(name="Human", description="Humans are versatile.")
+        self.character_class = CharacterClass.objects.create(
+            name="Ranger",
+            description="Rangers track and hunt.",
+            primary_attribute="Agility"
+        )
+
+    def create_character(self, name, username):
+        user = User.objects.create_user(username=username, email=f"{username}@example.com", password="testpassword")
+        return Character.objects.create(user=user, name=name, race=self.race, character_class=self.character_class)
+
+    def test_popular_name_gets_next_suffix(self):
+        """Test that characters sharing a name get increasing suffixes."""
+        slugs_created = [self.create_character("Aragorn", f"player{i}").slug for i in range(4)]
+        self.assertEqual(slugs_created, ["aragorn", "aragorn-1", "aragorn-2", "aragorn-3"])
+
+    def test_allocation_is_a_single_query(self):
+        """Test that the next free slug is found with one query, whatever the number of collisions."""
+        for i in range(6):
+            self.create_character("Aragorn", f"player{i}")
+        new_character = Character(name="Aragorn")
+        with self.assertNumQueries(1):
+            self.assertEqual(slugs.allocate_unique_slug(new_character, "Aragorn"), "aragorn-6")
+
+    def test_other_slugs_with_same_prefix_are_ignored(self):
+        self.create_character("Aragorn the Great", "player1")
+        self.assertEqual(self.create_character("Aragorn", "player2").slug, "aragorn")
+
+    def test_retry_when_slug_is_taken_concurrently(self):
+        """Test that the save is retried with a new slug after an IntegrityError on the slug."""
+        self.create_character("Aragorn", "player1")
+        user = User.objects.create_user(username="player2", email="player2@example.com", password="testpassword")
+        # The first allocation returns a slug that another save already took
+        with mock.patch.object(slugs, 'allocate_unique_slug', side_effect=["aragorn", "aragorn-1"]) as allocator:
+            character = Character.objects.create(user=user, name="Aragorn", race=self.race, character_class=self.character_class)
+        self.assertEqual(character.slug, "aragorn-1")
+        self.assertEqual(allocator.call_count, 2)
+
+    def test_other_integrity_errors_are_not_retried(self):
+        """Test that only a violation of the slug's unique index allocates a new slug."""
+        character = Character(name="Aragorn")
+        save = mock.Mock(side_effect=IntegrityError("CHECK constraint failed: slug_is_lowercase"))
+        with self.assertRaises(IntegrityError):
+            slugs.save_with_unique_slug(character, character.name, save)
+        self.assertEqual(save.call_count, 1)
+
+    def test_user_slug_collision(self):
+        """Test that usernames with the same slug get distinct slugs."""
+        first = User.objects.create_user(username="Bob", email="bob@example.com", password="testpassword")
+        second = User.objects.create_user(username="bob", email="bob2@example.com", password="testpassword")
+        self.assertEqual((first.slug, second.slug), ("bob", "bob-1"))
+
+    def test_adventure_slug_collision(self):
+        """Test that adventures with the same title get distinct slugs."""
+        first = Adventure.objects.create(title="The Lost Crystal", description="...", base_xp_reward=100, difficulty="easy")
+        second = Adventure.objects.create(title="The Lost Crystal", description="...", base_xp_reward=100, difficulty="easy")
+        self.assertEqual((first.slug, second.slug), ("the-lost-crystal", "the-lost-crystal-1"))
@@ -1,8 +1,14 @@
 # users/tests/test_views.py
+from datetime import timedelta
+from unittest import mock
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
+from django.utils import timezone
 from rest_framework.test import APITestCase, APIClient
-from django.contrib.auth.models import User
-from users.models import Character, Race, CharacterClass
+from users.models import User, Character, Race, CharacterClass
+from users.views import CharacterListView
 
 class UserDetailViewTest(APITestCase):
     def setUp(self):
@@ -90,3 +96,180 @@ class CharacterDetailViewTest(APITestCase):
     def test_delete_character(self):
         response = self.client.delete(self.url)
         self.assertEqual(response.status_code, 204)
+
+
+class CharacterListQueryCountTest(APITestCase):
+    def setUp(self):
+        self.race = Race.objects.create(name="Human", description="The most polyvalent race")
+        self.character_class = CharacterClass.objects.create(name="Warrior", description="Strong.", primary_attribute="Strength")
+        self.url = reverse('character-list')
+
+    def create_user_with_characters(self, username, count):
+        user = User.objects.create_user(username=username, email=f"{username}@example.com", password='testpass123')
+        for i in range(count):
+            Character.objects.create(user=user, name=f"Hero {i}", race=self.race, character_class=self.character_class)
+        return user
+
+    def count_list_queries(self, user, query=''):
+        self.client.force_authenticate(user=user)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.url + query)
+        self.assertEqual(response.status_code, 200)
+        return len(queries), response
+
+    def test_constant_query_count(self):
+        """Test that listing characters costs the same number of queries for 1 or 3 characters."""
+        few, _ = self.count_list_queries(self.create_user_with_characters('few', 1))
+        many, response = self.count_list_queries(self.create_user_with_characters('many', 3))
+        self.assertEqual(few, many)
+        self.assertEqual(few, 2)  # ETag validators + page
+        self.assertEqual(response.data['results'][0]['race']['name'], "Human")
+        self.assertEqual(response.data['results'][0]['user']['username'], "many")
+
+    def test_compact_representation(self):
+        """Test ?fields= and ?expand= (relations rendered as ids, no join)."""
+        user = self.create_user_with_characters('player', 2)
+        count, response = self.count_list_queries(user, '?fields=id,name,user,race&expand=')
+        self.assertEqual(count, 2)
+        self.assertEqual(set(response.data['results'][0]), {'id', 'name', 'user', 'race'})
+        self.assertEqual(response.data['results'][0]['user'], user.pk)
+        self.assertEqual(response.data['results'][0]['race'], self.race.pk)
+
+    def test_partial_expand(self):
+        user = self.create_user_with_characters('player', 1)
+        _, response = self.count_list_queries(user, '?expand=race')
+        self.assertEqual(response.data['results'][0]['race']['name'], "Human")
+        self.assertEqual(response.data['results'][0]['user'], user.pk)
+        self.assertEqual(response.data['results'][0]['character_class'], self.character_class.pk)
+
+
+class CharacterListPaginationTest(APITestCase):
+    def setUp(self):
+        race = Race.objects.create(name="Human", description="The most polyvalent race")
+        character_class = CharacterClass.objects.create(name="Warrior", description="Strong.", primary_attribute="Strength")
+        self.user = User.objects.create_user(username='player', email='player@example.com', password='testpass123')
+        for i in range(3):
+            Character.objects.create(user=self.user, name=f"Hero {i}", race=race, character_class=character_class)
+        # Same creation date for two characters: the id breaks the tie
+        Character.objects.filter(name__in=["Hero 0", "Hero 1"]).update(created_at=Character.objects.get(name="Hero 2").created_at)
+        self.client.force_authenticate(user=self.user)
+        self.url = reverse('character-list')
+
+    def test_walk_pages_forward_and_backward(self):
+        """Test that the cursors walk every character once, in both directions."""
+        first = self.client.get(self.url, {'page_size': 2})
+        self.assertEqual([c['name'] for c in first.data['results']], ["Hero 2", "Hero 1"])
+        self.assertIsNone(first.data['previous'])
+
+        second = self.client.get(first.data['next'])
+        self.assertEqual([c['name'] for c in second.data['results']], ["Hero 0"])
+        self.assertIsNone(second.data['next'])
+
+        back = self.client.get(second.data['previous'])
+        self.assertEqual([c['name'] for c in back.data['results']], ["Hero 2", "Hero 1"])
+
+    def test_page_query_cost_does_not_depend_on_depth(self):
+        """Test that a deep page is one keyset query (no OFFSET), after the ETag validators."""
+        first = self.client.get(self.url, {'page_size': 1})
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(first.data['next'])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(queries), 2)
+        self.assertNotIn('OFFSET', queries[-1]['sql'])
+
+    def test_max_page_size(self):
+        """Test that a page never holds more than max_page_size characters, whatever is asked."""
+        self.assertEqual(CharacterListView.pagination_class.max_page_size, 200)
+        with mock.patch.object(CharacterListView.pagination_class, 'max_page_size', 2):
+            response = self.client.get(self.url, {'page_size': 100000})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([c['name'] for c in response.data['results']], ["Hero 2", "Hero 1"])
+        self.assertIsNotNone(response.data['next'])
+
+    def test_invalid_cursor(self):
+        response = self.client.get(self.url, {'cursor': 'not-a-cursor'})
+        self.assertEqual(response.status_code, 404)
+
+
+class ConditionalRequestTest(APITestCase):
+    def setUp(self):
+        race = Race.objects.create(name="Human", description="The most polyvalent race")
+        character_class = CharacterClass.objects.create(name="Warrior", description="Strong.", primary_attribute="Strength")
+        self.user = User.objects.create_user(username='player', email='player@example.com', password='testpass123')
+        self.character = Character.objects.create(user=self.user, name="Hero", race=race, character_class=character_class)
+        self.client.force_authenticate(user=self.user)
+        self.detail_url = reverse('character-detail', kwargs={'pk': self.character.pk})
+
+    def test_not_modified(self):
+        """Test that an unchanged character is answered with a 304 and one query, without body."""
+        response = self.client.get(self.detail_url)
+        etag = response['ETag']
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.detail_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+        self.assertEqual(response.content, b'')
+        self.assertEqual(len(queries), 1)
+        self.assertNotIn('"name"', queries[0]['sql'])  # Only (id, updated_at) is read
+
+    def test_modified_since(self):
+        response = self.client.get(self.detail_url)
+        response = self.client.get(self.detail_url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified'])
+        self.assertEqual(response.status_code, 304)
+
+    def test_etag_changes_with_the_character(self):
+        etag = self.client.get(self.detail_url)['ETag']
+        self.character.name = "Renamed"
+        self.character.save()
+        response = self.client.get(self.detail_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_etag_changes_with_the_nested_relations(self):
+        """Test that an edit of the nested race, class or user is not answered with a 304."""
+        for related in (self.character.race, self.character.character_class, self.user):
+            etag = self.client.get(self.detail_url)['ETag']
+            list_etag = self.client.get(reverse('character-list'))['ETag']
+            related.save()
+            self.assertEqual(self.client.get(self.detail_url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+            self.assertEqual(self.client.get(reverse('character-list'), HTTP_IF_NONE_MATCH=list_etag).status_code, 200)
+
+    def test_etag_depends_on_representation(self):
+        full = self.client.get(self.detail_url)['ETag']
+        compact = self.client.get(self.detail_url, {'fields': 'id,name'})['ETag']
+        self.assertNotEqual(full, compact)
+
+    def test_stale_write_is_rejected(self):
+        """Test that a write with an outdated If-Match gets a 412 and changes nothing."""
+        etag = self.client.get(self.detail_url)['ETag']
+        Character.objects.filter(pk=self.character.pk).update(name="Changed elsewhere", updated_at=timezone.now() + timedelta(seconds=1))
+        response = self.client.patch(self.detail_url, {'name': "Mine"}, HTTP_IF_MATCH=etag)
+        self.assertEqual(response.status_code, 412)
+        self.character.refresh_from_db()
+        self.assertEqual(self.character.name, "Changed elsewhere")
+
+    def test_write_with_current_etag(self):
+        etag = self.client.get(self.detail_url)['ETag']
+        response = self.client.patch(self.detail_url, {'name': "Mine"}, HTTP_IF_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        # The response carries the validators of the new version
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual(self.client.get(self.detail_url, HTTP_IF_NONE_MATCH=response['ETag']).status_code, 304)
+
+    def test_list_not_modified(self):
+        url = reverse('character-list')
+        etag = self.client.get(url)['ETag']
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        self.character.delete()
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_user_me_not_modified(self):
+        url = reverse('user-detail')
+        etag = self.client.get(url)['ETag']
+        with self.assertNumQueries(0):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+    def test_missing_character(self):
+        response = self.client.get(reverse('character-detail', kwargs={'pk': 999}), HTTP_IF_NONE_MATCH='"x"')
+        self.assertEqual(response.status_code, 404)
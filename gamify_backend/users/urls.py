@@ -1,9 +1,14 @@
 from django.urls import path
-from .views import UserDetailView, UserDeleteView, CharacterListView, CharacterDetailView
+from rest_framework_simplejwt.views import TokenBlacklistView, TokenObtainPairView, TokenRefreshView
+from .views import UserDetailView, UserDeleteView, CharacterListView, CharacterDetailView, ActiveCharacterView
 
 urlpatterns = [
+    path('auth/token/', TokenObtainPairView.as_view(), name='token-obtain'),
+    path('auth/token/refresh/', TokenRefreshView.as_view(), name='token-refresh'),
+    path('auth/logout/', TokenBlacklistView.as_view(), name='token-logout'),
     path('users/me/', UserDetailView.as_view(), name='user-detail'),
     path('users/me/delete/', UserDeleteView.as_view(), name='user-delete'),
+    path('users/me/active-character/', ActiveCharacterView.as_view(), name='active-character'),
     path('characters/', CharacterListView.as_view(), name='character-list'),
     path('characters/<int:pk>/', CharacterDetailView.as_view(), name='character-detail'),
-]
\ No newline at end of file
+]
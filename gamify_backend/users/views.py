@@ -1,22 +1,36 @@
 from rest_framework import generics, permissions, status
+from rest_framework.authentication import SessionAuthentication
 from rest_framework.response import Response
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+from rest_framework_simplejwt.tokens import RefreshToken
 from django.contrib.auth import get_user_model
+from gamify_backend.views import ConditionalRequestMixin, QueryPlanMixin
+from .authentication import GamifyTokenObtainPairSerializer
 from .models import User, Character
-from .serializers import UserSerializer, CharacterSerializer
+from .serializers import UserSerializer, CharacterSerializer, ActiveCharacterSerializer
 
 User = get_user_model()
 
-class UserDetailView(generics.RetrieveUpdateAPIView):
+class UserDetailView(ConditionalRequestMixin, generics.RetrieveUpdateAPIView):
     serializer_class = UserSerializer
     permission_classes = [permissions.IsAuthenticated]
+    # Needs the full User row, not the stateless token user
+    authentication_classes = [JWTAuthentication, SessionAuthentication]
 
     def get_object(self):
         # Always return the authenticated user
         return self.request.user
 
+    def get_resource_state(self):
+        # The authenticated user is already loaded, no query needed
+        return self.request.user.pk, self.request.user.updated_at
+
 class UserDeleteView(generics.DestroyAPIView):
     serializer_class = UserSerializer
     permission_classes = [permissions.IsAuthenticated]
+    authentication_classes = [JWTAuthentication, SessionAuthentication]
 
     def get_object(self):
         # Always return the authenticated user
@@ -26,24 +40,60 @@ class UserDeleteView(generics.DestroyAPIView):
         # Deactivate user instead of deleting it
         instance.is_active = False
         instance.save()
+        # And revoke its refresh tokens (the access tokens expire within minutes)
+        BlacklistedToken.objects.bulk_create(
+            [BlacklistedToken(token=token) for token in OutstandingToken.objects.filter(user=instance)],
+            ignore_conflicts=True,
+        )
 
-class CharacterListView(generics.ListCreateAPIView):
+class CharacterListView(ConditionalRequestMixin, QueryPlanMixin, generics.ListCreateAPIView):
     serializer_class = CharacterSerializer
     permission_classes = [permissions.IsAuthenticated]
+    ordering = ('-created_at', '-id')  # Keyset pagination, backed by the (user, created_at, id) index
+    # The nested user, race and class are part of the representation
+    related_last_modified_fields = ['user__updated_at', 'race__updated_at', 'character_class__updated_at']
 
     def get_queryset(self):
         # Only returns characters from the authenticated user
-        return Character.objects.filter(user=self.request.user)
+        return Character.objects.filter(user_id=self.request.user.pk)
     
     def perform_create(self, serializer):
         # Automatically associate the character to the authenticated user
-        serializer.save(user=self.request.user)
+        serializer.save(user_id=self.request.user.pk)
 
-class CharacterDetailView(generics.RetrieveUpdateDestroyAPIView):
+class CharacterDetailView(ConditionalRequestMixin, QueryPlanMixin, generics.RetrieveUpdateDestroyAPIView):
     queryset = Character.objects.all()
     serializer_class = CharacterSerializer
     permission_classes = [permissions.IsAuthenticated]
+    related_last_modified_fields = CharacterListView.related_last_modified_fields
 
     def get_queryset(self):
         # Only returns characters from the authenticated user
-        return Character.objects.filter(user=self.request.user)
\ No newline at end of file
+        return Character.objects.filter(user_id=self.request.user.pk)
+
+class ActiveCharacterView(generics.GenericAPIView):
+    """Choose the active character, and get a new token pair carrying it."""
+    serializer_class = ActiveCharacterSerializer
+    permission_classes = [permissions.IsAuthenticated]
+
+    def put(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        user = User.objects.get(pk=request.user.pk)
+        user.active_character = serializer.validated_data['character']
+        user.save(update_fields=['active_character', 'updated_at'])
+
+        if 'refresh' in serializer.validated_data:
+            try:
+                old_refresh = RefreshToken(serializer.validated_data['refresh'])
+                if old_refresh.get('user_id') == str(user.pk):
+                    old_refresh.blacklist()
+            except TokenError:
+                pass  # Already expired or revoked
+
+        refresh = GamifyTokenObtainPairSerializer.get_token(user)
+        return Response({
+            'active_character': user.active_character_id,
+            'refresh': str(refresh),
+            'access': str(refresh.access_token),
+        }, status=status.HTTP_200_OK)